@@ -1,7 +1,27 @@
+import codecs
+import hashlib
+import json
 import os
-import nltk
+import shutil
+import tempfile
+import threading
+from contextlib import nullcontext
+from datetime import datetime
 from transformers import pipeline
 import language_tool_python
+from Analyzer.audio_alignment import (
+    SEGMENTS_FILE_STT,
+    SentenceAligner,
+    is_low_confidence,
+    load_turns,
+    speaking_rates,
+)
+from Analyzer import columnar_archive
+from Analyzer.cascade import ArgumentCascade
+from Analyzer.clash import CLASH_ENABLED, ClashMapper, get_embedder
+from Analyzer.results_archive import DebateResultsWriter, new_debate_id
+from Analyzer.segmentation import chunk_sentences, restore_turn_punctuation, tokenizer_word_counter
+from Analyzer.transcript_parser import LABEL_AT_START, iter_sentences, sentence_tokenizer, setup_nltk
 
 # -------------------------------
 # FILE PATHS (backend-safe)
@@ -9,26 +29,15 @@ import language_tool_python
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
 
-RAW_TRANSCRIPT_STT = os.path.join(PROJECT_ROOT, "debate_transcript.txt")
-FINAL_OUTPUT_STT = os.path.join(BASE_DIR, "debate_final_analysis.txt")
-
-RAW_TRANSCRIPT_CHATBOT = os.path.join(PROJECT_ROOT, "Chatbot", "chatbot_debate_transcript.txt")
-FINAL_OUTPUT_CHATBOT = os.path.join(BASE_DIR, "chatbot_final_analysis.txt")
-
+# DEBATE_DATA_DIR moves the live debate files (transcripts, segments, reports)
+# out of the source tree; the STT, chatbot and winner modules honour it too
+DATA_DIR = os.getenv("DEBATE_DATA_DIR")
 
-# -------------------------------
-# DOWNLOAD REQUIRED NLTK DATA
-# -------------------------------
-def setup_nltk():
-    try:
-        nltk.data.find("tokenizers/punkt")
-    except LookupError:
-        nltk.download("punkt")
+RAW_TRANSCRIPT_STT = os.path.join(DATA_DIR or PROJECT_ROOT, "debate_transcript.txt")
+FINAL_OUTPUT_STT = os.path.join(DATA_DIR or BASE_DIR, "debate_final_analysis.txt")
 
-    try:
-        nltk.data.find("tokenizers/punkt_tab")
-    except LookupError:
-        nltk.download("punkt_tab")
+RAW_TRANSCRIPT_CHATBOT = os.path.join(DATA_DIR or os.path.join(PROJECT_ROOT, "Chatbot"), "chatbot_debate_transcript.txt")
+FINAL_OUTPUT_CHATBOT = os.path.join(DATA_DIR or BASE_DIR, "chatbot_final_analysis.txt")
 
 
 # -------------------------------
@@ -41,211 +50,440 @@ argument_classifier = pipeline(
 
 ARGUMENT_LABELS = ["Claim", "Evidence", "Rebuttal", "Statement"]
 
+# Sentences are chunked to a bounded token length, so batches stay evenly sized
+INFERENCE_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "16"))
+
+
+# -------------------------------
+# SHARED MODELS (loaded once per process)
+# -------------------------------
+# Loading these per request used to dominate analysis time; they are now
+# built on first use and reused. preload_models() builds them up front, which
+# lets api/serve.py load them in the parent and share them with forked workers.
+_model_lock = threading.Lock()
+_models = {}
+
+
+def _shared(name, factory):
+    if name not in _models:
+        with _model_lock:
+            if name not in _models:
+                _models[name] = factory()
+    return _models[name]
+
+
+def get_sentiment_analyzer():
+    return _shared("sentiment", lambda: pipeline(
+        "sentiment-analysis",
+        model="distilbert-base-uncased-finetuned-sst-2-english"
+    ))
+
+
+def get_grammar_tool():
+    # Starts the LanguageTool JVM once; forked workers talk to the same server
+    return _shared("grammar", lambda: language_tool_python.LanguageTool("en-US"))
+
+
+def _as_list(result):
+    # Pipelines return a bare dict for a single input
+    return [result] if isinstance(result, dict) else result
+
+
+def preload_models():
+    """Loads every analysis model now instead of on the first request."""
+    setup_nltk()
+    sentence_tokenizer()
+    get_sentiment_analyzer()
+    get_grammar_tool()
+    if CLASH_ENABLED:
+        get_embedder()
+
 
 # =====================================================
-# MAIN ANALYZER FUNCTION (DUAL MODE)
+# TRANSCRIPT INPUT (streamed)
 # =====================================================
-def analyze_debate(mode: str = "stt"):
+CHATBOT_SEPARATOR = "=" * 60
+CHATBOT_HEADER = "=== DEBATE GPT TRANSCRIPT ===\n\n"
+
+# Text handed to LanguageTool and the models at once. Peak memory depends on
+# this, not on the transcript length.
+WINDOW_CHARS = int(os.getenv("ANALYSIS_WINDOW_CHARS", "20000"))
+READ_LIMIT = 1 << 16  # characters per readline()
+
+
+def last_block_range(path: str, separator: str = CHATBOT_SEPARATOR, chunk_size: int = 1 << 16) -> tuple[int, int]:
     """
-    mode:
-      - 'stt'     → analyze debate_transcript.txt
-      - 'chatbot' → analyze chatbot_debate_transcript.txt
+    Byte range of the last non-empty block between separator lines, found by
+    reading the file backwards, so an ever-growing chatbot log is never read
+    in full. Returns (0, 0) when the file has no content.
+    """
+    sep = separator.encode()
+    first = end = None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        carry = b""
+        while True:
+            read = min(chunk_size, pos)
+            pos -= read
+            f.seek(pos)
+            data = f.read(read) + carry
+            lines = data.split(b"\n")
+            # The first piece may be the tail of a longer line: finish it next round
+            head, rest = (lines[0], lines[1:]) if pos > 0 else (b"", lines)
+            offset = pos + len(data)
+            for line in reversed(rest):
+                start = offset - len(line)
+                if sep in line:
+                    if end is not None:
+                        return first, end
+                elif line.strip():
+                    end = offset if end is None else end
+                    first = start
+                offset = start - 1
+            if pos == 0:
+                return (first, end) if end is not None else (0, 0)
+            carry = head
+
+
+def _iter_byte_range(path: str, start: int, end: int, limit: int):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline(min(limit, end - f.tell()))
+            if not line:
+                break
+            yield decoder.decode(line)
+        yield decoder.decode(b"", final=True)
+
+
+def iter_transcript_lines(path: str, mode: str):
     """
+    Lines to analyze. Chatbot logs can contain many debates separated by
+    CHATBOT_SEPARATOR; only the *last* block is analyzed, to avoid mixing old debates.
+    """
+    # Lines come in pieces of at most READ_LIMIT characters, so a single huge
+    # turn (one line per turn in STT transcripts) is never read at once
+    if mode != "chatbot":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter(lambda: f.readline(READ_LIMIT), "")
+        return
 
-    setup_nltk()
+    start, end = last_block_range(path)
+    yield CHATBOT_HEADER
+    yield from _iter_byte_range(path, start, end, READ_LIMIT)
+    yield "\n"
 
-    # -------------------------------
-    # SELECT FILES BASED ON MODE
-    # -------------------------------
-    if mode == "chatbot":
-        RAW_FILE = RAW_TRANSCRIPT_CHATBOT
-        FINAL_FILE = FINAL_OUTPUT_CHATBOT
-    else:
-        RAW_FILE = RAW_TRANSCRIPT_STT
-        FINAL_FILE = FINAL_OUTPUT_STT
 
-    if not os.path.exists(RAW_FILE):
-        raise FileNotFoundError(f"Input file not found: {RAW_FILE}")
+def iter_windows(lines, window_chars: int = WINDOW_CHARS):
+    """
+    Groups lines (or pieces of long lines) into windows of about window_chars.
+    A full window is closed at the next speaker label or blank line. A single
+    endless turn is cut at the last whitespace once the window reaches twice
+    the size, so a window never exceeds that.
+    """
+    window = []
+    size = 0
+    line_start = True  # the next piece starts a new line
+    for piece in lines:
+        at_boundary = line_start and (LABEL_AT_START.match(piece) or not piece.strip())
+        if window and size >= window_chars and at_boundary:
+            yield "".join(window)
+            window, size = [], 0
+
+        window.append(piece)
+        size += len(piece)
+        line_start = piece.endswith("\n")
+
+        while size >= 2 * window_chars:
+            text = "".join(window)
+            limit = 2 * window_chars
+            cut = max(text.rfind(" ", 0, limit), text.rfind("\n", 0, limit)) + 1
+            if cut <= 0:
+                cut = limit
+            yield text[:cut]
+            window = [text[cut:]] if cut < len(text) else []
+            size = len(text) - cut
+    if window:
+        yield "".join(window)
 
-    # -------------------------------
-    # 1.READ RAW TRANSCRIPT
-    # -------------------------------
-    with open(RAW_FILE, "r", encoding="utf-8") as f:
-        raw_text = f.read()
 
-    # For chatbot mode, the transcript file can contain multiple debates
-    # separated by '============================================================'.
-    # To avoid mixing old debates, only analyze the *last* debate block.
-    if mode == "chatbot":
-        parts = [p.strip() for p in raw_text.split("============================================================") if p.strip()]
-        if parts:
-            last_block = parts[-1]
-            raw_text = "=== DEBATE GPT TRANSCRIPT ===\n\n" + last_block + "\n"
+# =====================================================
+# ARGUMENT TYPE DETECTION (HYBRID SYSTEM)
+# =====================================================
 
-    # -------------------------------
-    # 2.GRAMMAR CORRECTION
-    # -------------------------------
-    tool = language_tool_python.LanguageTool("en-US")
-    matches = tool.check(raw_text)
-    # Apply grammar corrections - this fixes spelling, grammar, punctuation
-    # Use the correct() function which applies all corrections automatically
-    corrected_text = language_tool_python.utils.correct(raw_text, matches)
-    
-    # Log if corrections were made (for debugging)
-    if len(matches) > 0:
-        print(f"Grammar check found {len(matches)} issues")
-        if corrected_text != raw_text:
-            print("Grammar corrections were applied")
-        else:
-            print("Warning: Grammar check found issues but no corrections were applied")
+# ---------- RULE BASED ----------
+def detect_argument_type_rules(sentence):
+    s = sentence.lower()
 
-    # -------------------------------
-    # 3.SENTENCE SEGMENTATION (with speaker tracking for chatbot)
-    # -------------------------------
-    # For chatbot mode, split by speaker first, then tokenize each speaker's text
-    if mode == "chatbot":
-        # Split corrected_text by speaker labels
-        speaker_sentences = []
-        current_speaker = None
-        current_text = []
-        
-        for line in corrected_text.split("\n"):
-            line_stripped = line.strip()
-            if "USER:" in line:
-                # Save previous speaker's text if any
-                if current_speaker and current_text:
-                    text_block = "\n".join(current_text)
-                    sentences = nltk.sent_tokenize(text_block)
-                    for sent in sentences:
-                        if sent.strip():
-                            speaker_sentences.append((current_speaker, sent.strip()))
-                current_speaker = "USER"
-                current_text = []
-                # Extract text after USER:
-                parts = line.split("USER:", 1)
-                if len(parts) > 1 and parts[1].strip():
-                    current_text.append(parts[1].strip())
-            elif "DEBATE GPT:" in line:
-                # Save previous speaker's text if any
-                if current_speaker and current_text:
-                    text_block = "\n".join(current_text)
-                    sentences = nltk.sent_tokenize(text_block)
-                    for sent in sentences:
-                        if sent.strip():
-                            speaker_sentences.append((current_speaker, sent.strip()))
-                current_speaker = "DEBATE GPT"
-                current_text = []
-                # Extract text after DEBATE GPT:
-                parts = line.split("DEBATE GPT:", 1)
-                if len(parts) > 1 and parts[1].strip():
-                    current_text.append(parts[1].strip())
-            elif current_speaker and line_stripped and not line_stripped.startswith("[") and not line_stripped.startswith("==="):
-                # Continuation of current speaker's text
-                current_text.append(line_stripped)
-        
-        # Don't forget the last speaker's text
-        if current_speaker and current_text:
-            text_block = "\n".join(current_text)
-            sentences = nltk.sent_tokenize(text_block)
-            for sent in sentences:
-                if sent.strip():
-                    speaker_sentences.append((current_speaker, sent.strip()))
-        
-        sentences_with_speaker = speaker_sentences
-    else:
-        # STT mode: just tokenize normally
-        sentences_list = nltk.sent_tokenize(corrected_text)
-        sentences_with_speaker = [(None, s.strip()) for s in sentences_list if s.strip()]
+    if any(k in s for k in ["i think", "i believe", "in my opinion", "i feel that"]):
+        return "Claim", 0.95
 
-    # -------------------------------
-    # 4.SENTIMENT ANALYZER
-    # -------------------------------
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english"
-    )
+    if any(k in s for k in ["because", "since", "as a result", "this shows", "for example"]):
+        return "Evidence", 0.9
 
-    # =====================================================
-    # 5.ARGUMENT TYPE DETECTION (HYBRID SYSTEM)
-    # =====================================================
+    if any(k in s for k in ["but", "however", "on the other hand", "although"]):
+        return "Rebuttal", 0.9
 
-    # ---------- RULE BASED ----------
-    def detect_argument_type_rules(sentence):
-        s = sentence.lower()
+    return None, None
 
-        if any(k in s for k in ["i think", "i believe", "in my opinion", "i feel that"]):
-            return "Claim", 0.95
 
-        if any(k in s for k in ["because", "since", "as a result", "this shows", "for example"]):
-            return "Evidence", 0.9
+# ---------- NLP BASED (batched) ----------
+def detect_argument_types_nlp(batch):
+    if not batch:
+        return []
+    results = _as_list(argument_classifier(batch, ARGUMENT_LABELS, batch_size=INFERENCE_BATCH_SIZE))
+    return [(r["labels"][0], round(r["scores"][0], 3)) for r in results]
 
-        if any(k in s for k in ["but", "however", "on the other hand", "although"]):
-            return "Rebuttal", 0.9
 
-        return None, None
+# ---------- CASCADE CONTROLLER ----------
+# Rules, then the cheap classifier (when trained), then the zero-shot model,
+# each tier only for sentences the previous one was not confident about
+argument_cascade = ArgumentCascade(detect_argument_type_rules, detect_argument_types_nlp)
 
 
-    # ---------- NLP BASED ----------
-    def detect_argument_type_nlp(sentence):
-        result = argument_classifier(sentence, ARGUMENT_LABELS)
-        label = result["labels"][0]
-        score = round(result["scores"][0], 3)
-        return label, score
+def detect_argument_types(sentences):
+    return argument_cascade.classify(sentences)
 
 
-    # ---------- HYBRID CONTROLLER ----------
-    def detect_argument_type(sentence):
-        label, score = detect_argument_type_rules(sentence)
-        if label is not None:
-            return label, score, "rule-based"
+# =====================================================
+# WINDOWED ANALYSIS PIPELINE
+# =====================================================
+def _window_key(index: int, raw_text: str, speaker, turn: int, aligner_pos: int) -> str:
+    # Same window text in the same pipeline state → same results
+    return hashlib.sha1(json.dumps([index, speaker, turn, aligner_pos, raw_text]).encode()).hexdigest()
 
-        label, score = detect_argument_type_nlp(sentence)
-        return label, score, "nlp-based"
 
+def iter_analysis(lines, turns: list[dict] | None = None, window_chars: int = WINDOW_CHARS, checkpoint=None):
+    """
+    Generator over a transcript given as lines. Per window it yields
+    (corrected_text, rows): the grammar-corrected window and one result dict
+    per sentence (speaker, sentence, sentiment, argument type, audio span).
+    checkpoint (see Analyzer/jobs.py) stores every finished window and hands
+    it back on a re-run, so only windows without a result reach the models.
+    """
+    tool = sentiment_analyzer = count_word = None  # loaded at the first window to analyse
+    aligner = SentenceAligner(turns) if turns else None
+
+    next_turn = 0
+    speaker, turn = None, 0
+    for index, raw_text in enumerate(iter_windows(lines, window_chars)):
+        # -------------------------------
+        # 1.PUNCTUATION FROM PAUSES (STT)
+        # -------------------------------
+        # whisper/Vosk text has little punctuation → end sentences at pauses
+        # between the segments stored with each turn
+        if turns:
+            raw_text, next_turn = restore_turn_punctuation(raw_text, turns, first_turn=next_turn)
+
+        # Windows finished by an earlier (interrupted) run come from the checkpoint
+        key = None
+        if checkpoint is not None:
+            key = _window_key(index, raw_text, speaker, turn, aligner.pos if aligner else 0)
+            saved = checkpoint.get(key)
+            if saved is not None:
+                speaker, turn = saved["speaker"], saved["turn"]
+                if aligner:
+                    aligner.pos = saved["aligner_pos"]
+                yield saved["corrected"], saved["rows"]
+                continue
 
-    # -------------------------------
-    # 6.WRITE FINAL OUTPUT
-    # -------------------------------
-    with open(FINAL_FILE, "w", encoding="utf-8") as out:
+        if tool is None:
+            tool = get_grammar_tool()
+            sentiment_analyzer = get_sentiment_analyzer()
+            count_word = tokenizer_word_counter(sentiment_analyzer.tokenizer)
+
+        # -------------------------------
+        # 2.GRAMMAR CORRECTION
+        # -------------------------------
+        matches = tool.check(raw_text)
+        # Apply grammar corrections - this fixes spelling, grammar, punctuation
+        corrected_text = language_tool_python.utils.correct(raw_text, matches)
+        if matches:
+            print(f"Grammar check found {len(matches)} issues")
+        del matches
+
+        # -------------------------------
+        # 3.SENTENCE SEGMENTATION (with speaker tracking)
+        # -------------------------------
+        # Speaker labels ("USER:", "DEBATE GPT:", "User 1:", ...) switch speaker,
+        # headers are skipped. Sentences longer than the models' token budget are
+        # split evenly instead of being truncated by the pipelines.
+        records = list(iter_sentences(corrected_text, speaker=speaker, turn=turn))
+        if records:
+            speaker, turn = records[-1].speaker, records[-1].turn
+        sentences_with_speaker = chunk_sentences([(r.speaker, r.sentence) for r in records], count_word=count_word)
+        sentences = [s for _, s in sentences_with_speaker]
+
+        # STT mode: map sentences to the whisper segments stored with each turn
+        audio_spans = aligner.align(sentences) if aligner else [None] * len(sentences)
+
+        # -------------------------------
+        # 4.SENTIMENT + ARGUMENT TYPE (batched)
+        # -------------------------------
+        sentiments = _as_list(
+            sentiment_analyzer(sentences, batch_size=INFERENCE_BATCH_SIZE, truncation=True)
+        ) if sentences else []
+        argument_results = detect_argument_types(sentences)
+
+        rows = []
+        for (speaker_label, sentence), span, sentiment, (arg_type, arg_conf, method) in zip(
+            sentences_with_speaker, audio_spans, sentiments, argument_results
+        ):
+            rows.append({
+                "speaker": speaker_label,
+                "sentence": sentence,
+                "sentiment": sentiment["label"],
+                "sentiment_score": round(sentiment["score"], 3),
+                "argument_type": arg_type,
+                "arg_confidence": arg_conf,
+                "method": method,
+                "audio_turn": span["turn"] if span else None,
+                "audio_start": span["start"] if span else None,
+                "audio_end": span["end"] if span else None,
+                "stt_logprob": span["avg_logprob"] if span else None,
+            })
+        if checkpoint is not None:
+            checkpoint.put(key, {
+                "corrected": corrected_text,
+                "rows": rows,
+                "speaker": speaker,
+                "turn": turn,
+                "aligner_pos": aligner.pos if aligner else 0,
+            })
+        yield corrected_text, rows
+
+
+def _write_report_entry(out, count: int, row: dict):
+    out.write(f"Sentence {count}:\n")
+    # Include speaker label in corrected text for chatbot mode
+    if row["speaker"]:
+        corrected_text_line = f"{row['speaker']}: {row['sentence']}"
+    else:
+        corrected_text_line = row["sentence"]
+    out.write(f"Corrected Text : {corrected_text_line}\n")
+    out.write(f"Sentiment      : {row['sentiment']}\n")
+    out.write(f"Confidence     : {row['sentiment_score']}\n")
+    out.write(f"Argument Type  : {row['argument_type']}\n")
+    out.write(f"Arg Confidence : {row['arg_confidence']}\n")
+    out.write(f"Detected By    : {row['method']}\n")
+    if row["audio_start"] is not None:
+        out.write(f"Audio Span     : turn {row['audio_turn']}, {row['audio_start']:.2f}s - {row['audio_end']:.2f}s\n")
+        out.write(f"STT Confidence : {row['stt_logprob']}\n")
+    out.write("\n" + "-" * 55 + "\n\n")
+
+
+def _write_report(path: str, transcript_spool, entries_spool):
+    # Written next to the target and renamed, so readers never see half a report
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as out:
         out.write("DEBATE GRAMMAR, SENTIMENT & ARGUMENT ANALYSIS\n")
         out.write("=" * 55 + "\n\n")
 
         out.write("CORRECTED TRANSCRIPT:\n")
         out.write("-" * 55 + "\n")
-        out.write(corrected_text + "\n\n")
+        transcript_spool.seek(0)
+        shutil.copyfileobj(transcript_spool, out)
+        out.write("\n\n")
 
         out.write("SENTENCE-WISE ANALYSIS:\n")
         out.write("-" * 55 + "\n\n")
+        entries_spool.seek(0)
+        shutil.copyfileobj(entries_spool, out)
+    os.replace(tmp_file, path)
 
-        count = 1
-        for speaker, sentence in sentences_with_speaker:
-            if not sentence.strip():
-                continue
 
-            sentiment = sentiment_analyzer(sentence)[0]
-            arg_type, arg_conf, method = detect_argument_type(sentence)
-
-            out.write(f"Sentence {count}:\n")
-            # Include speaker label in corrected text for chatbot mode
-            if speaker:
-                corrected_text_line = f"{speaker}: {sentence}"
-            else:
-                corrected_text_line = sentence
-            out.write(f"Corrected Text : {corrected_text_line}\n")
-            out.write(f"Sentiment      : {sentiment['label']}\n")
-            out.write(f"Confidence     : {round(sentiment['score'], 3)}\n")
-            out.write(f"Argument Type  : {arg_type}\n")
-            out.write(f"Arg Confidence : {arg_conf}\n")
-            out.write(f"Detected By    : {method}\n")
-            out.write("\n" + "-" * 55 + "\n\n")
-
-            count += 1
+# =====================================================
+# MAIN ANALYZER FUNCTION (DUAL MODE)
+# =====================================================
+def analyze_debate(mode: str = "stt", input_file: str | None = None, output_file: str | None = None,
+                   window_chars: int = WINDOW_CHARS, debate_id: str | None = None,
+                   write_files: bool = True, on_row=None, checkpoint=None, created: datetime | None = None):
+    """
+    mode:
+      - 'stt'     → analyze debate_transcript.txt
+      - 'chatbot' → analyze chatbot_debate_transcript.txt
+    input_file / output_file override the mode's default paths.
+    on_row(row) is called with every sentence result as it is produced.
+    write_files=False skips the report and both archives; results then only
+    reach on_row.
+    checkpoint: see iter_analysis(); Analyzer/jobs.py runs resumable jobs with it.
+    created: columnar partition date (a resumed job keeps its first run's date).
+
+    The transcript is streamed window by window; the report, the JSON archive
+    and the columnar archive are written as results come in, so memory stays
+    bounded by window_chars however long the debate is.
+    """
+
+    setup_nltk()
+
+    # -------------------------------
+    # SELECT FILES BASED ON MODE
+    # -------------------------------
+    if mode == "chatbot":
+        RAW_FILE = input_file or RAW_TRANSCRIPT_CHATBOT
+        FINAL_FILE = output_file or FINAL_OUTPUT_CHATBOT
+    else:
+        RAW_FILE = input_file or RAW_TRANSCRIPT_STT
+        FINAL_FILE = output_file or FINAL_OUTPUT_STT
+
+    if not os.path.exists(RAW_FILE):
+        raise FileNotFoundError(f"Input file not found: {RAW_FILE}")
+
+    # Segment timing is only valid for the live STT transcript it was recorded with
+    turns = load_turns(SEGMENTS_FILE_STT) if mode != "chatbot" and input_file is None else []
+
+    debate_id = debate_id or new_debate_id(mode)
+    columnar = write_files and columnar_archive.COLUMNAR_ENABLED and columnar_archive.available()
+    low_confidence = []
+    count = 0
+    # Rebuttal → claim links and dropped arguments, built as the windows stream past
+    clash = ClashMapper() if CLASH_ENABLED else None
+
+    # Corrected transcript and sentence entries go to two spool files and are
+    # joined at the end, keeping the report layout (transcript first)
+    with (tempfile.TemporaryFile("w+", encoding="utf-8") if write_files else nullcontext()) as transcript_spool, \
+            (tempfile.TemporaryFile("w+", encoding="utf-8") if write_files else nullcontext()) as entries_spool, \
+            (DebateResultsWriter(mode, debate_id) if write_files else nullcontext()) as archive, \
+            (columnar_archive.ColumnarWriter(mode, debate_id, created) if columnar else nullcontext()) as columnar_writer:
+
+        for corrected_text, rows in iter_analysis(iter_transcript_lines(RAW_FILE, mode), turns, window_chars, checkpoint):
+            if transcript_spool is not None:
+                transcript_spool.write(corrected_text)
+            for row in rows:
+                count += 1
+                if entries_spool is not None:
+                    _write_report_entry(entries_spool, count, row)
+                if row["audio_start"] is not None and is_low_confidence({"avg_logprob": row["stt_logprob"]}):
+                    low_confidence.append(count)
+                # Raw model outputs → archive, so debates can be re-scored without the models
+                if archive is not None:
+                    archive.write(row)
+                if on_row is not None:
+                    on_row(row)
+            if columnar_writer is not None:
+                # Append-only columnar copy for cross-debate analytics (needs pyarrow)
+                columnar_writer.write(rows)
+            if clash is not None:
+                clash.add(rows)
+
+        # -------------------------------
+        # 5.WRITE FINAL OUTPUT
+        # -------------------------------
+        if write_files:
+            _write_report(FINAL_FILE, transcript_spool, entries_spool)
 
     return {
         "mode": mode,
         "message": "FULL ANALYSIS COMPLETED",
-        "output_file": FINAL_FILE,
-        "sentences_analyzed": count - 1
+        "output_file": FINAL_FILE if write_files else None,
+        "debate_id": debate_id,
+        "archive_file": archive.path if archive is not None else None,
+        "sentences_analyzed": count,
+        "speaking_rate_wpm": speaking_rates(turns) if turns else None,
+        "low_confidence_sentences": low_confidence,
+        "clash": clash.graph() if clash is not None else None,
     }
 
 
@@ -0,0 +1,121 @@
+import json
+import os
+import re
+
+# -------------------------------
+# FILE PATHS
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+
+DATA_DIR = os.getenv("DEBATE_DATA_DIR")  # see Analyzer/aly.py
+SEGMENTS_FILE_STT = os.path.join(DATA_DIR or PROJECT_ROOT, "debate_transcript_segments.json")
+
+LOW_CONFIDENCE_LOGPROB = float(os.getenv("LOW_CONFIDENCE_LOGPROB", "-1.0"))
+SEARCH_WINDOW = 8  # words to look ahead when grammar correction changed a word
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _words(text: str) -> list[str]:
+    return WORD_RE.findall(text.lower())
+
+
+def load_turns(path: str = SEGMENTS_FILE_STT) -> list[dict]:
+    """
+    Turns stored by /stt/transcribe:
+    [{"turn": 1, "user": "User 1", "text": ..., "segments": [{start, end, text, avg_logprob}]}]
+    Segment times are relative to the start of their turn's recording.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("turns", [])
+
+
+# -------------------------------
+# SENTENCE ↔ AUDIO ALIGNMENT
+# -------------------------------
+class SentenceAligner:
+    """
+    Maps each (grammar-corrected) sentence back to the whisper segments it came from.
+    Words are matched greedily against the segment word stream with a small
+    look-ahead, so corrections and header lines only skip words, never derail.
+    The stream position is kept between calls, so a transcript can be aligned
+    window by window.
+    """
+
+    def __init__(self, turns: list[dict]):
+        self.stream = []  # (turn id, segment, word) per spoken word
+        for turn in turns:
+            for seg in turn.get("segments", []):
+                self.stream.extend((turn["turn"], seg, w) for w in _words(seg["text"]))
+        self.pos = 0
+
+    def align(self, sentences: list[str]) -> list[dict | None]:
+        """
+        Returns one entry per sentence (None when nothing matched):
+        {"turn", "start", "end", "avg_logprob", "words"}
+        """
+        return [self._align_one(sentence) for sentence in sentences]
+
+    def _align_one(self, sentence: str) -> dict | None:
+        stream = self.stream
+        matched = []
+        for word in _words(sentence):
+            for j in range(self.pos, min(self.pos + SEARCH_WINDOW, len(stream))):
+                if stream[j][2] == word:
+                    matched.append(stream[j][:2])
+                    self.pos = j + 1
+                    break
+
+        if not matched:
+            return None
+
+        turn_id = matched[0][0]
+        segs = {id(seg): seg for t, seg in matched if t == turn_id}.values()
+        logprobs = [s["avg_logprob"] for s in segs if s.get("avg_logprob") is not None]
+        return {
+            "turn": turn_id,
+            "start": min(s["start"] for s in segs),
+            "end": max(s["end"] for s in segs),
+            "avg_logprob": round(sum(logprobs) / len(logprobs), 4) if logprobs else None,
+            "words": len(matched),
+        }
+
+
+def align_sentences(sentences: list[str], turns: list[dict]) -> list[dict | None]:
+    """One-shot SentenceAligner(turns).align(sentences)."""
+    return SentenceAligner(turns).align(sentences)
+
+
+def is_low_confidence(span: dict | None, threshold: float = LOW_CONFIDENCE_LOGPROB) -> bool:
+    return bool(span) and span["avg_logprob"] is not None and span["avg_logprob"] < threshold
+
+
+# -------------------------------
+# LOOKUPS OVER STORED SEGMENTS
+# -------------------------------
+def low_confidence_spans(turns: list[dict], threshold: float = LOW_CONFIDENCE_LOGPROB) -> list[dict]:
+    """Segments whose average token log-probability is below threshold (re-transcription candidates)."""
+    return [
+        {"turn": turn["turn"], "user": turn.get("user"), **seg}
+        for turn in turns
+        for seg in turn.get("segments", [])
+        if seg.get("avg_logprob") is not None and seg["avg_logprob"] < threshold
+    ]
+
+
+def speaking_rates(turns: list[dict]) -> dict:
+    """Words per minute of voiced time, per speaker."""
+    words = {}
+    seconds = {}
+    for turn in turns:
+        user = turn.get("user") or "Unknown"
+        for seg in turn.get("segments", []):
+            words[user] = words.get(user, 0) + len(_words(seg["text"]))
+            seconds[user] = seconds.get(user, 0.0) + max(seg["end"] - seg["start"], 0.0)
+    return {
+        user: round(words[user] * 60.0 / seconds[user], 1) if seconds[user] > 0 else None
+        for user in words
+    }
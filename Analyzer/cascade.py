@@ -0,0 +1,352 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from Analyzer.rescore import ARGUMENT_LABELS
+from Analyzer.results_archive import ARCHIVE_DIR, archived_files, load_debate_results
+
+# =====================================================
+# CONFIDENCE-GATED ARGUMENT CLASSIFIER CASCADE
+# =====================================================
+# Tier 1  rules          keyword rules (free)
+# Tier 2  classifier     hashed n-gram naive Bayes (microseconds per sentence)
+# Tier 3  nli            zero-shot DistilBERT MNLI, 4 hypotheses per sentence
+#
+# A sentence stops at the first tier whose confidence reaches that tier's
+# threshold; only the rest go on, in one batch per tier. Thresholds trade
+# accuracy for latency per deployment:
+#   CASCADE_RULE_THRESHOLD        0 → every rule hit is accepted (as before)
+#   CASCADE_CLASSIFIER_THRESHOLD  1 → the classifier never answers; lower → fewer NLI calls
+# The classifier tier is skipped until a model file exists. Train it from the
+# analysis archive (the NLI model's own past labels) and/or a labelled JSONL
+# file, then pick thresholds with the evaluate command:
+#   python -m Analyzer.cascade train --archive --labels train.jsonl
+#   python -m Analyzer.cascade evaluate --labels test.jsonl --sweep 0.6,0.7,0.8,0.9
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CASCADE_MODEL_FILE = os.getenv("CASCADE_MODEL_FILE", os.path.join(BASE_DIR, "argument_classifier.npz"))
+CASCADE_RULE_THRESHOLD = float(os.getenv("CASCADE_RULE_THRESHOLD", "0"))
+CASCADE_CLASSIFIER_THRESHOLD = float(os.getenv("CASCADE_CLASSIFIER_THRESHOLD", "0.85"))
+
+TIERS = ["rules", "classifier", "nli"]
+METHODS = {"rules": "rule-based", "classifier": "classifier-based", "nli": "nlp-based"}
+
+N_BUCKETS = 1 << 16
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+# -------------------------------
+# TIER 2: HASHED NAIVE BAYES
+# -------------------------------
+def feature_buckets(sentence: str, n_buckets: int = N_BUCKETS) -> np.ndarray:
+    """Unigrams and bigrams hashed into n_buckets (crc32, stable across processes)."""
+    tokens = _TOKEN.findall(sentence.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return np.fromiter((zlib.crc32(g.encode()) % n_buckets for g in grams), dtype=np.int64, count=len(grams))
+
+
+class HashedNaiveBayes:
+    def __init__(self, labels: list[str], log_prior: np.ndarray, log_prob: np.ndarray):
+        self.labels = list(labels)
+        self.log_prior = log_prior
+        self.log_prob = log_prob  # [labels, buckets]
+        self.n_buckets = log_prob.shape[1]
+
+    @classmethod
+    def fit(cls, samples: list[tuple[str, str]], labels: list[str] = ARGUMENT_LABELS,
+            n_buckets: int = N_BUCKETS, alpha: float = 1.0) -> "HashedNaiveBayes":
+        """samples: [(sentence, label)]; labels outside the label list are ignored."""
+        index = {label: i for i, label in enumerate(labels)}
+        counts = np.zeros((len(labels), n_buckets), dtype=np.float64)
+        docs = np.zeros(len(labels), dtype=np.float64)
+        for sentence, label in samples:
+            k = index.get(label)
+            if k is None:
+                continue
+            np.add.at(counts[k], feature_buckets(sentence, n_buckets), 1.0)
+            docs[k] += 1
+        if not docs.sum():
+            raise ValueError("No training samples with a known label")
+
+        log_prior = np.log((docs + 1.0) / (docs.sum() + len(labels)))
+        log_prob = np.log((counts + alpha) / (counts.sum(axis=1, keepdims=True) + alpha * n_buckets))
+        return cls(labels, log_prior, log_prob.astype(np.float32))
+
+    def predict_proba(self, sentences: list[str]) -> np.ndarray:
+        scores = np.empty((len(sentences), len(self.labels)))
+        for i, sentence in enumerate(sentences):
+            scores[i] = self.log_prior + self.log_prob[:, feature_buckets(sentence, self.n_buckets)].sum(axis=1)
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, sentences: list[str]) -> list[tuple[str, float]]:
+        if not sentences:
+            return []
+        probs = self.predict_proba(sentences)
+        best = probs.argmax(axis=1)
+        return [(self.labels[k], round(float(probs[i, k]), 3)) for i, k in enumerate(best)]
+
+    def save(self, path: str):
+        np.savez_compressed(path, labels=np.array(self.labels), log_prior=self.log_prior, log_prob=self.log_prob)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNaiveBayes":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["log_prior"], data["log_prob"])
+
+
+# -------------------------------
+# CASCADE
+# -------------------------------
+class ArgumentCascade:
+    """
+    rules(sentence) → (label, confidence) or (None, None)
+    nli(sentences)  → [(label, confidence)]
+    classify() returns [(label, confidence, method)] like detect_argument_types().
+    """
+
+    def __init__(self, rules, nli, classifier: HashedNaiveBayes | None = None,
+                 rule_threshold: float = CASCADE_RULE_THRESHOLD,
+                 classifier_threshold: float = CASCADE_CLASSIFIER_THRESHOLD,
+                 model_file: str | None = CASCADE_MODEL_FILE):
+        self.rules = rules
+        self.nli = nli
+        self.rule_threshold = rule_threshold
+        self.classifier_threshold = classifier_threshold
+        self.model_file = model_file
+        self._classifier = classifier
+        self._classifier_loaded = classifier is not None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def classifier(self) -> HashedNaiveBayes | None:
+        # Loaded on first use; no model file → the tier is skipped
+        if not self._classifier_loaded:
+            with self._lock:
+                if not self._classifier_loaded:
+                    if self.model_file and os.path.exists(self.model_file):
+                        self._classifier = HashedNaiveBayes.load(self.model_file)
+                    self._classifier_loaded = True
+        return self._classifier
+
+    def reset_stats(self):
+        with self._lock:
+            self.sentences = 0
+            self.accepted = {tier: 0 for tier in TIERS}
+            self.seen = {tier: 0 for tier in TIERS}
+            self.seconds = {tier: 0.0 for tier in TIERS}
+
+    def _record(self, tier: str, seen: int, accepted: int, seconds: float):
+        with self._lock:
+            self.seen[tier] += seen
+            self.accepted[tier] += accepted
+            self.seconds[tier] += seconds
+
+    def classify(self, sentences: list[str]) -> list[tuple]:
+        results = [None] * len(sentences)
+
+        t0 = time.perf_counter()
+        for i, sentence in enumerate(sentences):
+            label, score = self.rules(sentence)
+            if label is not None and score >= self.rule_threshold:
+                results[i] = (label, score, METHODS["rules"])
+        pending = [i for i, r in enumerate(results) if r is None]
+        self._record("rules", len(sentences), len(sentences) - len(pending), time.perf_counter() - t0)
+
+        classifier = self.classifier
+        if pending and classifier is not None:
+            t0 = time.perf_counter()
+            predictions = classifier.predict([sentences[i] for i in pending])
+            still_pending = []
+            for i, (label, score) in zip(pending, predictions):
+                if score >= self.classifier_threshold:
+                    results[i] = (label, score, METHODS["classifier"])
+                else:
+                    still_pending.append(i)
+            self._record("classifier", len(pending), len(pending) - len(still_pending), time.perf_counter() - t0)
+            pending = still_pending
+
+        if pending:
+            t0 = time.perf_counter()
+            for i, (label, score) in zip(pending, self.nli([sentences[i] for i in pending])):
+                results[i] = (label, score, METHODS["nli"])
+            self._record("nli", len(pending), len(pending), time.perf_counter() - t0)
+
+        with self._lock:
+            self.sentences += len(sentences)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.sentences or 1
+            return {
+                "sentences": self.sentences,
+                "rule_threshold": self.rule_threshold,
+                "classifier_threshold": self.classifier_threshold,
+                "classifier_loaded": self._classifier is not None,
+                "tiers": {
+                    tier: {
+                        "seen": self.seen[tier],
+                        "accepted": self.accepted[tier],
+                        "hit_rate": round(self.accepted[tier] / total, 3),
+                        "ms_per_sentence": round(1000 * self.seconds[tier] / self.seen[tier], 3)
+                        if self.seen[tier] else 0.0,
+                    }
+                    for tier in TIERS
+                },
+            }
+
+
+# -------------------------------
+# TRAINING DATA
+# -------------------------------
+def load_labelled(path: str) -> list[tuple[str, str]]:
+    """JSONL with {"sentence": ..., "label": ...} ("argument_type" also accepted as the label)."""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            samples.append((row["sentence"], row.get("label") or row["argument_type"]))
+    return samples
+
+
+def archive_samples(archive_dir: str = ARCHIVE_DIR, methods=("nlp-based",),
+                    min_confidence: float = 0.0) -> list[tuple[str, str]]:
+    """
+    Past model outputs as training data: the classifier learns to reproduce
+    the NLI model's labels on the sentences this deployment actually sees.
+    """
+    samples = []
+    for path in archived_files(archive_dir):
+        for row in load_debate_results(path)["sentences"]:
+            if row.get("method") in methods and (row.get("arg_confidence") or 0) >= min_confidence:
+                samples.append((row["sentence"], row["argument_type"]))
+    return samples
+
+
+# -------------------------------
+# EVALUATION
+# -------------------------------
+def evaluate(samples: list[tuple[str, str]], cascade: ArgumentCascade,
+             classifier_thresholds: list[float] | None = None) -> dict:
+    """
+    Runs every tier on every labelled sample once, then replays the cascade
+    for the configured thresholds (and each classifier threshold in the
+    sweep): per-tier hit rate and accuracy, overall accuracy, share of
+    sentences reaching the NLI model and estimated ms per sentence.
+    """
+    sentences = [s for s, _ in samples]
+    gold = [label for _, label in samples]
+    n = len(samples)
+    if not n:
+        raise ValueError("No labelled samples")
+
+    t0 = time.perf_counter()
+    rule_out = [cascade.rules(s) for s in sentences]
+    ms_rules = 1000 * (time.perf_counter() - t0) / n
+
+    classifier = cascade.classifier
+    t0 = time.perf_counter()
+    cls_out = classifier.predict(sentences) if classifier is not None else None
+    ms_classifier = 1000 * (time.perf_counter() - t0) / n if classifier is not None else 0.0
+
+    t0 = time.perf_counter()
+    nli_out = cascade.nli(sentences)
+    ms_nli = 1000 * (time.perf_counter() - t0) / n
+
+    def replay(rule_threshold: float, classifier_threshold: float) -> dict:
+        tiers = {tier: {"accepted": 0, "correct": 0} for tier in TIERS}
+        reached_classifier = 0
+        for i in range(n):
+            label, score = rule_out[i]
+            if label is not None and score >= rule_threshold:
+                tier = "rules"
+            else:
+                if cls_out is not None:
+                    reached_classifier += 1
+                if cls_out is not None and cls_out[i][1] >= classifier_threshold:
+                    tier, label = "classifier", cls_out[i][0]
+                else:
+                    tier, label = "nli", nli_out[i][0]
+            tiers[tier]["accepted"] += 1
+            tiers[tier]["correct"] += label == gold[i]
+
+        correct = sum(t["correct"] for t in tiers.values())
+        return {
+            "rule_threshold": rule_threshold,
+            "classifier_threshold": classifier_threshold,
+            "accuracy": round(correct / n, 4),
+            "nli_share": round(tiers["nli"]["accepted"] / n, 4),
+            "est_ms_per_sentence": round(
+                ms_rules + ms_classifier * reached_classifier / n + ms_nli * tiers["nli"]["accepted"] / n, 3),
+            "tiers": {
+                tier: {
+                    "hit_rate": round(t["accepted"] / n, 4),
+                    "accuracy": round(t["correct"] / t["accepted"], 4) if t["accepted"] else None,
+                }
+                for tier, t in tiers.items()
+            },
+        }
+
+    return {
+        "samples": n,
+        "ms_per_sentence": {"rules": round(ms_rules, 3), "classifier": round(ms_classifier, 3),
+                            "nli": round(ms_nli, 3)},
+        "nli_only_accuracy": round(sum(p[0] == g for p, g in zip(nli_out, gold)) / n, 4),
+        "configured": replay(cascade.rule_threshold, cascade.classifier_threshold),
+        "sweep": [replay(cascade.rule_threshold, t) for t in (classifier_thresholds or [])],
+    }
+
+
+# -----------------------------
+# CLI MODE
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and evaluate the argument classifier cascade")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="fit the tier-2 classifier")
+    train.add_argument("--labels", help="labelled JSONL file")
+    train.add_argument("--archive", action="store_true", help="also learn from archived NLI labels")
+    train.add_argument("--min-confidence", type=float, default=0.5,
+                       help="archived NLI labels below this confidence are skipped")
+    train.add_argument("--out", default=CASCADE_MODEL_FILE)
+
+    ev = sub.add_parser("evaluate", help="per-tier hit rates and accuracy on a labelled sample set")
+    ev.add_argument("--labels", required=True, help="labelled JSONL file (keep it apart from training data)")
+    ev.add_argument("--sweep", default="", help="comma-separated classifier thresholds to compare")
+    ev.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        samples = load_labelled(args.labels) if args.labels else []
+        if args.archive:
+            samples += archive_samples(min_confidence=args.min_confidence)
+        model = HashedNaiveBayes.fit(samples)
+        model.save(args.out)
+        print(f"✅ Trained on {len(samples)} sentences → {args.out}")
+    else:
+        # Loads the zero-shot model
+        from Analyzer.aly import argument_cascade
+
+        report = evaluate(load_labelled(args.labels), argument_cascade,
+                          [float(t) for t in args.sweep.split(",") if t.strip()])
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{report['samples']} samples, NLI-only accuracy {report['nli_only_accuracy']}")
+            print(f"ms/sentence: {report['ms_per_sentence']}")
+            for row in [report["configured"], *report["sweep"]]:
+                hits = ", ".join(f"{tier} {t['hit_rate']:.0%} (acc {t['accuracy']})" for tier, t in row["tiers"].items())
+                print(f"classifier ≥ {row['classifier_threshold']}: accuracy {row['accuracy']}, "
+                      f"NLI {row['nli_share']:.0%}, ~{row['est_ms_per_sentence']} ms/sentence | {hits}")
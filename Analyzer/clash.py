@@ -0,0 +1,302 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+# =====================================================
+# CLASH MAPPING: WHICH CLAIM DOES EACH REBUTTAL ANSWER?
+# =====================================================
+# Claims and rebuttals are embedded once (sentence embeddings, mean-pooled
+# and L2-normalised, cached by text) and claims go into a vector index as the
+# analysis streams past them. Each rebuttal is linked to the most similar
+# earlier claim of the opposing speaker, if the cosine similarity reaches
+# CLASH_MIN_SIMILARITY. Claims the opponent never answered although they
+# spoke afterwards are reported as dropped arguments.
+#
+# The index is exact (one matrix product) up to CLASH_EXACT_MAX claims and
+# switches to random-hyperplane LSH beyond that: CLASH_LSH_TABLES tables of
+# signatures, exact cosine over the bucket candidates only. Signatures get
+# longer as the index grows (rebuilt at each doubling), so buckets stay small.
+# Queries also probe the buckets one flipped bit away for the bits whose
+# hyperplane the query lies closest to (multi-probe), which buys recall
+# without more tables.
+#
+# Embeddings are cached per sentence text, so re-analysing a debate after new
+# turns arrive only embeds the new sentences.
+
+CLASH_ENABLED = os.getenv("CLASH", "1") != "0"
+CLASH_MODEL = os.getenv("CLASH_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CLASH_MIN_SIMILARITY = float(os.getenv("CLASH_MIN_SIMILARITY", "0.35"))
+CLASH_EXACT_MAX = int(os.getenv("CLASH_EXACT_MAX", "4096"))
+CLASH_LSH_TABLES = int(os.getenv("CLASH_LSH_TABLES", "16"))
+CLASH_LSH_BITS = int(os.getenv("CLASH_LSH_BITS", "8"))  # minimum; grows with the index
+LSH_BUCKET_TARGET = 32  # claims per bucket the signature length aims for
+CLASH_LSH_PROBES = int(os.getenv("CLASH_LSH_PROBES", "3"))  # extra buckets per table (least certain bits flipped)
+CLASH_CACHE_SIZE = int(os.getenv("CLASH_CACHE_SIZE", "20000"))  # ~1.5 KB per sentence at 384 dims
+
+CLAIM, REBUTTAL = "Claim", "Rebuttal"
+SNIPPET_CHARS = 160
+
+
+# -------------------------------
+# EMBEDDINGS (cached)
+# -------------------------------
+_embedder_lock = threading.Lock()
+_embedder = None
+
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                from transformers import pipeline
+                _embedder = pipeline("feature-extraction", model=CLASH_MODEL)
+    return _embedder
+
+
+def _mean_pool(output) -> np.ndarray:
+    # feature-extraction returns [1][tokens][dim] per input. Inputs go through
+    # the model one at a time (batch_size=1): in a padded batch the pad tokens
+    # would be averaged in too, and a sentence's vector would depend on its batch.
+    tokens = np.asarray(output, dtype=np.float32).reshape(-1, np.shape(output)[-1])
+    vec = tokens.mean(axis=0)
+    return vec / (np.linalg.norm(vec) or 1.0)
+
+
+class EmbeddingCache:
+    """LRU of normalised sentence embeddings, keyed by model + text."""
+
+    def __init__(self, max_entries: int = CLASH_CACHE_SIZE, model: str = CLASH_MODEL):
+        self.max_entries = max_entries
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """[len(texts), dim] float32; only texts not seen before reach the model."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vec = self._entries.get(key)
+                if vec is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vec
+            missing = list({k: t for k, t in zip(keys, texts) if k not in found}.items())
+            self.hits += len(texts) - sum(1 for k in keys if k not in found)
+            self.misses += len(missing)
+
+        if missing:
+            outputs = get_embedder()([t for _, t in missing], batch_size=1, truncation=True)
+            with self._lock:
+                for (key, _), output in zip(missing, outputs):
+                    found[key] = self._entries[key] = _mean_pool(output)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[k] for k in keys])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"model": self.model, "entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+embedding_cache = EmbeddingCache()
+
+
+# -------------------------------
+# VECTOR INDEX (exact → LSH)
+# -------------------------------
+class ClaimIndex:
+    """Cosine search over claim vectors; exact while small, LSH candidates beyond exact_max."""
+
+    def __init__(self, exact_max: int = CLASH_EXACT_MAX, tables: int = CLASH_LSH_TABLES,
+                 bits: int = CLASH_LSH_BITS, probes: int = CLASH_LSH_PROBES, seed: int = 0):
+        self.exact_max = exact_max
+        self.tables = tables
+        self.bits = bits
+        self.probes = probes
+        self._built_at = 0
+        self.seed = seed
+        self.ids = []
+        self.speakers = []
+        self._speaker_codes = {}
+        self._vectors = None  # grown by doubling, with _codes
+        self._codes = None
+        self._planes = None
+        self._buckets = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def mode(self) -> str:
+        return "lsh" if self._buckets is not None else "exact"
+
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        # [n, tables] integer signature per table
+        bits = np.einsum("tbd,nd->ntb", self._planes, vectors) > 0
+        return bits.astype(np.int64) @ (1 << np.arange(self.bits, dtype=np.int64))
+
+    def _probe_codes(self, vector: np.ndarray) -> list[list[int]]:
+        # Per table: the query's bucket, then its least certain bits flipped
+        projections = self._planes @ vector  # [tables, bits]
+        codes = (projections > 0).astype(np.int64) @ (1 << np.arange(self.bits, dtype=np.int64))
+        uncertain = np.argsort(np.abs(projections), axis=1)[:, :min(self.probes, self.bits)]
+        return [[int(code)] + [int(code) ^ (1 << int(b)) for b in flips] for code, flips in zip(codes, uncertain)]
+
+    def _build_lsh(self):
+        n = len(self)
+        self.bits = max(self.bits, int(np.log2(n / LSH_BUCKET_TARGET)))
+        self._built_at = n
+        dim = self._vectors.shape[1]
+        rng = np.random.default_rng(self.seed)
+        self._planes = rng.standard_normal((self.tables, self.bits, dim)).astype(np.float32)
+        self._buckets = [defaultdict(list) for _ in range(self.tables)]
+        for row, sig in enumerate(self._signatures(self._vectors[:n])):
+            for table, code in enumerate(sig):
+                self._buckets[table][int(code)].append(row)
+
+    def add(self, sentence_id: int, speaker, vector: np.ndarray):
+        row = len(self.ids)
+        if self._vectors is None:
+            self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+            self._codes = np.zeros(64, dtype=np.int32)
+        elif row == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._codes = np.concatenate([self._codes, np.zeros_like(self._codes)])
+        self._vectors[row] = vector
+        self._codes[row] = self._speaker_codes.setdefault(speaker, len(self._speaker_codes))
+        self.ids.append(sentence_id)
+        self.speakers.append(speaker)
+
+        if len(self.ids) > max(self.exact_max, 2 * self._built_at):
+            self._build_lsh()
+        elif self._buckets is not None:
+            for table, code in enumerate(self._signatures(vector[None])[0]):
+                self._buckets[table][int(code)].append(row)
+
+    def search(self, vector: np.ndarray, exclude_speaker=None) -> tuple[int, float] | None:
+        """(sentence id, cosine) of the most similar claim not by exclude_speaker."""
+        if not self.ids:
+            return None
+        excluded = self._speaker_codes.get(exclude_speaker) if exclude_speaker is not None else None
+
+        if self._buckets is None:
+            n = len(self.ids)
+            sims = self._vectors[:n] @ vector
+            if excluded is not None:
+                sims[self._codes[:n] == excluded] = -np.inf
+            best = int(np.argmax(sims))
+            return (self.ids[best], float(sims[best])) if np.isfinite(sims[best]) else None
+
+        candidates = set()
+        for table, codes in enumerate(self._probe_codes(vector)):
+            for code in codes:
+                candidates.update(self._buckets[table].get(code, ()))
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        if excluded is not None:
+            rows = rows[self._codes[rows] != excluded]
+        if not len(rows):
+            return None
+
+        sims = self._vectors[rows] @ vector
+        best = int(np.argmax(sims))
+        return self.ids[rows[best]], float(sims[best])
+
+
+# -------------------------------
+# CLASH GRAPH
+# -------------------------------
+def _snippet(sentence: str) -> str:
+    return sentence if len(sentence) <= SNIPPET_CHARS else sentence[:SNIPPET_CHARS - 1] + "…"
+
+
+class ClashMapper:
+    """
+    Fed the analyzer's result rows window by window (in debate order); graph()
+    returns the rebuttal → claim links and the dropped claims so far.
+    """
+
+    def __init__(self, cache: EmbeddingCache = embedding_cache, min_similarity: float = CLASH_MIN_SIMILARITY,
+                 exact_max: int = CLASH_EXACT_MAX):
+        self.cache = cache
+        self.min_similarity = min_similarity
+        self.index = ClaimIndex(exact_max=exact_max)
+        self.count = 0
+        self.nodes = {}  # sentence id → {"id", "speaker", "type", "sentence"}
+        self.edges = []
+        self.unlinked = []
+        self.last_spoke = {}  # speaker → last sentence id
+
+    def add(self, rows: list[dict]):
+        """rows: one window of results ({"speaker", "sentence", "argument_type", ...})."""
+        picked = []
+        for row in rows:
+            self.count += 1
+            self.last_spoke[row["speaker"]] = self.count
+            if row["argument_type"] in (CLAIM, REBUTTAL):
+                picked.append((self.count, row))
+        if not picked:
+            return
+
+        vectors = self.cache.embed([row["sentence"] for _, row in picked])
+        for (sentence_id, row), vector in zip(picked, vectors):
+            speaker = row["speaker"]
+            self.nodes[sentence_id] = {"id": sentence_id, "speaker": speaker,
+                                       "type": row["argument_type"], "sentence": _snippet(row["sentence"])}
+            if row["argument_type"] == CLAIM:
+                self.index.add(sentence_id, speaker, vector)
+                continue
+
+            # Rebuttal: only earlier claims of the other side are candidates
+            match = self.index.search(vector, exclude_speaker=speaker)
+            if match is not None and match[1] >= self.min_similarity:
+                self.edges.append({"rebuttal": sentence_id, "claim": match[0], "similarity": round(match[1], 3)})
+            else:
+                self.unlinked.append(sentence_id)
+
+    def dropped(self) -> list[dict]:
+        """Claims nobody rebutted although another speaker spoke after them."""
+        answered = {edge["claim"] for edge in self.edges}
+        dropped = []
+        for claim_id, speaker in zip(self.index.ids, self.index.speakers):
+            if claim_id in answered:
+                continue
+            if any(s != speaker and last > claim_id for s, last in self.last_spoke.items()):
+                node = self.nodes[claim_id]
+                dropped.append({"claim": claim_id, "speaker": speaker, "sentence": node["sentence"]})
+        return dropped
+
+    def graph(self) -> dict:
+        dropped = self.dropped()
+        per_speaker = defaultdict(lambda: {"claims": 0, "rebuttals_linked": 0, "dropped": 0})
+        for node in self.nodes.values():
+            if node["type"] == CLAIM:
+                per_speaker[node["speaker"]]["claims"] += 1
+        for edge in self.edges:
+            per_speaker[self.nodes[edge["rebuttal"]]["speaker"]]["rebuttals_linked"] += 1
+        for item in dropped:
+            per_speaker[item["speaker"]]["dropped"] += 1
+
+        return {
+            "nodes": sorted(self.nodes.values(), key=lambda n: n["id"]),
+            "edges": self.edges,
+            "unlinked_rebuttals": self.unlinked,
+            "dropped": dropped,
+            "speakers": {str(k): v for k, v in per_speaker.items()},
+            "index": {"mode": self.index.mode, "claims": len(self.index)},
+            "min_similarity": self.min_similarity,
+            "embeddings": self.cache.stats(),
+        }
@@ -0,0 +1,289 @@
+import argparse
+import os
+from collections import defaultdict
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pa = ds = pafs = pq = None
+
+# =====================================================
+# COLUMNAR SENTENCE ARCHIVE (Parquet, hive-partitioned)
+# =====================================================
+# Every analysed debate is appended as one Parquet file:
+#   columnar/date=YYYY-MM-DD/mode=<stt|chatbot>/<debate_id>.parquet
+# Nothing is ever rewritten. Queries scan the dataset batch by batch, reading
+# only the columns they need (memory-mapped), and fold each batch into small
+# per-group counters, so memory stays flat however many sentences are stored.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COLUMNAR_DIR = os.getenv("COLUMNAR_ARCHIVE_DIR", os.path.join(BASE_DIR, "columnar"))
+COLUMNAR_ENABLED = os.getenv("COLUMNAR_ARCHIVE", "1") != "0"
+
+# Column order of the stored files; partition columns (date, mode) come from the path
+COLUMNS = [
+    ("debate_id", "string"),
+    ("created", "timestamp"),
+    ("sentence_index", "int32"),
+    ("speaker", "string"),
+    ("sentence", "string"),
+    ("sentiment", "string"),
+    ("sentiment_score", "float32"),
+    ("argument_type", "string"),
+    ("arg_confidence", "float32"),
+    ("method", "string"),
+    ("audio_start", "float32"),
+    ("audio_end", "float32"),
+    ("stt_logprob", "float32"),
+]
+GROUP_KEYS = {"speaker", "mode", "date", "debate_id", "sentiment", "argument_type", "method"}
+ARGUMENT_TYPES = ["Claim", "Evidence", "Rebuttal", "Statement"]
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The columnar archive needs pyarrow (pip install pyarrow)")
+
+
+def _schema():
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("s"),
+        "int32": pa.int32(),
+        "float32": pa.float32(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# -------------------------------
+# WRITE (append-only)
+# -------------------------------
+class ColumnarWriter:
+    """
+    Writes one debate's Parquet file a row group at a time (one per analysis
+    window), so long debates never sit in memory. The file is moved into the
+    archive only when the writer is closed without an error.
+    """
+
+    def __init__(self, mode: str, debate_id: str, created: datetime | None = None, root: str = COLUMNAR_DIR):
+        _require_pyarrow()
+        self.debate_id = debate_id
+        self.created = (created or datetime.now()).replace(microsecond=0)
+        folder = os.path.join(root, f"date={self.created.date().isoformat()}", f"mode={mode}")
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"{debate_id}.parquet")
+        # Dot prefix: dataset() ignores the file until it is complete and renamed
+        self._tmp = os.path.join(folder, f".{debate_id}.parquet.tmp")
+        self._writer = pq.ParquetWriter(self._tmp, _schema(), compression="zstd")
+        self.count = 0
+
+    def write(self, sentences: list[dict]):
+        if sentences:
+            self._writer.write_table(_table(self.debate_id, self.created, sentences, self.count))
+            self.count += len(sentences)
+
+    def close(self):
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._writer.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _table(debate_id: str, created: datetime, sentences: list[dict], first_index: int = 0):
+    columns = {
+        "debate_id": [debate_id] * len(sentences),
+        "created": [created] * len(sentences),
+        "sentence_index": list(range(first_index + 1, first_index + len(sentences) + 1)),
+        "speaker": [s.get("speaker") for s in sentences],
+        "sentence": [s.get("sentence") for s in sentences],
+        "sentiment": [s.get("sentiment") for s in sentences],
+        "sentiment_score": [_float(s.get("sentiment_score")) for s in sentences],
+        "argument_type": [s.get("argument_type") for s in sentences],
+        "arg_confidence": [_float(s.get("arg_confidence")) for s in sentences],
+        "method": [s.get("method") for s in sentences],
+        "audio_start": [_float(s.get("audio_start")) for s in sentences],
+        "audio_end": [_float(s.get("audio_end")) for s in sentences],
+        "stt_logprob": [_float(s.get("stt_logprob")) for s in sentences],
+    }
+    return pa.Table.from_pydict(columns, schema=_schema())
+
+
+def append_debate(mode: str, debate_id: str, sentences: list[dict], created: datetime | None = None,
+                  root: str = COLUMNAR_DIR) -> str:
+    """
+    Appends one debate's per-sentence results (the same dicts the JSON archive
+    stores) as a new Parquet file. Returns the file path.
+    """
+    with ColumnarWriter(mode, debate_id, created, root) as writer:
+        writer.write(sentences)
+    return writer.path
+
+
+def import_json_archive(paths: list[str], root: str = COLUMNAR_DIR) -> int:
+    """Backfills debates from the per-debate JSON archive. Returns the number imported."""
+    from Analyzer.results_archive import load_debate_results
+
+    imported = 0
+    for path in paths:
+        data = load_debate_results(path)
+        created = datetime.fromisoformat(data["created"]) if data.get("created") else None
+        append_debate(data["mode"], data["debate_id"], data["sentences"], created=created, root=root)
+        imported += 1
+    return imported
+
+
+# -------------------------------
+# READ (streaming scans)
+# -------------------------------
+def dataset(root: str = COLUMNAR_DIR):
+    _require_pyarrow()
+    return ds.dataset(
+        root,
+        format="parquet",
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([("date", pa.string()), ("mode", pa.string())]), flavor="hive"),
+        exclude_invalid_files=True,
+        ignore_prefixes=[".", "_"],
+    )
+
+
+def _filter(mode: str | None = None, since: str | None = None, until: str | None = None,
+            speaker: str | None = None):
+    # Date/mode filters prune whole partitions before any file is opened
+    expr = None
+    for part in (
+        ds.field("mode") == mode if mode else None,
+        ds.field("date") >= since if since else None,
+        ds.field("date") <= until if until else None,
+        ds.field("speaker") == speaker if speaker else None,
+    ):
+        if part is not None:
+            expr = part if expr is None else expr & part
+    return expr
+
+
+def scan(columns: list[str], root: str = COLUMNAR_DIR, batch_size: int = 64_000, **filters):
+    """Yields RecordBatches holding only the requested columns."""
+    if not os.path.isdir(root):
+        return
+    scanner = dataset(root).scanner(columns=columns, filter=_filter(**filters), batch_size=batch_size)
+    yield from scanner.to_batches()
+
+
+def count_by(keys: list[str], root: str = COLUMNAR_DIR, **filters) -> dict[tuple, int]:
+    """Sentence counts grouped by keys, e.g. ["speaker", "argument_type"]."""
+    bad = set(keys) - GROUP_KEYS
+    if bad:
+        raise ValueError(f"Cannot group by {', '.join(sorted(bad))}. Allowed: {', '.join(sorted(GROUP_KEYS))}")
+
+    totals = defaultdict(int)
+    for batch in scan(keys, root=root, **filters):
+        # Per-batch group-by keeps the working set to one batch
+        grouped = pa.Table.from_batches([batch]).group_by(keys).aggregate([([], "count_all")])
+        rows = zip(*(grouped.column(k).to_pylist() for k in keys), grouped.column("count_all").to_pylist())
+        for *group, n in rows:
+            totals[tuple(group)] += n
+    return dict(totals)
+
+
+def argument_rates(by: str = "speaker", root: str = COLUMNAR_DIR, **filters) -> list[dict]:
+    """
+    Per-group argument mix, e.g. the rebuttal rate per speaker over a season:
+    [{"speaker", "sentences", "Claim", ..., "rebuttal_rate", ...}]
+    """
+    counts = count_by([by, "argument_type"], root=root, **filters)
+
+    groups = defaultdict(lambda: defaultdict(int))
+    for (group, arg_type), n in counts.items():
+        groups[group][arg_type or "Unknown"] += n
+
+    rows = []
+    for group, mix in groups.items():
+        total = sum(mix.values())
+        row = {by: group, "sentences": total}
+        for arg_type in ARGUMENT_TYPES:
+            row[arg_type] = mix.get(arg_type, 0)
+            row[f"{arg_type.lower()}_rate"] = round(mix.get(arg_type, 0) / total, 4) if total else 0.0
+        rows.append(row)
+    return sorted(rows, key=lambda r: r["sentences"], reverse=True)
+
+
+def summary(root: str = COLUMNAR_DIR) -> dict:
+    """File, debate and sentence counts, read from Parquet footers only."""
+    if not os.path.isdir(root):
+        return {"files": 0, "sentences": 0, "bytes": 0}
+    files = dataset(root).files
+    return {
+        "files": len(files),
+        "sentences": sum(pq.ParquetFile(f, memory_map=True).metadata.num_rows for f in files),
+        "bytes": sum(os.path.getsize(f) for f in files),
+    }
+
+
+# -------------------------------
+# CLI MODE
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the columnar sentence archive")
+    parser.add_argument("--root", default=COLUMNAR_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("summary", help="files, sentences and size on disk")
+
+    imp = sub.add_parser("import", help="backfill from the JSON results archive")
+    imp.add_argument("paths", nargs="*")
+
+    for name, help_text in (("rates", "argument mix per group"), ("count", "sentence counts per group")):
+        p = sub.add_parser(name, help=help_text)
+        if name == "rates":
+            p.add_argument("--by", default="speaker", choices=sorted(GROUP_KEYS - {"argument_type"}))
+        else:
+            p.add_argument("--by", default="speaker,argument_type", help="comma-separated group keys")
+        p.add_argument("--mode", choices=["stt", "chatbot"])
+        p.add_argument("--since", help="YYYY-MM-DD")
+        p.add_argument("--until", help="YYYY-MM-DD")
+        p.add_argument("--speaker")
+
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        print(summary(args.root))
+    elif args.command == "import":
+        from Analyzer.results_archive import archived_files
+        print(f"Imported {import_json_archive(args.paths or archived_files(), root=args.root)} debates")
+    else:
+        filters = {"mode": args.mode, "since": args.since, "until": args.until, "speaker": args.speaker}
+        if args.command == "rates":
+            for row in argument_rates(args.by, root=args.root, **filters):
+                print(f"{row[args.by]!s:<20} {row['sentences']:>8}  "
+                      + "  ".join(f"{t} {row[t.lower() + '_rate']:.1%}" for t in ARGUMENT_TYPES))
+        else:
+            keys = args.by.split(",")
+            for group, n in sorted(count_by(keys, root=args.root, **filters).items(), key=lambda kv: -kv[1]):
+                print(f"{' | '.join(map(str, group)):<40} {n:>8}")
@@ -0,0 +1,50 @@
+from Analyzer.aly import analyze_debate
+from Analyzer.jobs import JOBS_ENABLED, run_analysis_job
+from Analyzer.winner import OUTPUT_FILE_CHATBOT, OUTPUT_FILE_STT, DebateScorer, write_winner_report
+
+# =====================================================
+# ONE-PASS DEBATE REPORT
+# =====================================================
+# analyze → stats → marking → winner in one pipeline: every sentence result is
+# scored as the analyzer produces it, instead of writing the report file and
+# parsing it back (once for the stats/marking, once more for the winner).
+# Files are optional; with write_files=True the analysis report, the archives
+# and the winner report are written as /analyze and /winner would.
+
+WINNER_FILES = {"stt": OUTPUT_FILE_STT, "chatbot": OUTPUT_FILE_CHATBOT}
+
+
+def build_debate_report(mode: str = "stt", debate_id: str | None = None, rubric_version: str | None = None,
+                        write_files: bool = False, include_sentences: bool = False) -> dict:
+    """
+    Returns the analysis summary plus "stats", "marking", "winner", "scores"
+    and "rubric" (and "sentences" when include_sentences=True).
+    """
+    # Rubric first: an unknown version fails before the models run
+    scorer = DebateScorer(mode, rubric_version)
+    sentences = [] if include_sentences else None
+
+    def on_row(row):
+        scorer.add(row)
+        if sentences is not None:
+            sentences.append(row)
+
+    # As a checkpointed job, a retried report resumes where the last attempt stopped
+    run = run_analysis_job if JOBS_ENABLED else analyze_debate
+    result = run(mode=mode, debate_id=debate_id, write_files=write_files, on_row=on_row)
+
+    winner_file = None
+    if write_files:
+        winner_file = WINNER_FILES[mode]
+        write_winner_report(winner_file, scorer)
+
+    report = {
+        **result,
+        "stats": scorer.stats_dict(),
+        "marking": scorer.marking(),
+        **scorer.result(),
+        "winner_file": winner_file,
+    }
+    if sentences is not None:
+        report["sentences"] = sentences
+    return report
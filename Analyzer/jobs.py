@@ -0,0 +1,410 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from Analyzer.aly import (
+    RAW_TRANSCRIPT_CHATBOT,
+    RAW_TRANSCRIPT_STT,
+    WINDOW_CHARS,
+    analyze_debate,
+    last_block_range,
+)
+from Analyzer.audio_alignment import SEGMENTS_FILE_STT
+from Analyzer.results_archive import new_debate_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: jobs are only locked within one process
+    fcntl = None
+
+# =====================================================
+# RESUMABLE ANALYSIS JOBS
+# =====================================================
+# An analysis run is a job. Every finished window (grammar, sentiment and
+# argument results of ~ANALYSIS_WINDOW_CHARS of transcript) is appended to
+# the job's checkpoint file, so if the worker dies halfway (OOM, LanguageTool
+# JVM crash, deploy) the next run of the same job replays the finished
+# windows from disk and only sends the rest to the models.
+#
+# The job id is derived from what the analysis depends on (mode, transcript
+# and segment file contents, window size; for chatbot logs only the last
+# debate block, which is all that gets analysed), so retries of the same debate
+# land on the same job. Callers may pass their own id instead. A job runs
+# once at a time: a second request for it waits for the first and then
+# replays its checkpoint, the models are not run twice.
+#
+# Per job, in JOB_DIR:
+#   <id>.json        status, debate id, counters, the result once completed
+#   <id>.ckpt.jsonl  one line per finished window
+#   <id>.lock        held (flock) while the job runs, released if the process dies
+#
+# Checkpoint lines are flushed to the OS as they are written (a killed worker
+# loses nothing) and fsync'd every CHECKPOINT_SECONDS (a machine crash loses
+# at most that much work).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+JOBS_ENABLED = os.getenv("ANALYSIS_JOBS", "1") != "0"
+JOB_DIR = os.getenv("ANALYSIS_JOB_DIR", os.path.join(BASE_DIR, "jobs"))
+CHECKPOINT_SECONDS = float(os.getenv("ANALYSIS_CHECKPOINT_SECONDS", "10"))
+JOB_KEEP = int(os.getenv("ANALYSIS_JOB_KEEP", "20"))  # newest finished jobs kept on disk
+
+JOB_ID_MAX = 100
+
+
+def valid_job_id(job_id: str) -> bool:
+    return (0 < len(job_id) <= JOB_ID_MAX and ".." not in job_id
+            and all(c.isalnum() or c in "._-" for c in job_id))
+
+
+def _input_file(mode: str, input_file: str | None) -> str:
+    return input_file or (RAW_TRANSCRIPT_CHATBOT if mode == "chatbot" else RAW_TRANSCRIPT_STT)
+
+
+def _file_digest(h, path: str, byte_range: tuple[int, int] | None = None):
+    if not os.path.exists(path):
+        h.update(b"\0missing")
+        return
+    start, end = byte_range or (0, None)
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            h.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+def job_id_for(mode: str, input_file: str | None = None, window_chars: int = WINDOW_CHARS) -> str:
+    """Deterministic job id: same transcript (and segments), same job."""
+    h = hashlib.sha256(f"{mode}|{window_chars}|".encode())
+    path = _input_file(mode, input_file)
+    if mode == "chatbot" and os.path.exists(path):
+        # The log keeps every debate; hashing it all would grow with its history
+        _file_digest(h, path, last_block_range(path))
+    else:
+        _file_digest(h, path)
+    if mode != "chatbot" and input_file is None:
+        # Punctuation and audio spans come from the stored segments
+        _file_digest(h, SEGMENTS_FILE_STT)
+    return f"{mode}-{h.hexdigest()[:20]}"
+
+
+# -------------------------------
+# CHECKPOINT FILE
+# -------------------------------
+class Checkpoint:
+    """
+    Append-only window results, keyed by iter_analysis()'s window key. Only
+    offsets are kept in memory; entries are read back when asked for.
+    """
+
+    def __init__(self, path: str, sync_seconds: float = CHECKPOINT_SECONDS):
+        self.path = path
+        self.sync_seconds = sync_seconds
+        self.offsets = {}
+        self.resumed = 0
+        self.computed = 0
+
+        valid_end = 0
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        else:
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    try:
+                        key = json.loads(line)["key"]
+                    except (ValueError, KeyError):
+                        # A crash can leave a half-written last line; that window is redone
+                        break
+                    self.offsets[key] = offset
+                    offset += len(line)
+                    valid_end = offset
+        self._file = open(path, "r+b")
+        self._file.truncate(valid_end)
+        self._file.seek(valid_end)
+        self._reader = open(path, "rb")
+        self._last_sync = time.monotonic()
+
+    def get(self, key: str) -> dict | None:
+        offset = self.offsets.get(key)
+        if offset is None:
+            return None
+        self._reader.seek(offset)
+        self.resumed += 1
+        return json.loads(self._reader.readline())["entry"]
+
+    def put(self, key: str, entry: dict):
+        self.offsets[key] = self._file.tell()
+        self._file.write((json.dumps({"key": key, "entry": entry}) + "\n").encode())
+        self._file.flush()
+        self.computed += 1
+        if time.monotonic() - self._last_sync >= self.sync_seconds:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# -------------------------------
+# JOB FILES
+# -------------------------------
+def _path(job_id: str, suffix: str, directory: str = JOB_DIR) -> str:
+    return os.path.join(directory, f"{job_id}{suffix}")
+
+
+def load_job(job_id: str, directory: str = JOB_DIR) -> dict | None:
+    if not valid_job_id(job_id):
+        return None
+    try:
+        with open(_path(job_id, ".json", directory), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_job(job: dict, directory: str = JOB_DIR):
+    job["updated"] = datetime.now().isoformat(timespec="seconds")
+    path = _path(job["job_id"], ".json", directory)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(job, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+_locks_guard = threading.Lock()
+_locks = {}  # job id → [thread lock, threads holding or waiting for it]
+
+
+class _JobLock:
+    """One runner per job: a thread lock within the process, flock across workers."""
+
+    def __init__(self, job_id: str, directory: str = JOB_DIR):
+        self.job_id = job_id
+        self.path = _path(job_id, ".lock", directory)
+        self._file = None
+
+    def __enter__(self):
+        with _locks_guard:
+            entry = _locks.setdefault(self.job_id, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        if fcntl is not None:
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        with _locks_guard:
+            entry = _locks[self.job_id]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[self.job_id]
+
+
+def _is_running(job_id: str, directory: str = JOB_DIR) -> bool:
+    with _locks_guard:
+        entry = _locks.get(job_id)
+    if entry is not None and entry[0].locked():
+        return True
+    if fcntl is None or not os.path.exists(_path(job_id, ".lock", directory)):
+        return False
+    with open(_path(job_id, ".lock", directory), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return False
+
+
+def _output_mtime(path: str | None) -> float | None:
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def job_status(job_id: str, directory: str = JOB_DIR) -> dict | None:
+    """
+    Job file; a "running" job nobody holds the lock of is reported as "interrupted".
+    Report files are shared by all jobs of a mode: once a later run has
+    replaced it, the result's output_file is None and "output_replaced" is set
+    (run the job again to rewrite it from the checkpoint).
+    """
+    job = load_job(job_id, directory)
+    if job is None:
+        return None
+    if job["status"] == "running" and not _is_running(job_id, directory):
+        job["status"] = "interrupted"
+    result = job.get("result")
+    if result and result.get("output_file") and _output_mtime(result["output_file"]) != job.get("output_mtime"):
+        result.update({"output_file": None, "output_replaced": True})
+    return job
+
+
+def list_jobs(limit: int = 20, directory: str = JOB_DIR) -> list[dict]:
+    jobs = []
+    for job_id in _job_ids(directory)[:limit]:
+        job = job_status(job_id, directory)
+        if job is not None:
+            job.pop("result", None)
+            jobs.append(job)
+    return jobs
+
+
+def _job_ids(directory: str = JOB_DIR) -> list[str]:
+    """Newest first."""
+    if not os.path.isdir(directory):
+        return []
+    files = [n for n in os.listdir(directory) if n.endswith(".json")]
+    files.sort(key=lambda n: os.path.getmtime(os.path.join(directory, n)), reverse=True)
+    return [n[: -len(".json")] for n in files]
+
+
+def prune_jobs(directory: str = JOB_DIR, keep: int = JOB_KEEP) -> int:
+    """Removes finished jobs beyond the newest keep; interrupted jobs stay resumable."""
+    removed = 0
+    finished = [j for j in _job_ids(directory) if (load_job(j, directory) or {}).get("status") == "completed"]
+    for job_id in finished[keep:]:
+        for suffix in (".json", ".ckpt.jsonl", ".lock"):
+            try:
+                os.remove(_path(job_id, suffix, directory))
+            except OSError:
+                pass
+        removed += 1
+    return removed
+
+
+# -------------------------------
+# RUNNER
+# -------------------------------
+def run_analysis_job(mode: str = "stt", job_id: str | None = None, input_file: str | None = None,
+                     output_file: str | None = None, window_chars: int = WINDOW_CHARS,
+                     debate_id: str | None = None, write_files: bool = True, on_row=None,
+                     directory: str = JOB_DIR) -> dict:
+    """
+    analyze_debate() as a resumable job. Returns its result plus "job_id",
+    "windows_resumed" (replayed from the checkpoint) and "windows_computed".
+    A completed job is replayed entirely from its checkpoint, so report
+    files and on_row see the same results without running the models.
+    """
+    if job_id is not None and not valid_job_id(job_id):
+        raise ValueError(f"job_id may only contain letters, digits, '.', '_' and '-' (max {JOB_ID_MAX})")
+    if not os.path.exists(_input_file(mode, input_file)):
+        raise FileNotFoundError(f"Input file not found: {_input_file(mode, input_file)}")
+    job_id = job_id or job_id_for(mode, input_file, window_chars)
+    os.makedirs(directory, exist_ok=True)
+
+    with _JobLock(job_id, directory):
+        job = load_job(job_id, directory) or {
+            "job_id": job_id,
+            "mode": mode,
+            "input_file": input_file,
+            "output_file": output_file,
+            "window_chars": window_chars,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "runs": 0,
+        }
+        # Keep the first run's debate id, so the archives of a resumed run replace its files
+        job["debate_id"] = debate_id or job.get("debate_id") or new_debate_id(mode)
+        job.update({"status": "running", "runs": job["runs"] + 1, "error": None})
+        job.pop("result", None)
+        _save_job(job, directory)
+
+        with Checkpoint(_path(job_id, ".ckpt.jsonl", directory)) as checkpoint:
+            try:
+                result = analyze_debate(
+                    mode=mode,
+                    input_file=input_file,
+                    output_file=output_file,
+                    window_chars=window_chars,
+                    debate_id=job["debate_id"],
+                    write_files=write_files,
+                    on_row=on_row,
+                    checkpoint=checkpoint,
+                    # Same columnar partition as the first run, so rows are replaced, not duplicated
+                    created=datetime.fromisoformat(job["created"]),
+                )
+            except Exception as e:
+                job.update({"status": "failed", "error": str(e),
+                            "windows_resumed": checkpoint.resumed, "windows_computed": checkpoint.computed})
+                _save_job(job, directory)
+                raise
+
+        result = {
+            **result,
+            "job_id": job_id,
+            "windows_resumed": checkpoint.resumed,
+            "windows_computed": checkpoint.computed,
+        }
+        job.update({"status": "completed", "windows_resumed": checkpoint.resumed,
+                    "windows_computed": checkpoint.computed, "result": result,
+                    "output_mtime": _output_mtime(result["output_file"])})
+        _save_job(job, directory)
+
+    prune_jobs(directory)
+    return result
+
+
+def resume_job(job_id: str, directory: str = JOB_DIR) -> dict:
+    """Re-runs a stored job (e.g. one left "interrupted" by a crash) with its original settings."""
+    job = load_job(job_id, directory)
+    if job is None:
+        raise KeyError(f"Unknown analysis job: {job_id}")
+    return run_analysis_job(
+        mode=job["mode"],
+        job_id=job_id,
+        input_file=job.get("input_file"),
+        output_file=job.get("output_file"),
+        window_chars=job.get("window_chars", WINDOW_CHARS),
+        debate_id=job.get("debate_id"),
+        directory=directory,
+    )
+
+
+# -------------------------------
+# CLI MODE
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable analysis jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Recent jobs and their status")
+    resume = sub.add_parser("resume", help="Finish an interrupted job from its checkpoint")
+    resume.add_argument("job_id")
+    run = sub.add_parser("run", help="Analyse the current transcript as a job")
+    run.add_argument("--mode", choices=["stt", "chatbot"], default="stt")
+    run.add_argument("--job-id")
+    sub.add_parser("prune", help=f"Delete finished jobs beyond the newest {JOB_KEEP}")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for job in list_jobs():
+            print(json.dumps(job))
+    elif args.command == "resume":
+        print(json.dumps(resume_job(args.job_id), indent=2))
+    elif args.command == "run":
+        print(json.dumps(run_analysis_job(mode=args.mode, job_id=args.job_id), indent=2))
+    else:
+        print(f"Removed {prune_jobs()} job(s)")
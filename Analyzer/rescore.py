@@ -0,0 +1,197 @@
+import argparse
+import os
+
+import numpy as np
+
+from Analyzer.results_archive import ARCHIVE_DIR, archived_files, load_debate_results
+from Analyzer.rubrics import get_rubric
+from Analyzer.transcript_parser import iter_report_entries
+from Analyzer.winner import SPEAKER_KEYS
+
+# =====================================================
+# VECTORISED RE-SCORING OF ARCHIVED DEBATES
+# =====================================================
+# Archived per-sentence outputs are encoded once into flat integer arrays
+# (debate, side, sentiment label, argument label). Applying a rubric is then a
+# weight lookup plus one np.bincount, for any number of debates.
+
+SENTIMENT_LABELS = ["POSITIVE", "NEGATIVE", "NEUTRAL"]
+ARGUMENT_LABELS = ["Claim", "Evidence", "Rebuttal", "Statement"]
+NO_SIDE = -1
+
+
+def _encode(label, vocabulary: list[str]) -> int:
+    # Unknown labels map past the end of the vocabulary and always score 0
+    try:
+        return vocabulary.index(label)
+    except ValueError:
+        return len(vocabulary)
+
+
+def _sentences_from(path: str):
+    """(mode, debate_id, [(speaker, sentiment, argument_type)]) from a JSON archive or a text report."""
+    if path.endswith(".json"):
+        data = load_debate_results(path)
+        rows = [(s["speaker"], s["sentiment"], s["argument_type"]) for s in data["sentences"]]
+        return data["mode"], data["debate_id"], rows
+
+    name = os.path.basename(path)
+    mode = "chatbot" if name.startswith("chatbot") else "stt"
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [(e["speaker"], e.get("sentiment"), e.get("argument_type")) for e in iter_report_entries(f)]
+    return mode, os.path.splitext(name)[0], rows
+
+
+def load_archive(paths: list[str] | None = None) -> dict:
+    """
+    Encodes archived debates (JSON archives and/or *_final_analysis.txt reports).
+    Returns {"debate_ids", "speakers", "debate", "side", "sentiment", "argument"}
+    where the last four are aligned per-sentence arrays.
+    """
+    paths = paths if paths is not None else archived_files(ARCHIVE_DIR)
+
+    debate_ids, speakers = [], []
+    debate, side, sentiment, argument = [], [], [], []
+
+    for path in paths:
+        mode, debate_id, rows = _sentences_from(path)
+        keys = SPEAKER_KEYS.get(mode, SPEAKER_KEYS["stt"])
+        idx = len(debate_ids)
+        debate_ids.append(debate_id)
+        speakers.append(keys)
+
+        for speaker, sent_label, arg_label in rows:
+            # Same rule as winner.py: a sentence counts only with a known speaker and argument type
+            if speaker not in keys or not arg_label:
+                continue
+            debate.append(idx)
+            side.append(keys.index(speaker))
+            sentiment.append(_encode(sent_label, SENTIMENT_LABELS))
+            argument.append(_encode(arg_label, ARGUMENT_LABELS))
+
+    return {
+        "debate_ids": debate_ids,
+        "speakers": speakers,
+        "debate": np.asarray(debate, dtype=np.int32),
+        "side": np.asarray(side, dtype=np.int8),
+        "sentiment": np.asarray(sentiment, dtype=np.int8),
+        "argument": np.asarray(argument, dtype=np.int8),
+    }
+
+
+def save_encoded(archive: dict, path: str):
+    """Caches an encoded archive as .npz so later runs skip parsing entirely."""
+    np.savez_compressed(
+        path,
+        debate_ids=np.asarray(archive["debate_ids"]),
+        speakers=np.asarray(archive["speakers"]),
+        debate=archive["debate"],
+        side=archive["side"],
+        sentiment=archive["sentiment"],
+        argument=archive["argument"],
+    )
+
+
+def load_encoded(path: str) -> dict:
+    data = np.load(path)
+    return {
+        "debate_ids": data["debate_ids"].tolist(),
+        "speakers": data["speakers"].tolist(),
+        "debate": data["debate"],
+        "side": data["side"],
+        "sentiment": data["sentiment"],
+        "argument": data["argument"],
+    }
+
+
+# -------------------------------
+# SCORING
+# -------------------------------
+def _weights(table: dict, vocabulary: list[str]) -> np.ndarray:
+    return np.array([float(table.get(label, 0.0)) for label in vocabulary] + [0.0])
+
+
+def rescore(archive: dict, rubric_version: str | None = None) -> dict:
+    """
+    Recomputes both speakers' totals and the winner of every archived debate.
+    Returns {"rubric", "scores": float[n, 2], "winner": int[n]} where winner is
+    0 / 1 for the first / second speaker and -1 for a draw.
+    """
+    rubric = get_rubric(rubric_version)
+    n = len(archive["debate_ids"])
+
+    points = (
+        _weights(rubric["sentiment"], SENTIMENT_LABELS)[archive["sentiment"]]
+        + _weights(rubric["argument"], ARGUMENT_LABELS)[archive["argument"]]
+    )
+    group = archive["debate"].astype(np.int64) * 2 + archive["side"]
+    scores = np.bincount(group, weights=points, minlength=2 * n).reshape(n, 2)
+
+    winner = np.where(scores[:, 0] > scores[:, 1], 0, np.where(scores[:, 1] > scores[:, 0], 1, NO_SIDE))
+    return {"rubric": rubric["version"], "scores": scores, "winner": winner}
+
+
+def _winner_name(archive: dict, i: int, side: int) -> str:
+    return "Draw" if side == NO_SIDE else archive["speakers"][i][side]
+
+
+def results_table(archive: dict, result: dict) -> list[dict]:
+    return [
+        {
+            "debate_id": debate_id,
+            "scores": dict(zip(archive["speakers"][i], np.round(result["scores"][i], 3).tolist())),
+            "winner": _winner_name(archive, i, int(result["winner"][i])),
+        }
+        for i, debate_id in enumerate(archive["debate_ids"])
+    ]
+
+
+def compare_rubrics(archive: dict, version_a: str, version_b: str) -> dict:
+    """What-if: which debates change winner when switching from rubric a to rubric b."""
+    a = rescore(archive, version_a)
+    b = rescore(archive, version_b)
+    changed = np.flatnonzero(a["winner"] != b["winner"])
+
+    def mean_margin(result):
+        margins = np.abs(result["scores"][:, 0] - result["scores"][:, 1])
+        return round(float(margins.mean()), 3) if len(margins) else 0.0
+
+    return {
+        "rubrics": [a["rubric"], b["rubric"]],
+        "debates": len(archive["debate_ids"]),
+        "winner_changes": int(len(changed)),
+        "mean_margin": [mean_margin(a), mean_margin(b)],
+        "changed": [
+            {
+                "debate_id": archive["debate_ids"][i],
+                "before": _winner_name(archive, i, int(a["winner"][i])),
+                "after": _winner_name(archive, i, int(b["winner"][i])),
+            }
+            for i in changed
+        ],
+    }
+
+
+# -------------------------------
+# CLI MODE
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score archived debates under a rubric")
+    parser.add_argument("paths", nargs="*", help="archive JSON files or *_final_analysis.txt reports "
+                                                 "(default: everything in the analysis archive)")
+    parser.add_argument("--rubric", default=None, help="rubric version (default: active rubric)")
+    parser.add_argument("--compare", default=None, help="second rubric version for a what-if comparison")
+    args = parser.parse_args()
+
+    archive = load_archive(args.paths or None)
+
+    if args.compare:
+        report = compare_rubrics(archive, args.rubric or get_rubric()["version"], args.compare)
+        print(f"{report['winner_changes']} of {report['debates']} winners change "
+              f"({report['rubrics'][0]} → {report['rubrics'][1]})")
+        for row in report["changed"]:
+            print(f"  {row['debate_id']}: {row['before']} → {row['after']}")
+    else:
+        result = rescore(archive, args.rubric)
+        for row in results_table(archive, result):
+            print(f"{row['debate_id']}: {row['winner']}  {row['scores']}")
@@ -0,0 +1,95 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+# -------------------------------
+# PER-SENTENCE RESULT ARCHIVE
+# -------------------------------
+# Every analysis run stores its raw per-sentence model outputs, so scores and
+# winners can be recomputed later (new rubric weights) without re-running the
+# transformer models. One JSON file per debate:
+#   archive/<mode>/<debate_id>.json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.getenv("ANALYSIS_ARCHIVE_DIR", os.path.join(BASE_DIR, "archive"))
+
+
+def new_debate_id(mode: str) -> str:
+    return f"{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+
+
+class DebateResultsWriter:
+    """
+    Writes one archive file sentence by sentence, so a debate of any length
+    is archived without holding its results in memory. The file appears
+    (atomically) only when the writer is closed without an error.
+    """
+
+    def __init__(self, mode: str, debate_id: str | None = None, archive_dir: str = ARCHIVE_DIR):
+        self.debate_id = debate_id or new_debate_id(mode)
+        folder = os.path.join(archive_dir, mode)
+        os.makedirs(folder, exist_ok=True)
+
+        self.path = os.path.join(folder, f"{self.debate_id}.json")
+        self._tmp = self.path + ".tmp"
+        self._file = open(self._tmp, "w", encoding="utf-8")
+        header = json.dumps({
+            "debate_id": self.debate_id,
+            "mode": mode,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._file.write(header[:-1] + ', "sentences": [')
+        self.count = 0
+
+    def write(self, sentence: dict):
+        if self.count:
+            self._file.write(", ")
+        self._file.write(json.dumps(sentence))
+        self.count += 1
+
+    def close(self):
+        self._file.write("]}")
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def save_debate_results(mode: str, sentences: list[dict], debate_id: str | None = None,
+                        archive_dir: str = ARCHIVE_DIR) -> str:
+    """
+    sentences: [{"speaker", "sentence", "sentiment", "sentiment_score",
+                 "argument_type", "arg_confidence", "method"}, ...]
+    Returns the archive file path.
+    """
+    with DebateResultsWriter(mode, debate_id, archive_dir) as writer:
+        for sentence in sentences:
+            writer.write(sentence)
+    return writer.path
+
+
+def archived_files(archive_dir: str = ARCHIVE_DIR) -> list[str]:
+    return sorted(glob.glob(os.path.join(archive_dir, "*", "*.json")))
+
+
+def latest_archive_file(mode: str, archive_dir: str = ARCHIVE_DIR) -> str | None:
+    # Custom debate ids do not sort by time; the newest write wins
+    files = glob.glob(os.path.join(archive_dir, mode, "*.json"))
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def load_debate_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
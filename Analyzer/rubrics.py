@@ -0,0 +1,73 @@
+import json
+import os
+
+# -------------------------------
+# SCORING RUBRICS (versioned)
+# -------------------------------
+# "v1" is the original weighting used by winner.py and the API marking.
+# More versions can be added without code changes through a JSON file:
+#
+#   {
+#     "active": "v2",
+#     "rubrics": {
+#       "v2": {"sentiment": {"POSITIVE": 1, "NEGATIVE": 0.5},
+#              "argument": {"Claim": 2, "Evidence": 2, "Rebuttal": 1.5}}
+#     }
+#   }
+#
+# Labels missing from a rubric score 0. RUBRIC_VERSION overrides "active".
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUBRICS_FILE = os.getenv("RUBRICS_FILE", os.path.join(BASE_DIR, "rubrics.json"))
+
+BUILTIN_RUBRICS = {
+    "v1": {
+        "sentiment": {
+            "POSITIVE": 1.0,
+            "NEGATIVE": 1.0,
+            "NEUTRAL": 0.0
+        },
+        "argument": {
+            "Claim": 1.5,
+            "Evidence": 1.5,
+            "Rebuttal": 1.0,
+            "Statement": 0.0
+        },
+    },
+}
+DEFAULT_RUBRIC_VERSION = "v1"
+
+
+def _load_file() -> dict:
+    if not os.path.exists(RUBRICS_FILE):
+        return {}
+    with open(RUBRICS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_rubrics() -> dict:
+    """All known rubrics by version (built-in first, file entries override)."""
+    rubrics = {k: dict(v) for k, v in BUILTIN_RUBRICS.items()}
+    rubrics.update(_load_file().get("rubrics", {}))
+    return rubrics
+
+
+def active_rubric_version() -> str:
+    return os.getenv("RUBRIC_VERSION") or _load_file().get("active") or DEFAULT_RUBRIC_VERSION
+
+
+def get_rubric(version: str | None = None) -> dict:
+    """
+    Returns {"version", "sentiment": {label: points}, "argument": {label: points}}.
+    version=None → the active rubric.
+    """
+    version = version or active_rubric_version()
+    rubrics = list_rubrics()
+    if version not in rubrics:
+        raise ValueError(f"Unknown rubric '{version}'. Available: {', '.join(rubrics)}")
+    rubric = rubrics[version]
+    return {
+        "version": version,
+        "sentiment": dict(rubric.get("sentiment", {})),
+        "argument": dict(rubric.get("argument", {})),
+    }
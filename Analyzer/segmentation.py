@@ -0,0 +1,163 @@
+import math
+import os
+import re
+
+# -------------------------------
+# CONFIG
+# -------------------------------
+# A silence this long between two whisper segments ends a sentence
+PAUSE_SECONDS = float(os.getenv("SEGMENT_PAUSE_SECONDS", "0.6"))
+
+# Upper bound per chunk in model tokens, special tokens included. The
+# transformer pipelines silently truncate at 512; shorter chunks also keep
+# batches evenly sized.
+MAX_CHUNK_TOKENS = int(os.getenv("SEGMENT_MAX_TOKENS", "128"))
+SPECIAL_TOKENS = 2  # [CLS] ... [SEP]
+
+# Cut points are moved back to a clause boundary (",", ";", ":") when one is
+# within this share of the target chunk length
+CLAUSE_SNAP = 0.25
+
+TERMINAL = (".", "?", "!")
+CLAUSE_END = (",", ";", ":")
+_FIRST_LETTER = re.compile(r"[a-z]")
+
+
+# =====================================================
+# 1. SENTENCE BOUNDARIES FROM PROSODY (STT mode)
+# =====================================================
+def punctuate_segments(segments: list[dict], pause: float = PAUSE_SECONDS) -> str:
+    """
+    Joins whisper segments like segments_text() does, but ends a sentence at
+    every pause >= pause seconds that has no terminal punctuation yet, and
+    capitalises the word after it. Words are never added or removed.
+    """
+    pieces = []
+    sentence_start = True
+    for i, seg in enumerate(segments):
+        text = seg["text"].strip()
+        if not text:
+            continue
+        if sentence_start:
+            text = _FIRST_LETTER.sub(lambda m: m.group().upper(), text, count=1)
+
+        nxt = segments[i + 1] if i + 1 < len(segments) else None
+        if nxt is not None and nxt["start"] - seg["end"] >= pause and not text.endswith(TERMINAL):
+            text = text.rstrip(",;:") + "."
+
+        pieces.append(text)
+        sentence_start = text.endswith(TERMINAL)
+    return " ".join(pieces).strip()
+
+
+def restore_turn_punctuation(raw_text: str, turns: list[dict], pause: float = PAUSE_SECONDS,
+                             first_turn: int = 0) -> tuple[str, int]:
+    """
+    Replaces each turn's plain text in the transcript with its prosody-
+    punctuated version. Turns whose text is no longer found verbatim (edited
+    transcript, or a turn cut across windows) are left as they are.
+    Returns (text, index after the last replaced turn) so a transcript read in
+    windows continues with the next turn.
+    """
+    pos = 0
+    out = []
+    next_turn = first_turn
+    for i in range(first_turn, len(turns)):
+        turn = turns[i]
+        plain = (turn.get("text") or "").strip()
+        segments = turn.get("segments") or []
+        if not plain or not segments:
+            continue
+        at = raw_text.find(plain, pos)
+        if at < 0:
+            continue
+        out.append(raw_text[pos:at])
+        out.append(punctuate_segments(segments, pause))
+        pos = at + len(plain)
+        next_turn = i + 1
+    out.append(raw_text[pos:])
+    return "".join(out), next_turn
+
+
+# =====================================================
+# 2. LENGTH-AWARE CHUNKING
+# =====================================================
+def approx_word_tokens(word: str) -> int:
+    """WordPiece-like estimate when no tokenizer is at hand."""
+    core = sum(c.isalnum() for c in word)
+    punct = len(word) - core
+    return max(1, math.ceil(core / 6)) + punct
+
+
+def tokenizer_word_counter(tokenizer):
+    """Per-word token counter backed by a Hugging Face tokenizer."""
+    def count(word: str) -> int:
+        return max(1, len(tokenizer.tokenize(word)))
+    return count
+
+
+def _greedy_cuts(costs: list[int], limit: int) -> list[int]:
+    """Fills each chunk up to limit: the fewest chunks possible (an over-long word stands alone)."""
+    cuts = []
+    acc = 0
+    for i, cost in enumerate(costs):
+        if acc and acc + cost > limit:
+            cuts.append(i)
+            acc = 0
+        acc += cost
+    return cuts
+
+
+def _cut_points(costs: list[int], pieces: int, limit: int, words: list[str]) -> list[int]:
+    total = sum(costs)
+    target = total / pieces
+    cuts = []
+    acc = 0
+    last_clause = None
+    for i, cost in enumerate(costs):
+        acc += cost
+        if words[i].endswith(CLAUSE_END):
+            last_clause = (i + 1, acc)
+        if len(cuts) < pieces - 1 and acc >= target * (len(cuts) + 1):
+            cut = i + 1
+            if last_clause and acc - last_clause[1] <= target * CLAUSE_SNAP and last_clause[0] > (cuts[-1] if cuts else 0):
+                cut = last_clause[0]
+            cuts.append(cut)
+    return cuts
+
+
+def split_to_token_limit(sentence: str, max_tokens: int = MAX_CHUNK_TOKENS,
+                         count_word=approx_word_tokens) -> list[str]:
+    """
+    Splits a sentence into the fewest chunks of at most max_tokens, with chunk
+    lengths as even as possible at that count (cuts prefer clause boundaries;
+    when even cuts would overflow, chunks are filled greedily). Joining the
+    chunks with spaces gives back every word of the sentence.
+    """
+    words = sentence.split()
+    costs = [count_word(w) for w in words]
+    limit = max(1, max_tokens - SPECIAL_TOKENS)
+    if sum(costs) <= limit:
+        return [sentence]
+
+    # Greedy packing gives the fewest chunks; then try to cut that many evenly
+    greedy = _greedy_cuts(costs, limit)
+    cuts = _cut_points(costs, len(greedy) + 1, limit, words)
+    bounds = [0, *cuts, len(words)]
+    spans = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+    # A single over-long word can not be split further; everything else must fit
+    if len(spans) != len(greedy) + 1 or not all(sum(costs[a:b]) <= limit or b - a == 1 for a, b in spans):
+        # The even cuts overflow a chunk: keep the chunk count, give up evenness
+        bounds = [0, *greedy, len(words)]
+        spans = list(zip(bounds, bounds[1:]))
+    return [" ".join(words[a:b]) for a, b in spans]
+
+
+def chunk_sentences(records: list[tuple], max_tokens: int = MAX_CHUNK_TOKENS,
+                    count_word=approx_word_tokens) -> list[tuple]:
+    """(speaker, sentence) pairs → same pairs with over-long sentences split."""
+    chunked = []
+    for speaker, sentence in records:
+        for chunk in split_to_token_limit(sentence, max_tokens, count_word):
+            chunked.append((speaker, chunk))
+    return chunked
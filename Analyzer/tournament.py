@@ -0,0 +1,225 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+# -------------------------------
+# PATHS & RATING CONFIG
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TOURNAMENT_DB = os.getenv("TOURNAMENT_DB", os.path.join(BASE_DIR, "tournament.db"))
+
+INITIAL_RATING = 1500.0
+ELO_K = float(os.getenv("TOURNAMENT_ELO_K", "32"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS speakers (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    rating      REAL NOT NULL,
+    debates     INTEGER NOT NULL DEFAULT 0,
+    wins        INTEGER NOT NULL DEFAULT 0,
+    losses      INTEGER NOT NULL DEFAULT 0,
+    draws       INTEGER NOT NULL DEFAULT 0,
+    total_score REAL NOT NULL DEFAULT 0,
+    last_played TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_speakers_rating ON speakers (rating DESC);
+
+CREATE TABLE IF NOT EXISTS debates (
+    id        TEXT PRIMARY KEY,
+    played_at TEXT NOT NULL,
+    mode      TEXT NOT NULL,
+    topic     TEXT,
+    winner    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_debates_played ON debates (played_at);
+
+CREATE TABLE IF NOT EXISTS results (
+    debate_id     TEXT NOT NULL REFERENCES debates (id),
+    speaker_id    INTEGER NOT NULL REFERENCES speakers (id),
+    opponent_id   INTEGER NOT NULL REFERENCES speakers (id),
+    played_at     TEXT NOT NULL,
+    score         REAL NOT NULL,
+    outcome       REAL NOT NULL,
+    rating_before REAL NOT NULL,
+    rating_after  REAL NOT NULL,
+    PRIMARY KEY (debate_id, speaker_id)
+);
+CREATE INDEX IF NOT EXISTS idx_results_speaker ON results (speaker_id, played_at);
+CREATE INDEX IF NOT EXISTS idx_results_pair ON results (speaker_id, opponent_id, played_at);
+"""
+
+
+_initialized = set()
+
+
+def _connect(db_path: str = TOURNAMENT_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if db_path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _initialized.add(db_path)
+    return conn
+
+
+def _speaker(conn: sqlite3.Connection, name: str) -> sqlite3.Row:
+    conn.execute("INSERT OR IGNORE INTO speakers (name, rating) VALUES (?, ?)", (name, INITIAL_RATING))
+    return conn.execute("SELECT * FROM speakers WHERE name = ?", (name,)).fetchone()
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+# =====================================================
+# RECORDING (incremental: O(1) work per debate)
+# =====================================================
+def record_debate(debate_id: str, scores: dict, mode: str = "stt", topic: str | None = None,
+                  played_at: str | None = None, db_path: str = TOURNAMENT_DB) -> dict:
+    """
+    Stores one two-speaker debate and updates both speakers' Elo rating and
+    running totals in the same transaction.
+    scores: {"speaker name": total score}. The higher score wins, equal is a draw.
+    Recording an already stored debate_id is a no-op that returns the stored result.
+    """
+    if len(scores) != 2:
+        raise ValueError("A debate needs exactly two speakers")
+
+    played_at = played_at or datetime.now().isoformat(timespec="seconds")
+    (name_a, score_a), (name_b, score_b) = scores.items()
+
+    outcome_a = 1.0 if score_a > score_b else 0.0 if score_a < score_b else 0.5
+    winner = name_a if outcome_a == 1.0 else name_b if outcome_a == 0.0 else "Draw"
+
+    with closing(_connect(db_path)) as conn, conn:
+        # Claiming the debate id is the transaction's first write: it takes the
+        # database write lock, so a concurrent recording of the same debate sees
+        # the row and backs off, and the ratings read below cannot change under us
+        claimed = conn.execute(
+            "INSERT OR IGNORE INTO debates (id, played_at, mode, topic, winner) VALUES (?, ?, ?, ?, ?)",
+            (debate_id, played_at, mode, topic, winner),
+        ).rowcount
+        if not claimed:
+            existing = conn.execute("SELECT * FROM debates WHERE id = ?", (debate_id,)).fetchone()
+            return {**dict(existing), "recorded": False}
+
+        a = _speaker(conn, name_a)
+        b = _speaker(conn, name_b)
+
+        new_a = a["rating"] + ELO_K * (outcome_a - expected_score(a["rating"], b["rating"]))
+        new_b = b["rating"] + ELO_K * ((1 - outcome_a) - expected_score(b["rating"], a["rating"]))
+
+        for me, opp, score, outcome, new_rating in (
+            (a, b, score_a, outcome_a, new_a),
+            (b, a, score_b, 1 - outcome_a, new_b),
+        ):
+            conn.execute(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (debate_id, me["id"], opp["id"], played_at, score, outcome, me["rating"], new_rating),
+            )
+            conn.execute(
+                """
+                UPDATE speakers SET
+                    rating = ?, debates = debates + 1,
+                    wins = wins + ?, losses = losses + ?, draws = draws + ?,
+                    total_score = total_score + ?,
+                    last_played = MAX(COALESCE(last_played, ''), ?)
+                WHERE id = ?
+                """,
+                (new_rating, int(outcome == 1.0), int(outcome == 0.0), int(outcome == 0.5),
+                 score, played_at, me["id"]),
+            )
+
+    return {
+        "id": debate_id,
+        "played_at": played_at,
+        "mode": mode,
+        "topic": topic,
+        "winner": winner,
+        "ratings": {name_a: round(new_a, 1), name_b: round(new_b, 1)},
+        "recorded": True,
+    }
+
+
+# =====================================================
+# QUERIES (index lookups, independent of archive size)
+# =====================================================
+def _speaker_dict(row: sqlite3.Row) -> dict:
+    d = dict(row)
+    d.pop("id", None)
+    d["rating"] = round(d["rating"], 1)
+    d["avg_score"] = round(d["total_score"] / d["debates"], 3) if d["debates"] else 0.0
+    return d
+
+
+def leaderboard(limit: int = 20, offset: int = 0, db_path: str = TOURNAMENT_DB) -> list[dict]:
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT * FROM speakers ORDER BY rating DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+    return [{"rank": offset + i + 1, **_speaker_dict(r)} for i, r in enumerate(rows)]
+
+
+def speaker_trend(name: str, limit: int = 20, db_path: str = TOURNAMENT_DB) -> dict | None:
+    """Speaker totals plus their most recent debates, newest first."""
+    with closing(_connect(db_path)) as conn:
+        me = conn.execute("SELECT * FROM speakers WHERE name = ?", (name,)).fetchone()
+        if me is None:
+            return None
+        rows = conn.execute(
+            """
+            SELECT r.debate_id, r.played_at, r.score, r.outcome, r.rating_after, o.name AS opponent
+            FROM results r JOIN speakers o ON o.id = r.opponent_id
+            WHERE r.speaker_id = ?
+            ORDER BY r.played_at DESC LIMIT ?
+            """,
+            (me["id"], limit),
+        ).fetchall()
+    return {
+        **_speaker_dict(me),
+        "recent": [{**dict(r), "rating_after": round(r["rating_after"], 1)} for r in rows],
+    }
+
+
+def head_to_head(name_a: str, name_b: str, limit: int = 50, db_path: str = TOURNAMENT_DB) -> dict:
+    """All-time record between two speakers plus their most recent meetings."""
+    pair_join = """
+        FROM results r
+        JOIN speakers a ON a.id = r.speaker_id AND a.name = ?
+        JOIN speakers b ON b.id = r.opponent_id AND b.name = ?
+    """
+    with closing(_connect(db_path)) as conn:
+        totals = conn.execute(
+            f"""
+            SELECT COALESCE(SUM(r.outcome = 1.0), 0) AS wins,
+                   COALESCE(SUM(r.outcome = 0.0), 0) AS losses,
+                   COALESCE(SUM(r.outcome = 0.5), 0) AS draws
+            {pair_join}
+            """,
+            (name_a, name_b),
+        ).fetchone()
+        rows = conn.execute(
+            f"""
+            SELECT r.debate_id, r.played_at, r.score, opp.score AS opponent_score
+            {pair_join}
+            JOIN results opp ON opp.debate_id = r.debate_id AND opp.speaker_id = b.id
+            ORDER BY r.played_at DESC LIMIT ?
+            """,
+            (name_a, name_b, limit),
+        ).fetchall()
+
+    return {
+        "speakers": [name_a, name_b],
+        "wins": {name_a: totals["wins"], name_b: totals["losses"]},
+        "draws": totals["draws"],
+        "recent": [
+            {
+                "debate_id": r["debate_id"],
+                "played_at": r["played_at"],
+                "scores": {name_a: r["score"], name_b: r["opponent_score"]},
+            }
+            for r in rows
+        ],
+    }
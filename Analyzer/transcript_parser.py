@@ -0,0 +1,197 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import nltk
+
+# =====================================================
+# SHARED TRANSCRIPT / REPORT PARSER
+# =====================================================
+# One linear pass over a transcript (or an analysis report) used by the
+# analyzer, the winner module and the API. Both parsers accept a whole string
+# or any iterable of lines (an open file), so huge inputs are never loaded at once.
+
+# "USER:", "DEBATE GPT:", "User 1:" ... at the start of a line
+LABEL_AT_START = re.compile(r"^[ \t]*(USER|DEBATE GPT|User \d+)[ \t]*:")
+LABEL_ANYWHERE = re.compile(r"(USER|DEBATE GPT|User \d+)[ \t]*:")
+
+SentenceRecord = namedtuple("SentenceRecord", ["speaker", "turn", "sentence", "start", "end"])
+
+
+# -------------------------------
+# NLTK (cached)
+# -------------------------------
+_nltk_ready = False
+
+
+def setup_nltk():
+    """Downloads punkt data once per process; later calls are free."""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+
+    try:
+        nltk.data.find("tokenizers/punkt")
+    except LookupError:
+        nltk.download("punkt")
+
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        nltk.download("punkt_tab")
+
+    _nltk_ready = True
+
+
+@lru_cache(maxsize=1)
+def sentence_tokenizer():
+    """Punkt tokenizer loaded once; span_tokenize keeps character offsets."""
+    setup_nltk()
+    try:
+        return nltk.tokenize.PunktTokenizer("english")
+    except AttributeError:
+        # NLTK < 3.8.2
+        return nltk.data.load("tokenizers/punkt/english.pickle")
+
+
+# -------------------------------
+# TRANSCRIPT → SENTENCE RECORDS
+# -------------------------------
+def _lines(source):
+    if isinstance(source, str):
+        return source.splitlines(keepends=True)
+    return source
+
+
+def _is_header(stripped: str) -> bool:
+    return stripped.startswith("[") or stripped.startswith("===") or stripped.startswith("Topic:")
+
+
+def iter_sentences(source, offset: int = 0, speaker: str | None = None, turn: int = 0):
+    """
+    Yields SentenceRecord(speaker, turn, sentence, start, end) for a transcript.
+
+    - Speaker labels must start a line; the text may follow on the same line.
+    - "[timestamp]", "=====" and "Topic:" lines are headers and end a block.
+    - Text before the first label gets speaker None and turn 0.
+    - start/end are character offsets into the source (plus offset), so
+      sentence == source[start:end] for string input.
+    - speaker/turn continue a transcript that was cut into windows mid-turn.
+    """
+    tokenizer = sentence_tokenizer()
+
+    block = []
+    block_start = offset
+    pos = offset
+
+    def flush():
+        text = "".join(block)
+        for s, e in tokenizer.span_tokenize(text):
+            raw = text[s:e]
+            sentence = raw.strip()
+            if sentence:
+                start = block_start + s + (len(raw) - len(raw.lstrip()))
+                yield SentenceRecord(speaker, turn, sentence, start, start + len(sentence))
+
+    for line in _lines(source):
+        stripped = line.strip()
+        label = LABEL_AT_START.match(line)
+
+        if label or _is_header(stripped):
+            if block:
+                yield from flush()
+                block = []
+            if label:
+                speaker = label.group(1)
+                turn += 1
+                block = [line[label.end():]]
+                block_start = pos + label.end()
+        else:
+            if not block:
+                block_start = pos
+            block.append(line)
+
+        pos += len(line)
+
+    if block:
+        yield from flush()
+
+
+# -------------------------------
+# ANALYSIS REPORT → SENTENCE ENTRIES
+# -------------------------------
+REPORT_FIELDS = {
+    "Corrected Text": "text",
+    "Sentiment": "sentiment",
+    "Confidence": "confidence",
+    "Argument Type": "argument_type",
+    "Arg Confidence": "arg_confidence",
+    "Detected By": "method",
+    "Audio Span": "audio_span",
+    "STT Confidence": "stt_confidence",
+}
+SENTENCE_HEADER = re.compile(r"^Sentence (\d+):$")
+
+
+def speaker_of(text: str) -> str | None:
+    """Speaker label at the start of the text, else the last label inside it."""
+    match = LABEL_AT_START.match(text)
+    if match:
+        return match.group(1)
+    labels = LABEL_ANYWHERE.findall(text)
+    return labels[-1] if labels else None
+
+
+def _finish_entry(entry: dict) -> dict:
+    entry["text"] = "\n".join(entry["text"])
+    entry["speaker"] = speaker_of(entry["text"])
+    for key in ("confidence", "arg_confidence", "stt_confidence"):
+        try:
+            entry[key] = float(entry[key]) if entry.get(key) not in (None, "None") else None
+        except ValueError:
+            entry[key] = None
+    return entry
+
+
+def iter_report_entries(source):
+    """
+    Yields one dict per "Sentence N:" block of an analyzer report:
+    index, speaker, text, sentiment, confidence, argument_type,
+    arg_confidence, method (+ audio_span, stt_confidence for STT).
+    """
+    entry = None
+    field = None
+
+    for line in _lines(source):
+        stripped = line.strip()
+
+        header = SENTENCE_HEADER.match(stripped)
+        if header:
+            if entry:
+                yield _finish_entry(entry)
+            entry = {"index": int(header.group(1)), "text": []}
+            field = None
+            continue
+
+        if entry is None or not stripped:
+            continue
+
+        if stripped.startswith("---"):
+            yield _finish_entry(entry)
+            entry = None
+            continue
+
+        key, sep, value = stripped.partition(":")
+        name = REPORT_FIELDS.get(key.strip()) if sep else None
+        if name == "text":
+            entry["text"].append(value.strip())
+            field = "text"
+        elif name:
+            entry[name] = value.strip()
+            field = name
+        elif field == "text":
+            # Wrapped corrected text
+            entry["text"].append(stripped)
+
+    if entry:
+        yield _finish_entry(entry)
@@ -1,5 +1,7 @@
 from collections import defaultdict
 import os
+from Analyzer.rubrics import get_rubric
+from Analyzer.transcript_parser import iter_report_entries
 
 # -------------------------------
 # PATHS
@@ -7,41 +9,126 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
 
+DATA_DIR = os.getenv("DEBATE_DATA_DIR") or BASE_DIR  # see Analyzer/aly.py
+
 # STT files
-INPUT_FILE_STT = os.path.join(BASE_DIR, "debate_final_analysis.txt")
-OUTPUT_FILE_STT = os.path.join(BASE_DIR, "debate_final_winner.txt")
+INPUT_FILE_STT = os.path.join(DATA_DIR, "debate_final_analysis.txt")
+OUTPUT_FILE_STT = os.path.join(DATA_DIR, "debate_final_winner.txt")
 
 # Chatbot files
-INPUT_FILE_CHATBOT = os.path.join(BASE_DIR, "chatbot_final_analysis.txt")
-OUTPUT_FILE_CHATBOT = os.path.join(BASE_DIR, "chatbot_final_winner.txt")
+INPUT_FILE_CHATBOT = os.path.join(DATA_DIR, "chatbot_final_analysis.txt")
+OUTPUT_FILE_CHATBOT = os.path.join(DATA_DIR, "chatbot_final_winner.txt")
 
 
 # -------------------------------
-# SCORING RULES
+# SCORING RULES (see Analyzer/rubrics.py)
 # -------------------------------
-SENTIMENT_SCORE = {
-    "POSITIVE": 1,
-    "NEGATIVE": 1,
-    "NEUTRAL": 0
+SPEAKER_KEYS = {
+    "stt": ["User 1", "User 2"],
+    "chatbot": ["USER", "DEBATE GPT"],
 }
 
-ARGUMENT_SCORE = {
-    "Claim": 1.5,
-    "Evidence": 1.5,
-    "Rebuttal": 1,
-    "Statement": 0
-}
+
+# =====================================================
+# SCORING (shared by the report file and in-memory pipelines)
+# =====================================================
+def marking_points(stats: dict, rubric: dict) -> dict:
+    """
+    {speaker: {label: count}} → {speaker: {"total", "sentiment_points", "argument_points"}}
+    """
+    marking = {}
+    for user, counts in stats.items():
+        sentiment_points = sum(rubric["sentiment"].get(k, 0) * float(v) for k, v in counts.items())
+        argument_points = sum(rubric["argument"].get(k, 0) * float(v) for k, v in counts.items())
+        marking[user] = {
+            "total": round(sentiment_points + argument_points, 3),
+            "sentiment_points": round(sentiment_points, 3),
+            "argument_points": round(argument_points, 3),
+        }
+    return marking
+
+
+class DebateScorer:
+    """
+    Running per-speaker scores and label counts, fed one sentence at a time,
+    either from report entries or straight from the analyzer's result rows.
+    """
+
+    def __init__(self, mode: str = "stt", rubric_version: str | None = None):
+        self.mode = mode
+        self.rubric = get_rubric(rubric_version)
+        # STT uses "User 1" / "User 2"; chatbot uses "USER" / "DEBATE GPT"
+        self.speaker_keys = SPEAKER_KEYS["stt"] if mode == "stt" else SPEAKER_KEYS["chatbot"]
+        self.scores = defaultdict(float)
+        self.stats = defaultdict(lambda: defaultdict(int))
+
+    def add(self, entry: dict):
+        """entry: {"speaker", "sentiment", "argument_type", ...}"""
+        speaker = entry["speaker"]
+        sentiment = entry.get("sentiment")
+        arg_type = entry.get("argument_type")
+
+        # Score this sentence
+        if speaker and arg_type:
+            self.scores[speaker] += self.rubric["sentiment"].get(sentiment, 0)
+            self.scores[speaker] += self.rubric["argument"].get(arg_type, 0)
+
+            if sentiment:
+                self.stats[speaker][sentiment] += 1
+            self.stats[speaker][arg_type] += 1
+
+    def stats_dict(self) -> dict:
+        return {user: dict(counts) for user, counts in self.stats.items()}
+
+    def marking(self) -> dict:
+        return marking_points(self.stats, self.rubric)
+
+    def winner(self) -> str:
+        first_key, second_key = self.speaker_keys
+        first_score = self.scores[first_key]
+        second_score = self.scores[second_key]
+
+        if first_score > second_score:
+            return first_key
+        elif second_score > first_score:
+            return second_key
+        return "Draw"
+
+    def result(self) -> dict:
+        return {
+            "mode": self.mode,
+            "winner": self.winner(),
+            "scores": {k: round(self.scores[k], 3) for k in self.speaker_keys},
+            "rubric": self.rubric["version"],
+        }
+
+
+def write_winner_report(path: str, scorer: DebateScorer):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("=" * 60 + "\n")
+        f.write("DEBATE WINNER & PERFORMANCE ANALYSIS\n")
+        f.write("=" * 60 + "\n\n")
+
+        for user in scorer.speaker_keys:
+            f.write(f"{user} PERFORMANCE SUMMARY:\n")
+            f.write(f"Total Score : {scorer.scores[user]}\n")
+            for k, v in scorer.stats[user].items():
+                f.write(f"{k:<10} : {v}\n")
+            f.write("\n" + "-" * 40 + "\n\n")
+        f.write(f"🏆 FINAL RESULT: {scorer.winner()}\n")
 
 
 # =====================================================
 # MAIN FUNCTION (DUAL MODE)
 # =====================================================
-def run_winner_analysis(mode: str = "stt"):
+def run_winner_analysis(mode: str = "stt", rubric_version: str | None = None):
     """
     mode:
       - 'stt'     → analyze debate_final_analysis.txt
       - 'chatbot' → analyze chatbot_final_analysis.txt
+    rubric_version: scoring rubric to apply (default: the active rubric)
     """
+    scorer = DebateScorer(mode, rubric_version)
 
     # -------------------------------
     # SELECT FILES BASED ON MODE
@@ -57,131 +144,18 @@ def run_winner_analysis(mode: str = "stt"):
         raise FileNotFoundError(f"Input file not found: {INPUT_FILE}")
 
     # -------------------------------
-    # READ FILE
+    # PARSING & SCORING (single pass over the report)
     # -------------------------------
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    # -------------------------------
-    # PARSING & SCORING
-    # -------------------------------
-    # STT uses "User 1" / "User 2"; chatbot uses "USER" / "DEBATE GPT"
-    speaker_keys = ["User 1", "User 2"] if mode == "stt" else ["USER", "DEBATE GPT"]
-    scores = defaultdict(float)
-    stats = defaultdict(lambda: defaultdict(int))
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Look for sentence blocks: "Sentence N:"
-        if line.startswith("Sentence ") and line.endswith(":"):
-            # Collect the entire sentence block
-            corrected_text_lines = []
-            sentiment = None
-            arg_type = None
-            
-            i += 1
-            # Collect "Corrected Text" lines until we hit "Argument Type"
-            while i < len(lines):
-                current_line = lines[i].strip()
-                if current_line.startswith("Corrected Text"):
-                    # Get text after "Corrected Text :"
-                    parts = current_line.split(":", 1)
-                    if len(parts) == 2:
-                        corrected_text_lines.append(parts[1].strip())
-                elif current_line.startswith("Sentiment") and ":" in current_line:
-                    sentiment = current_line.split(":", 1)[1].strip()
-                elif current_line.startswith("Argument Type") and ":" in current_line:
-                    arg_type = current_line.split(":", 1)[1].strip()
-                    # Found argument type - determine speaker from corrected text
-                    break
-                elif current_line and not current_line.startswith("-"):
-                    # Continuation of corrected text
-                    corrected_text_lines.append(current_line)
-                i += 1
-            
-            # Determine speaker from corrected text
-            # With the updated analyzer, corrected text should start with speaker label
-            corrected_text = "\n".join(corrected_text_lines)
-            speaker = None
-            
-            # Check if corrected text starts with a speaker label (new format)
-            if corrected_text.startswith("USER:"):
-                speaker = "USER"
-            elif corrected_text.startswith("DEBATE GPT:"):
-                speaker = "DEBATE GPT"
-            elif corrected_text.startswith("User 1:"):
-                speaker = "User 1"
-            elif corrected_text.startswith("User 2:"):
-                speaker = "User 2"
-            else:
-                # Fallback: search for speaker labels
-                if "DEBATE GPT:" in corrected_text:
-                    debate_gpt_pos = corrected_text.find("DEBATE GPT:")
-                    user_pos = corrected_text.find("USER:")
-                    if user_pos >= 0 and (debate_gpt_pos < 0 or user_pos > debate_gpt_pos):
-                        speaker = "USER"
-                    else:
-                        speaker = "DEBATE GPT"
-                elif "USER:" in corrected_text:
-                    speaker = "USER"
-                elif "User 1:" in corrected_text:
-                    speaker = "User 1"
-                elif "User 2:" in corrected_text:
-                    speaker = "User 2"
-            
-            # Score this sentence
-            if speaker and arg_type:
-                scores[speaker] += SENTIMENT_SCORE.get(sentiment, 0)
-                scores[speaker] += ARGUMENT_SCORE.get(arg_type, 0)
-                
-                stats[speaker][sentiment] += 1
-                stats[speaker][arg_type] += 1
-        
-        i += 1
-
-    # Ensure all speaker keys exist in scores (for consistent response)
-    for k in speaker_keys:
-        if k not in scores:
-            scores[k] = 0.0
-
-    # -------------------------------
-    # DECIDE WINNER
-    # -------------------------------
-    first_key, second_key = speaker_keys[0], speaker_keys[1]
-    first_score = scores[first_key]
-    second_score = scores[second_key]
-
-    if first_score > second_score:
-        winner = first_key
-    elif second_score > first_score:
-        winner = second_key
-    else:
-        winner = "Draw"
+        for entry in iter_report_entries(f):
+            scorer.add(entry)
 
     # -------------------------------
     # WRITE OUTPUT
     # -------------------------------
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("=" * 60 + "\n")
-        f.write("DEBATE WINNER & PERFORMANCE ANALYSIS\n")
-        f.write("=" * 60 + "\n\n")
+    write_winner_report(OUTPUT_FILE, scorer)
 
-        for user in speaker_keys:
-            f.write(f"{user} PERFORMANCE SUMMARY:\n")
-            f.write(f"Total Score : {scores[user]}\n")
-            for k, v in stats[user].items():
-                f.write(f"{k:<10} : {v}\n")
-            f.write("\n" + "-" * 40 + "\n\n")
-        f.write(f"🏆 FINAL RESULT: {winner}\n")
-
-    return {
-        "mode": mode,
-        "winner": winner,
-        "scores": {k: round(scores[k], 3) for k in speaker_keys},
-        "output_file": OUTPUT_FILE
-    }
+    return {**scorer.result(), "output_file": OUTPUT_FILE}
 
 
 # -------------------------------
@@ -2,29 +2,27 @@ import ollama
 import os
 from datetime import datetime
 
+from Chatbot.reply_cache import cacheable, reply_cache, reply_key
+
 # -----------------------------
 # FILE SETUP
 # -----------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_FILE = os.path.join(BASE_DIR, "chatbot_debate_transcript.txt")
-
+# DEBATE_DATA_DIR: see Analyzer/aly.py
+LOG_FILE = os.path.join(os.getenv("DEBATE_DATA_DIR") or BASE_DIR, "chatbot_debate_transcript.txt")
 
-def get_chatbot_reply(topic: str, stance: str, user_msg: str) -> str:
-    """
-    Generates debate reply using Ollama and saves transcript.
-    """
+# -----------------------------
+# MODEL & PROMPT
+# -----------------------------
+CHATBOT_MODEL = os.getenv("CHATBOT_MODEL", "phi3:mini")
+_temperature = os.getenv("CHATBOT_TEMPERATURE")
+CHATBOT_TEMPERATURE = float(_temperature) if _temperature else None  # None → model default
 
-    # create file if not exists
-    if not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            f.write("=== DEBATE GPT TRANSCRIPT ===\n")
+# Bump whenever build_messages() changes so cached replies of the old prompt are not served
+PROMPT_VERSION = "1"
 
-    # save user input
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"\n[{datetime.now()}]\n")
-        f.write("USER:\n")
-        f.write(user_msg + "\n\n")
 
+def build_messages(topic: str, stance: str, user_msg: str) -> list[dict]:
     prompt = f"""
 You are Debate GPT.
 
@@ -40,19 +38,61 @@ User argument: {user_msg}
 
 Now write a very short debate response that goes AGAINST the user's stance.
 """
+    return [
+        {"role": "system", "content": "You are a debate assistant. Follow rules strictly."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_reply(topic: str, stance: str, user_msg: str, temperature: float | None = None) -> str:
+    """
+    One Ollama generation (API mode → no streaming). No transcript logging.
+    """
+    kwargs = {}
+    if temperature is not None:
+        kwargs["options"] = {"temperature": temperature}
 
-    # -----------------------------
-    # CALL OLLAMA (API MODE → no streaming)
-    # -----------------------------
     response = ollama.chat(
-        model="phi3:mini",
-        messages=[
-            {"role": "system", "content": "You are a debate assistant. Follow rules strictly."},
-            {"role": "user", "content": prompt}
-        ]
+        model=CHATBOT_MODEL,
+        messages=build_messages(topic, stance, user_msg),
+        **kwargs
     )
+    return response["message"]["content"]
+
+
+def cached_reply(topic: str, stance: str, user_msg: str, temperature: float | None = None,
+                 use_cache: bool = True) -> tuple[str, str]:
+    """
+    Reply through the reply cache. Returns (reply, source) where source is
+    "cache", "coalesced" or "model".
+    """
+    temperature = CHATBOT_TEMPERATURE if temperature is None else temperature
+    key = reply_key(topic, stance, user_msg, CHATBOT_MODEL, PROMPT_VERSION, temperature)
+    return reply_cache.get_or_generate(
+        key,
+        lambda: generate_reply(topic, stance, user_msg, temperature),
+        use_cache=use_cache and cacheable(temperature),
+    )
+
+
+def get_chatbot_reply(topic: str, stance: str, user_msg: str, temperature: float | None = None,
+                      use_cache: bool = True) -> str:
+    """
+    Generates debate reply using Ollama and saves transcript.
+    """
+
+    # create file if not exists
+    if not os.path.exists(LOG_FILE):
+        with open(LOG_FILE, "w", encoding="utf-8") as f:
+            f.write("=== DEBATE GPT TRANSCRIPT ===\n")
+
+    # save user input
+    with open(LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(f"\n[{datetime.now()}]\n")
+        f.write("USER:\n")
+        f.write(user_msg + "\n\n")
 
-    bot_reply = response["message"]["content"]
+    bot_reply, _ = cached_reply(topic, stance, user_msg, temperature, use_cache)
 
     # save bot output
     with open(LOG_FILE, "a", encoding="utf-8") as f:
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+REPLY_CACHE_ENABLED = os.getenv("CHATBOT_CACHE", "0") == "1"
+REPLY_CACHE_TTL = float(os.getenv("CHATBOT_CACHE_TTL", "3600"))  # seconds
+REPLY_CACHE_MAX_ENTRIES = int(os.getenv("CHATBOT_CACHE_MAX_ENTRIES", "1000"))
+
+# Temperature policy: a reply is cached only when it is generated at or below
+# this temperature. 0 → cache deterministic generations only. Requests that do
+# not set a temperature use the model default (Ollama: 0.8).
+REPLY_CACHE_MAX_TEMPERATURE = float(os.getenv("CHATBOT_CACHE_MAX_TEMPERATURE", "0.8"))
+MODEL_DEFAULT_TEMPERATURE = 0.8
+
+
+# -----------------------------
+# KEYS
+# -----------------------------
+_SPACE = re.compile(r"\s+")
+_STANCES = {"for": "favor", "favour": "favor", "pro": "favor", "con": "against", "oppose": "against"}
+
+
+def normalize_text(text: str) -> str:
+    """Case, Unicode form and whitespace differences do not change the key."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _SPACE.sub(" ", text).strip()
+
+
+def normalize_stance(stance: str) -> str:
+    stance = normalize_text(stance)
+    return _STANCES.get(stance, stance)
+
+
+def reply_key(topic: str, stance: str, message: str, model: str, prompt_version: str,
+              temperature: float | None = None) -> str:
+    effective = MODEL_DEFAULT_TEMPERATURE if temperature is None else temperature
+    payload = json.dumps(
+        [normalize_text(topic), normalize_stance(stance), normalize_text(message), model, prompt_version,
+         float(effective)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cacheable(temperature: float | None, max_temperature: float = REPLY_CACHE_MAX_TEMPERATURE) -> bool:
+    effective = MODEL_DEFAULT_TEMPERATURE if temperature is None else temperature
+    return effective <= max_temperature
+
+
+# -----------------------------
+# IN-MEMORY TTL + LRU
+# -----------------------------
+class ReplyCache:
+    """
+    key -> (reply, expires_at), least recently used first. Identical requests
+    arriving while a reply is being generated wait for that one generation
+    instead of calling the model again. With the cache disabled, or for
+    requests with use_cache=False, every request gets a generation of its own.
+    """
+
+    def __init__(self, ttl: float = REPLY_CACHE_TTL, max_entries: int = REPLY_CACHE_MAX_ENTRIES,
+                 enabled: bool = REPLY_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}  # key -> [Event, reply or None]
+
+    def _lookup(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        reply, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def _store(self, key: str, reply: str):
+        self._entries[key] = (reply, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_generate(self, key: str, generate, use_cache: bool = True) -> tuple[str, str]:
+        """
+        Returns (reply, source) with source "cache", "coalesced" or "model".
+        use_cache=False (or the cache disabled) neither reads, stores nor joins
+        an in-flight generation.
+        """
+        if not (use_cache and self.enabled):
+            with self._lock:
+                self.bypassed += 1
+            return generate(), "model"
+
+        while True:
+            with self._lock:
+                reply = self._lookup(key)
+                if reply is not None:
+                    self.hits += 1
+                    return reply, "cache"
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    waiter = self._inflight[key] = [threading.Event(), None]
+                    self.misses += 1
+                    break
+            waiter[0].wait()
+            if waiter[1] is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return waiter[1], "coalesced"
+            # The generation we waited for failed → try ourselves
+
+        try:
+            reply = generate()
+            waiter[1] = reply
+            with self._lock:
+                self._store(key, reply)
+            return reply, "model"
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter[0].set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "max_temperature": REPLY_CACHE_MAX_TEMPERATURE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "model_calls_saved": self.hits + self.coalesced,
+            }
+
+
+reply_cache = ReplyCache()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from Chatbot.debate_cli import generate_reply
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, "self_play")
+MANIFEST_FILE = "manifest.jsonl"
+
+SELF_PLAY_MAX_INFLIGHT = int(os.getenv("SELF_PLAY_MAX_INFLIGHT", "4"))
+SELF_PLAY_TEMPERATURE = float(os.getenv("SELF_PLAY_TEMPERATURE", "0.9"))
+
+SEPARATOR = "=" * 60
+
+DEFAULT_TOPICS = [
+    "Social media does more harm than good",
+    "Homework should be banned in primary schools",
+    "Artificial intelligence will create more jobs than it destroys",
+    "Nuclear power is the best answer to climate change",
+    "Voting should be compulsory",
+    "University education should be free",
+    "Remote work is better than office work",
+    "Space exploration is a waste of money",
+    "Zoos should be abolished",
+    "Video games improve problem-solving skills",
+]
+
+OPENING_MESSAGE = "Open the debate with your strongest argument."
+
+
+# =====================================================
+# ONE SIMULATED DEBATE
+# =====================================================
+# Both personas use the same prompt as get_chatbot_reply(): "reply AGAINST the
+# user's stance". USER argues in favour by answering the "against" stance,
+# DEBATE GPT answers USER exactly as it does in the app.
+
+def simulate_debate(topic: str, exchanges: int, inflight: threading.BoundedSemaphore,
+                    temperature: float = SELF_PLAY_TEMPERATURE) -> list[tuple[str, str]]:
+    """Returns [(user_msg, bot_reply), ...] for one debate."""
+
+    def generate(stance, message):
+        with inflight:
+            return generate_reply(topic, stance, message, temperature=temperature).strip()
+
+    turns = []
+    last_bot_reply = OPENING_MESSAGE
+    for _ in range(exchanges):
+        user_msg = generate("against", last_bot_reply)
+        bot_reply = generate("favor", user_msg)
+        turns.append((user_msg, bot_reply))
+        last_bot_reply = bot_reply
+    return turns
+
+
+def format_transcript(turns: list[tuple[str, str]]) -> str:
+    """
+    Same layout get_chatbot_reply() logs, with one separator at the end so
+    analyze_debate(mode="chatbot") sees the whole debate as its last block.
+    """
+    lines = ["=== DEBATE GPT TRANSCRIPT ===\n"]
+    for user_msg, bot_reply in turns:
+        lines.append(f"\n[{datetime.now()}]\n")
+        lines.append("USER:\n")
+        lines.append(user_msg + "\n\n")
+        lines.append("DEBATE GPT:\n")
+        lines.append(bot_reply + "\n")
+    lines.append(SEPARATOR + "\n")
+    return "".join(lines)
+
+
+# =====================================================
+# MANY DEBATES IN PARALLEL
+# =====================================================
+def _done_ids(output_dir: str) -> set[str]:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {json.loads(line)["id"] for line in f if line.strip()}
+
+
+def iter_self_play(count: int, exchanges: int = 3, topics: list[str] | None = None,
+                   output_dir: str = DEFAULT_OUTPUT_DIR, debates_parallel: int = 8,
+                   max_inflight: int = SELF_PLAY_MAX_INFLIGHT, seed: int = 0):
+    """
+    Runs count debates, debates_parallel at a time, with at most max_inflight
+    Ollama generations running at once across all of them. Yields one manifest
+    record per finished debate. Debates already in the manifest are skipped,
+    so an interrupted run can simply be started again.
+    """
+    topics = topics or DEFAULT_TOPICS
+    rng = random.Random(seed)
+    plan = [(f"selfplay-{seed}-{i:06d}", rng.choice(topics)) for i in range(count)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    done = _done_ids(output_dir)
+    plan = [(debate_id, topic) for debate_id, topic in plan if debate_id not in done]
+
+    inflight = threading.BoundedSemaphore(max_inflight)
+    manifest_lock = threading.Lock()
+
+    def run(debate_id, topic):
+        t0 = time.perf_counter()
+        turns = simulate_debate(topic, exchanges, inflight)
+        path = os.path.join(output_dir, f"{debate_id}.txt")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(format_transcript(turns))
+        os.replace(tmp, path)
+
+        record = {
+            "id": debate_id,
+            "topic": topic,
+            "exchanges": len(turns),
+            "seconds": round(time.perf_counter() - t0, 2),
+            "file": path,
+        }
+        with manifest_lock, open(os.path.join(output_dir, MANIFEST_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, debates_parallel)) as pool:
+        futures = {pool.submit(run, debate_id, topic): debate_id for debate_id, topic in plan}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"id": futures[future], "error": str(e)}
+
+
+# -----------------------------
+# CLI MODE
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate chatbot debate transcripts by self-play")
+    parser.add_argument("--debates", type=int, default=10)
+    parser.add_argument("--exchanges", type=int, default=3, help="USER/DEBATE GPT exchanges per debate")
+    parser.add_argument("--topics", help="text file with one topic per line")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--parallel", type=int, default=8, help="debates running at once")
+    parser.add_argument("--max-inflight", type=int, default=SELF_PLAY_MAX_INFLIGHT,
+                        help="Ollama generations running at once")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    topics = None
+    if args.topics:
+        with open(args.topics, "r", encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+
+    t0 = time.perf_counter()
+    finished = failed = 0
+    for record in iter_self_play(args.debates, args.exchanges, topics, args.out,
+                                 args.parallel, args.max_inflight, args.seed):
+        if "error" in record:
+            failed += 1
+            print(f"✗ {record['id']}: {record['error']}")
+        else:
+            finished += 1
+            print(f"✓ {record['id']} ({record['seconds']}s) {record['topic']}")
+
+    print(f"\n{finished} debates written to {args.out}, {failed} failed, {time.perf_counter() - t0:.1f}s")
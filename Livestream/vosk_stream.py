@@ -0,0 +1,110 @@
+import importlib.util
+import itertools
+import json
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+SAMPLE_RATE = 16000  # Vosk model sample rate
+
+VOSK_MODELS = {
+    "small": os.path.join(MODELS_DIR, "vosk-model-small-en-us-0.15"),
+    "lgraph": os.path.join(MODELS_DIR, "vosk-model-en-us-0.22-lgraph"),
+}
+DEFAULT_MODEL = os.getenv("VOSK_MODEL", "small")
+
+# vosk.Model is read-only after loading and safe to share between recognizers;
+# extra replicas only help when many sessions contend for the same model.
+MODEL_REPLICAS = int(os.getenv("VOSK_MODEL_REPLICAS", "1"))
+
+
+class VoskUnavailable(RuntimeError):
+    """Raised when live captions are used without the vosk package installed."""
+
+
+def available() -> bool:
+    return importlib.util.find_spec("vosk") is not None
+
+
+def _vosk():
+    # Imported on first use, so the API starts without vosk (live captions are optional)
+    try:
+        import vosk
+    except ImportError:
+        raise VoskUnavailable("Live captions need the vosk package: pip install vosk") from None
+    return vosk
+
+
+# -----------------------------
+# MODEL POOL
+# -----------------------------
+class ModelPool:
+    """
+    Loads each Vosk model at most MODEL_REPLICAS times per process and hands
+    the instances out round-robin. Recognizers are cheap; models are not.
+    """
+
+    def __init__(self, paths: dict = VOSK_MODELS, replicas: int = MODEL_REPLICAS):
+        self.paths = paths
+        self.replicas = max(1, replicas)
+        self._models = {}
+        self._cycles = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str = DEFAULT_MODEL):
+        if name not in self.paths:
+            raise ValueError(f"Unknown Vosk model '{name}'. Available: {', '.join(self.paths)}")
+        with self._lock:
+            if name not in self._models:
+                vosk = _vosk()
+                self._models[name] = [vosk.Model(self.paths[name]) for _ in range(self.replicas)]
+                self._cycles[name] = itertools.cycle(self._models[name])
+            return next(self._cycles[name])
+
+    def loaded(self) -> dict:
+        with self._lock:
+            return {name: len(models) for name, models in self._models.items()}
+
+
+model_pool = ModelPool()
+
+
+# -----------------------------
+# STREAMING SESSION
+# -----------------------------
+class StreamingSession:
+    """
+    One KaldiRecognizer over a shared model. Feed 16-bit mono PCM chunks to
+    accept(); each call returns a partial or final result event.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, sample_rate: int = SAMPLE_RATE):
+        self.recognizer = _vosk().KaldiRecognizer(model_pool.get(model_name), sample_rate)
+        self.finals = []
+
+    def accept(self, pcm: bytes) -> dict:
+        if self.recognizer.AcceptWaveform(pcm):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.finals.append(text)
+            return {"type": "final", "text": text}
+
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return {"type": "partial", "text": partial}
+
+    def finish(self) -> dict:
+        """Flushes buffered audio and returns the last final result."""
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.finals.append(text)
+        return {"type": "final", "text": text}
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.finals).strip()
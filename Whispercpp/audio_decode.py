@@ -0,0 +1,176 @@
+import io
+import os
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+try:
+    import soundfile as sf
+except ImportError:  # optional: ffmpeg is used instead
+    sf = None
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+# Limits are checked before anything is decoded: the byte size on upload, the
+# duration from the container header (WAV, soundfile) or by capping the decoder
+# output (ffmpeg), so a small compressed file cannot expand without bound.
+MAX_UPLOAD_BYTES = int(float(os.getenv("STT_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+MAX_AUDIO_SECONDS = float(os.getenv("STT_MAX_AUDIO_SECONDS", "600"))
+FFMPEG = os.getenv("FFMPEG", "ffmpeg")
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "60"))
+
+SAMPLE_RATE = 16000
+
+# Formats libsndfile reads (Opus needs libsndfile >= 1.0.29, MP3 >= 1.1.0)
+SOUNDFILE_FORMATS = {"flac", "ogg", "opus", "mp3"}
+
+
+class UnsupportedAudio(ValueError):
+    """Upload is not a recognised audio format, or no decoder is installed for it."""
+
+
+class AudioTooLarge(ValueError):
+    """Upload exceeds MAX_UPLOAD_BYTES or decodes to more than MAX_AUDIO_SECONDS."""
+
+
+# -----------------------------
+# FORMAT SNIFFING
+# -----------------------------
+def sniff_format(head: bytes) -> str | None:
+    """
+    Container/codec from the first bytes of a file (64 are enough):
+    wav, flac, opus, ogg (Vorbis), mp3, m4a (MP4/AAC), webm, amr, or None.
+    The file name and declared content type are not trusted.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        # First page carries the codec header right after the segment table
+        return "opus" if b"OpusHead" in head[:64] else "ogg"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:6] == b"#!AMR\n" or head[:9] == b"#!AMR-WB\n":
+        return "amr"
+    return None
+
+
+# -----------------------------
+# DECODING (in memory → 16 kHz mono float32)
+# -----------------------------
+def check_wav(data: bytes) -> float:
+    """
+    Validates a WAV upload's header without decoding it → duration in seconds.
+    Raises UnsupportedAudio (corrupt/truncated) / AudioTooLarge.
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            nframes, samplerate = wf.getnframes(), wf.getframerate()
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudio(f"Invalid WAV file: {e or 'truncated header'}")
+    if samplerate <= 0:
+        raise UnsupportedAudio("Invalid WAV file: sample rate is 0")
+    if nframes / samplerate > MAX_AUDIO_SECONDS:
+        raise AudioTooLarge(f"Audio longer than {MAX_AUDIO_SECONDS:.0f}s")
+    return nframes / samplerate
+
+
+def _decode_wav(data: bytes) -> tuple[np.ndarray, int]:
+    check_wav(data)
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            channels, width, samplerate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudio(f"Invalid WAV file: {e or 'truncated header'}")
+
+    dtypes = {1: np.uint8, 2: np.int16, 4: np.int32}
+    if width not in dtypes:
+        raise UnsupportedAudio(f"Unsupported WAV sample width: {width} bytes")
+    samples = np.frombuffer(frames, dtype=dtypes[width]).astype(np.float32)
+    samples = (samples - 128.0) / 128.0 if width == 1 else samples / float(2 ** (8 * width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, samplerate
+
+
+def _decode_soundfile(data: bytes) -> tuple[np.ndarray, int]:
+    with sf.SoundFile(io.BytesIO(data)) as f:
+        if f.frames / f.samplerate > MAX_AUDIO_SECONDS:
+            raise AudioTooLarge(f"Audio longer than {MAX_AUDIO_SECONDS:.0f}s")
+        samples = f.read(dtype="float32", always_2d=True)
+        samplerate = f.samplerate
+    return samples.mean(axis=1), samplerate
+
+
+def _decode_ffmpeg(data: bytes) -> tuple[np.ndarray, int]:
+    # Resampled and downmixed by ffmpeg; output is capped one second past the limit
+    cmd = [
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-i", "pipe:0", "-t", str(MAX_AUDIO_SECONDS + 1),
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise UnsupportedAudio(f"ffmpeg did not finish within {FFMPEG_TIMEOUT:.0f}s")
+    if proc.returncode != 0:
+        raise UnsupportedAudio("ffmpeg could not decode the upload: " + proc.stderr.decode(errors="replace").strip())
+
+    samples = np.frombuffer(proc.stdout, dtype=np.float32)
+    if len(samples) / SAMPLE_RATE > MAX_AUDIO_SECONDS:
+        raise AudioTooLarge(f"Audio longer than {MAX_AUDIO_SECONDS:.0f}s")
+    return samples, SAMPLE_RATE
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+
+def decoders() -> dict:
+    """Which formats this server can decode right now."""
+    formats = {"wav"}
+    if sf is not None:
+        formats |= SOUNDFILE_FORMATS
+    if ffmpeg_available():
+        formats |= SOUNDFILE_FORMATS | {"m4a", "webm", "amr"}
+    return {"soundfile": sf is not None, "ffmpeg": ffmpeg_available(), "formats": sorted(formats)}
+
+
+def decode_audio(data: bytes, fmt: str | None = None) -> np.ndarray:
+    """
+    Any supported upload → 16 kHz mono float32 samples, without temp files.
+    Raises UnsupportedAudio / AudioTooLarge.
+    """
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise AudioTooLarge(f"Upload larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    fmt = fmt or sniff_format(data[:64])
+    if fmt is None:
+        raise UnsupportedAudio("Unrecognised audio format")
+
+    if fmt == "wav":
+        samples, samplerate = _decode_wav(data)
+    elif sf is not None and fmt in SOUNDFILE_FORMATS:
+        try:
+            samples, samplerate = _decode_soundfile(data)
+        except RuntimeError:
+            # sf.LibsndfileError (a RuntimeError; older soundfile raises RuntimeError
+            # itself), e.g. Opus on an older libsndfile
+            if not ffmpeg_available():
+                raise UnsupportedAudio(f"This server's libsndfile cannot decode {fmt}; install ffmpeg")
+            samples, samplerate = _decode_ffmpeg(data)
+    elif ffmpeg_available():
+        samples, samplerate = _decode_ffmpeg(data)
+    else:
+        raise UnsupportedAudio(f"No decoder for {fmt}: install soundfile or ffmpeg")
+
+    from Whispercpp.debate_whispercpp import resample
+    return resample(samples, samplerate, SAMPLE_RATE)
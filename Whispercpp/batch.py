@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Whispercpp.debate_whispercpp import PROJECT_ROOT, run_whisper_segments, segments_text
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+AUDIO_EXTENSIONS = {".wav"}
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "batch_transcripts")
+PROGRESS_FILE = "batch_progress.jsonl"
+
+# "u1", "user1", "user_2", "speaker-2" ... anywhere in the file name
+SPEAKER_PATTERN = re.compile(r"(?:user|speaker|u)[ _-]?([12])(?![0-9])", re.IGNORECASE)
+_DIGITS = re.compile(r"(\d+)")
+
+
+# -----------------------------
+# PLANNING
+# -----------------------------
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def natural_key(path: str) -> list:
+    """Sort key that puts turn2 before turn10."""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS.split(path)]
+
+
+def transcribe_file(path: str) -> str:
+    # Raises on whisper failures, so a failed clip is never recorded as done
+    return segments_text(run_whisper_segments(path))
+
+
+def discover_audio(root: str) -> list[str]:
+    """All audio files below root, sorted so turn order is stable."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                found.append(os.path.join(dirpath, name))
+    return sorted(found, key=natural_key)
+
+
+def debate_key(path: str, root: str) -> str:
+    """
+    Files inside a sub-directory belong to the debate named after it.
+    Files at the top level are grouped by the part of the name before the first '_'.
+    """
+    rel = os.path.relpath(path, root)
+    parent = os.path.dirname(rel)
+    if parent:
+        return parent.replace(os.sep, "_")
+    return os.path.splitext(os.path.basename(rel))[0].split("_", 1)[0]
+
+
+def plan_batch(paths: list[str], root: str, debate_id: str | None = None) -> list[dict]:
+    """
+    Builds one job per file with its debate, turn number, speaker and content hash.
+    Speakers come from the file name (user1 / u2 / speaker_1) or alternate by turn.
+    """
+    jobs = []
+    turns = {}
+    for path in sorted(paths, key=natural_key):
+        debate = debate_id or debate_key(path, root)
+        turn = turns.get(debate, 0) + 1
+        turns[debate] = turn
+
+        match = SPEAKER_PATTERN.search(os.path.basename(path))
+        user = int(match.group(1)) if match else (1 if turn % 2 else 2)
+
+        jobs.append({
+            "file": path,
+            "debate": debate,
+            "turn": turn,
+            "speaker": f"User {user}",
+            "hash": file_hash(path),
+        })
+    return jobs
+
+
+# -----------------------------
+# PROGRESS (RESUMABLE)
+# -----------------------------
+def load_progress(output_dir: str) -> dict:
+    """Transcripts already finished by a previous (possibly crashed) run, keyed by hash."""
+    done = {}
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a half-written last line; it is simply redone
+                continue
+            done[entry["hash"]] = entry["text"]
+    return done
+
+
+def _record_progress(handle, digest: str, text: str):
+    handle.write(json.dumps({"hash": digest, "text": text}) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+def write_debate_transcript(output_dir: str, debate: str, jobs: list[dict], texts: dict) -> str:
+    path = os.path.join(output_dir, f"{debate}_transcript.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("========== FULL DEBATE ==========\n")
+        f.write(f"Topic: {debate}\n\n")
+        for job in sorted(jobs, key=lambda j: j["turn"]):
+            f.write(f"{job['speaker']}:\n{texts[job['hash']].strip()}\n\n")
+        f.write("=================================\n")
+    return path
+
+
+# -----------------------------
+# BATCH RUNNER
+# -----------------------------
+def iter_batch(paths: list[str], root: str, output_dir: str = DEFAULT_OUTPUT_DIR,
+               workers: int = BATCH_WORKERS, debate_id: str | None = None):
+    """
+    Transcribes many files across a worker pool and yields one result dict per
+    input file as soon as it is available. Identical audio (same content hash)
+    is transcribed once. Finished hashes are appended to batch_progress.jsonl,
+    so re-running the same batch after a crash only does the remaining work.
+    When every turn of a debate is done its transcript file is written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = plan_batch(paths, root, debate_id)
+    texts = load_progress(output_dir)
+
+    by_hash = {}
+    by_debate = {}
+    for job in jobs:
+        by_hash.setdefault(job["hash"], []).append(job)
+        by_debate.setdefault(job["debate"], []).append(job)
+    pending_turns = {debate: len(items) for debate, items in by_debate.items()}
+
+    def finish(job_list, status):
+        for job in job_list:
+            result = {
+                "file": job["file"],
+                "debate": job["debate"],
+                "turn": job["turn"],
+                "speaker": job["speaker"],
+                "status": status,
+                "text": texts.get(job["hash"]),
+            }
+            pending_turns[job["debate"]] -= 1
+            if pending_turns[job["debate"]] == 0 and all(j["hash"] in texts for j in by_debate[job["debate"]]):
+                result["transcript_file"] = write_debate_transcript(
+                    output_dir, job["debate"], by_debate[job["debate"]], texts
+                )
+            yield result
+
+    for digest, job_list in by_hash.items():
+        if digest in texts:
+            yield from finish(job_list, "resumed")
+
+    todo = {digest: job_list for digest, job_list in by_hash.items() if digest not in texts}
+
+    with open(os.path.join(output_dir, PROGRESS_FILE), "a", encoding="utf-8") as progress, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(transcribe_file, job_list[0]["file"]): digest
+            for digest, job_list in todo.items()
+        }
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                texts[digest] = future.result().strip()
+            except Exception as e:
+                for job in todo[digest]:
+                    pending_turns[job["debate"]] -= 1
+                    yield {
+                        "file": job["file"],
+                        "debate": job["debate"],
+                        "turn": job["turn"],
+                        "speaker": job["speaker"],
+                        "status": "error",
+                        "error": str(e),
+                    }
+                continue
+
+            _record_progress(progress, digest, texts[digest])
+            yield from finish(todo[digest], "transcribed")
+
+
+def run_batch(root: str, output_dir: str = DEFAULT_OUTPUT_DIR, workers: int = BATCH_WORKERS) -> list[dict]:
+    """CLI MODE: transcribe every audio file under root."""
+    results = []
+    for result in iter_batch(discover_audio(root), root, output_dir, workers):
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    return results
+
+
+# -----------------------------
+# ENTRY POINT
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-transcribe a directory of debate recordings")
+    parser.add_argument("root", help="directory with one sub-directory (or file prefix) per debate")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    args = parser.parse_args()
+
+    run_batch(args.root, args.output, args.workers)
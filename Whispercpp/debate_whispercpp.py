@@ -7,6 +7,17 @@ import tempfile
 import os
 import keyboard
 import uuid
+import shlex
+import json
+
+from Whispercpp.engines import get_engine
+from Whispercpp.transcript_cache import (
+    CACHE_ENABLED,
+    audio_digest,
+    cache_key,
+    pcm_digest,
+    transcript_cache,
+)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
@@ -21,13 +32,20 @@ sr = 16000  # sample rate used by whisper.cpp
 WHISPER_CLI = os.getenv("WHISPER_CLI")
 WHISPER_MODEL = os.getenv("WHISPER_MODEL")
 
-if not WHISPER_CLI or not WHISPER_MODEL:
-    raise RuntimeError(
-        " Whisper paths not configured.\n"
-        "Please set environment variables:\n"
-        "  WHISPER_CLI   → path to whisper-cli.exe\n"
-        "  WHISPER_MODEL → path to model file"
-    )
+# Extra whisper-cli decode options, e.g. WHISPER_ARGS="-l en -t 4 -bs 5"
+WHISPER_ARGS = shlex.split(os.getenv("WHISPER_ARGS", ""))
+
+
+def _require_whisper_paths():
+    # Only the whisper.cpp engine needs these; faster-whisper runs without them
+    if not WHISPER_CLI or not WHISPER_MODEL:
+        raise RuntimeError(
+            " Whisper paths not configured.\n"
+            "Please set environment variables:\n"
+            "  WHISPER_CLI   → path to whisper-cli.exe\n"
+            "  WHISPER_MODEL → path to model file"
+        )
+
 
 # -----------------------------
 # UTILS
@@ -43,12 +61,54 @@ def write_wav_int16(path: str, samples: np.ndarray, samplerate: int):
         wf.writeframes(int16.tobytes())
 
 
-def transcribe_with_whispercpp(wav_path: str) -> str:
+def read_wav_float32(path: str) -> tuple[np.ndarray, int]:
+    """
+    Reads a PCM WAV file as mono float32 samples in [-1, 1].
+    Returns (samples, samplerate).
+    """
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        samplerate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return samples, samplerate
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = sr) -> np.ndarray:
+    """Linear-interpolation resampler (whisper needs 16 kHz input)."""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+    duration = len(samples) / src_rate
+    n_out = int(round(duration * dst_rate))
+    src_t = np.arange(len(samples)) / src_rate
+    dst_t = np.arange(n_out) / dst_rate
+    return np.interp(dst_t, src_t, samples).astype(np.float32)
+
+
+class WhisperCLIError(RuntimeError):
+    """whisper-cli exited non-zero; the message is its combined output."""
+
+
+def _run_whisper_cli(wav_path: str, args: list[str], model: str | None = None) -> str:
+    _require_whisper_paths()
     cmd = [
         WHISPER_CLI,
-        "-m", WHISPER_MODEL,
+        "-m", model or WHISPER_MODEL,
         "-f", wav_path,
-        "--no-timestamps"
+        *args,
     ]
 
     try:
@@ -56,11 +116,64 @@ def transcribe_with_whispercpp(wav_path: str) -> str:
         output = proc.stdout.strip()
     except subprocess.CalledProcessError as e:
         output = ((e.stdout or "") + "\n" + (e.stderr or "")).strip()
+        raise WhisperCLIError(" ".join(ln.strip() for ln in output.splitlines() if ln.strip()))
 
     lines = [ln.strip() for ln in output.splitlines() if ln.strip()]
     return " ".join(lines)
 
 
+def transcribe_with_whispercpp(wav_path: str) -> str:
+    try:
+        return _run_whisper_cli(wav_path, ["--no-timestamps", *WHISPER_ARGS])
+    except WhisperCLIError as e:
+        return str(e)
+
+
+def parse_whisper_json(data: dict) -> list[dict]:
+    """
+    Converts whisper.cpp full JSON output (-ojf) into segments:
+    {"start": sec, "end": sec, "text": str, "avg_logprob": float | None}.
+    avg_logprob is the mean log-probability of the segment's text tokens.
+    """
+    segments = []
+    for item in data.get("transcription", []):
+        text = item.get("text", "").strip()
+        if not text:
+            continue
+        offsets = item.get("offsets", {})
+        probs = [
+            tok["p"] for tok in item.get("tokens", [])
+            if tok.get("p", 0) > 0 and not tok.get("text", "").startswith("[_")
+        ]
+        segments.append({
+            "start": round(offsets.get("from", 0) / 1000, 3),
+            "end": round(offsets.get("to", 0) / 1000, 3),
+            "text": text,
+            "avg_logprob": round(float(np.mean(np.log(probs))), 4) if probs else None,
+        })
+    return segments
+
+
+def transcribe_segments_with_whispercpp(wav_path: str, model: str | None = None) -> list[dict]:
+    """Runs whisper-cli with JSON output and returns timed segments with confidence."""
+    out_prefix = os.path.join(tempfile.gettempdir(), f"whisper_{uuid.uuid4().hex}")
+    _run_whisper_cli(wav_path, ["-ojf", "-of", out_prefix, *WHISPER_ARGS], model=model)
+
+    json_path = out_prefix + ".json"
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    finally:
+        if os.path.exists(json_path):
+            os.remove(json_path)
+
+    return parse_whisper_json(data)
+
+
+def segments_text(segments: list[dict]) -> str:
+    return " ".join(seg["text"] for seg in segments).strip()
+
+
 # -----------------------------
 # CLI MODE FUNCTIONS
 # -----------------------------
@@ -162,14 +275,49 @@ def run_stt_session():
 # -----------------------------
 # API MODE FUNCTION
 # -----------------------------
+def run_whisper_segments(wav_path: str, engine=None) -> list[dict]:
+    """
+    API MODE:
+    Takes a WAV file path and returns timed segments (start, end, text, avg_logprob)
+    from the configured STT engine (STT_ENGINE, see Whispercpp/engines.py).
+    Repeated clips (client retries, duplicate uploads) are served from the
+    transcript cache keyed by PCM hash + engine/model identity + decode options.
+    Raises WhisperCLIError if whisper-cli fails; failures are never cached.
+    engine overrides STT_ENGINE (e.g. the two-pass draft engine).
+    """
+    engine = engine or get_engine()
+    if not CACHE_ENABLED:
+        return engine.transcribe_segments(wav_path)
+
+    key = cache_key(audio_digest(wav_path), engine.identity(), engine.options())
+    return transcript_cache.get_or_compute(key, lambda: engine.transcribe_segments(wav_path))
+
+
+def run_whisper_samples(samples: np.ndarray, samplerate: int = sr, engine=None) -> list[dict]:
+    """
+    API MODE:
+    Same as run_whisper_segments() for audio already decoded in memory (e.g.
+    an Opus/FLAC upload). Engines that take arrays never touch the disk.
+    """
+    engine = engine or get_engine()
+    if not CACHE_ENABLED:
+        return engine.transcribe_array(samples, samplerate)
+
+    key = cache_key(pcm_digest(samples, samplerate), engine.identity(), engine.options())
+    return transcript_cache.get_or_compute(key, lambda: engine.transcribe_array(samples, samplerate))
+
+
 def run_whisper_file(wav_path: str) -> str:
     """
     API MODE:
     Takes a WAV file path and returns transcript.
     No keyboard, no mic, no loops.
     """
-    transcript = transcribe_with_whispercpp(wav_path)
-    return transcript
+    try:
+        return segments_text(run_whisper_segments(wav_path))
+    except WhisperCLIError as e:
+        # Callers of the plain-text API see whisper's output as before
+        return str(e)
 
 
 # -----------------------------
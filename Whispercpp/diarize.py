@@ -0,0 +1,320 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Whispercpp.debate_whispercpp import (
+    PROJECT_ROOT,
+    read_wav_float32,
+    resample,
+    run_whisper_samples,
+    segments_text,
+    sr,
+)
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+FRAME_MS = 25          # analysis window
+HOP_MS = 10            # analysis hop
+MIN_PAUSE_S = 0.35     # silence that separates two speech regions
+MIN_SPEECH_S = 0.30    # shorter bursts are treated as noise
+WINDOW_S = 1.5         # length of one speaker-embedding window
+MIN_TURN_S = 1.0       # shorter turns are merged into their neighbour
+N_MELS = 26
+N_MFCC = 13
+
+DIARIZE_WORKERS = int(os.getenv("DIARIZE_WORKERS", "2"))
+
+DEFAULT_OUTPUT = os.path.join(PROJECT_ROOT, "debate_transcript.txt")
+
+
+# -----------------------------
+# AUDIO FEATURES
+# -----------------------------
+def _frame_signal(samples: np.ndarray, samplerate: int) -> np.ndarray:
+    frame_len = int(samplerate * FRAME_MS / 1000)
+    hop = int(samplerate * HOP_MS / 1000)
+    if len(samples) < frame_len:
+        samples = np.pad(samples, (0, frame_len - len(samples)))
+    n_frames = 1 + (len(samples) - frame_len) // hop
+    idx = np.arange(frame_len)[None, :] + hop * np.arange(n_frames)[:, None]
+    return samples[idx] * np.hamming(frame_len).astype(np.float32)
+
+
+def _mel_filterbank(samplerate: int, n_fft: int) -> np.ndarray:
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(samplerate / 2), N_MELS + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / samplerate).astype(int)
+
+    fbank = np.zeros((N_MELS, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            fbank[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            fbank[m - 1, k] = (right - k) / max(right - center, 1)
+    return fbank
+
+
+def frame_features(samples: np.ndarray, samplerate: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (log_energy_db, mfcc) per analysis frame.
+    MFCCs are computed with plain NumPy so diarization has no extra dependencies.
+    """
+    frames = _frame_signal(samples, samplerate)
+    n_fft = 1 << (frames.shape[1] - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n=n_fft, axis=1)) ** 2 / n_fft
+
+    energy_db = 10 * np.log10(power.sum(axis=1) + 1e-10)
+
+    mel_energy = power @ _mel_filterbank(samplerate, n_fft).T
+    log_mel = np.log(mel_energy + 1e-10)
+    n = np.arange(N_MELS)
+    dct = np.cos(np.pi / N_MELS * (n[None, :] + 0.5) * np.arange(N_MFCC)[:, None])
+    mfcc = log_mel @ dct.T
+    return energy_db, mfcc
+
+
+# -----------------------------
+# SEGMENTATION
+# -----------------------------
+def detect_speech_regions(energy_db: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Energy-based VAD. Returns (start_frame, end_frame) regions of speech,
+    split wherever the speaker pauses for at least MIN_PAUSE_S.
+    """
+    if len(energy_db) == 0:
+        return []
+
+    noise_floor = np.percentile(energy_db, 10)
+    peak = np.percentile(energy_db, 95)
+    threshold = noise_floor + max(6.0, 0.3 * (peak - noise_floor))
+    voiced = energy_db > threshold
+
+    min_pause = int(MIN_PAUSE_S * 1000 / HOP_MS)
+    min_speech = int(MIN_SPEECH_S * 1000 / HOP_MS)
+
+    regions = []
+    start = None
+    silence = 0
+    for i, v in enumerate(voiced):
+        if v:
+            if start is None:
+                start = i
+            silence = 0
+        elif start is not None:
+            silence += 1
+            if silence >= min_pause:
+                end = i - silence + 1
+                if end - start >= min_speech:
+                    regions.append((start, end))
+                start = None
+                silence = 0
+    if start is not None:
+        end = len(voiced) - silence
+        if end - start >= min_speech:
+            regions.append((start, end))
+    return regions
+
+
+def _embedding_windows(regions: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Cuts speech regions into WINDOW_S chunks for speaker embedding."""
+    win = int(WINDOW_S * 1000 / HOP_MS)
+    windows = []
+    for start, end in regions:
+        n = max(1, int(round((end - start) / win)))
+        edges = np.linspace(start, end, n + 1).astype(int)
+        windows.extend((int(s), int(e)) for s, e in zip(edges[:-1], edges[1:]))
+    return windows
+
+
+def speaker_embeddings(mfcc: np.ndarray, windows: list[tuple[int, int]]) -> np.ndarray:
+    """Mean + std of MFCCs (c0 dropped) per window, normalised across the recording."""
+    feats = mfcc[:, 1:]
+    emb = np.array([
+        np.concatenate([feats[s:e].mean(axis=0), feats[s:e].std(axis=0)])
+        for s, e in windows
+    ])
+    emb = (emb - emb.mean(axis=0)) / (emb.std(axis=0) + 1e-8)
+    return emb
+
+
+def cluster_speakers(embeddings: np.ndarray, num_speakers: int = 2, iterations: int = 50) -> np.ndarray:
+    """
+    K-means with deterministic farthest-point initialisation.
+    Returns one cluster id per embedding row.
+    """
+    n = len(embeddings)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    k = min(num_speakers, n)
+
+    centers = [embeddings[0]]
+    for _ in range(1, k):
+        dist = np.min([((embeddings - c) ** 2).sum(axis=1) for c in centers], axis=0)
+        centers.append(embeddings[int(dist.argmax())])
+    centers = np.array(centers)
+
+    labels = np.zeros(n, dtype=int)
+    for it in range(iterations):
+        dist = ((embeddings[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if it > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            if np.any(labels == c):
+                centers[c] = embeddings[labels == c].mean(axis=0)
+    return labels
+
+
+def _smooth_labels(labels: np.ndarray, width: int = 3) -> np.ndarray:
+    """Majority filter so a single odd window does not create a new turn."""
+    if len(labels) < width:
+        return labels
+    half = width // 2
+    padded = np.pad(labels, half, mode="edge")
+    return np.array([
+        np.bincount(padded[i:i + width]).argmax() for i in range(len(labels))
+    ])
+
+
+def diarize(samples: np.ndarray, samplerate: int = sr, num_speakers: int = 2) -> list[dict]:
+    """
+    Splits one continuous recording into speaker turns.
+    Returns [{"speaker": "User 1", "start": sec, "end": sec}, ...] in time order.
+    Speaker numbering follows speaking order (whoever talks first is User 1).
+    """
+    energy_db, mfcc = frame_features(samples, samplerate)
+    windows = _embedding_windows(detect_speech_regions(energy_db))
+    if not windows:
+        return []
+
+    labels = _smooth_labels(cluster_speakers(speaker_embeddings(mfcc, windows), num_speakers))
+
+    # Merge consecutive windows of the same speaker into turns
+    turns = []
+    for (start, end), label in zip(windows, labels):
+        if turns and turns[-1]["label"] == label:
+            turns[-1]["end"] = end
+        else:
+            turns.append({"label": int(label), "start": start, "end": end})
+
+    # Fold very short turns into the previous one (back-channel, coughs)
+    min_turn = int(MIN_TURN_S * 1000 / HOP_MS)
+    merged = []
+    for t in turns:
+        if merged and (t["end"] - t["start"] < min_turn or merged[-1]["label"] == t["label"]):
+            merged[-1]["end"] = t["end"]
+        else:
+            merged.append(t)
+
+    order = {}
+    for t in merged:
+        order.setdefault(t["label"], len(order) + 1)
+
+    hop_s = HOP_MS / 1000
+    return [
+        {
+            "speaker": f"User {order[t['label']]}",
+            "start": round(t["start"] * hop_s, 2),
+            "end": round(t["end"] * hop_s, 2),
+        }
+        for t in merged
+    ]
+
+
+# -----------------------------
+# TRANSCRIPTION
+# -----------------------------
+def _transcribe_segment(samples: np.ndarray) -> tuple[str, str | None]:
+    """(text, None) or ("", error); a failed clip must not become a turn."""
+    try:
+        return segments_text(run_whisper_samples(samples, sr)).strip(), None
+    except Exception as e:
+        return "", str(e)
+
+
+def transcribe_diarized(wav_path: str, num_speakers: int = 2, workers: int = DIARIZE_WORKERS) -> list[dict]:
+    """
+    Diarizes a WAV recording and transcribes every turn in parallel.
+    Returns turns in time order with an added "text" field; turns whose
+    transcription failed carry "error" instead and an empty text.
+    """
+    samples, rate = read_wav_float32(wav_path)
+    samples = resample(samples, rate, sr)
+
+    turns = diarize(samples, sr, num_speakers)
+    clips = [samples[int(t["start"] * sr):int(t["end"] * sr)] for t in turns]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(_transcribe_segment, clips))
+
+    for turn, (text, error) in zip(turns, results):
+        turn["text"] = text
+        if error:
+            turn["error"] = error
+    return [t for t in turns if t["text"] or t.get("error")]
+
+
+def format_transcript(turns: list[dict], topic: str | None = None) -> str:
+    """Renders turns in the debate_transcript.txt format used by the analyzer."""
+    content = "========== FULL DEBATE ==========\n"
+    if topic:
+        content += f"Topic: {topic}\n\n"
+    for turn in turns:
+        if turn.get("error"):
+            continue
+        content += f"{turn['speaker']}:\n{turn['text']}\n\n"
+    content += "=================================\n"
+    return content
+
+
+def run_diarized_debate(wav_path: str, topic: str | None = None, output_file: str | None = DEFAULT_OUTPUT,
+                        num_speakers: int = 2) -> dict:
+    """
+    BATCH MODE:
+    One continuous debate recording → labelled debate_transcript.txt.
+    output_file=None leaves writing the transcript to the caller.
+    """
+    turns = transcribe_diarized(wav_path, num_speakers=num_speakers)
+    failed = [t for t in turns if t.get("error")]
+    if failed and len(failed) == len(turns):
+        raise RuntimeError(f"Transcription failed for every turn: {failed[0]['error']}")
+    content = format_transcript(turns, topic)
+
+    if output_file is not None:
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    return {
+        "turns": [t for t in turns if not t.get("error")],
+        "failed_turns": failed,
+        "transcript": content,
+        "transcript_file": output_file,
+    }
+
+
+# -----------------------------
+# ENTRY POINT
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diarize and transcribe a full debate recording")
+    parser.add_argument("wav", help="continuous debate recording (WAV)")
+    parser.add_argument("--topic", default=None)
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    result = run_diarized_debate(args.wav, args.topic, args.output, args.speakers)
+    print(f" {len(result['turns'])} turns transcribed")
+    if result["failed_turns"]:
+        print(f" {len(result['failed_turns'])} turns failed: {result['failed_turns'][0]['error']}")
+    print(f" Transcript saved as: {result['transcript_file']}")
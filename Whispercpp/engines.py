@@ -0,0 +1,283 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+STT_ENGINE = os.getenv("STT_ENGINE", "whispercpp")
+
+FASTER_WHISPER_MODEL = os.getenv("FASTER_WHISPER_MODEL", "small")
+FASTER_WHISPER_DEVICE = os.getenv("FASTER_WHISPER_DEVICE", "cpu")
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_BEAM_SIZE = int(os.getenv("FASTER_WHISPER_BEAM_SIZE", "5"))
+FASTER_WHISPER_THREADS = int(os.getenv("FASTER_WHISPER_THREADS", "0"))  # 0 → library default
+
+# Two-pass mode: a fast draft engine answers /stt/transcribe, STT_ENGINE
+# refines the turn in the background. Empty → single pass.
+STT_DRAFT_ENGINE = os.getenv("STT_DRAFT_ENGINE", "")
+WHISPER_DRAFT_MODEL = os.getenv("WHISPER_DRAFT_MODEL")  # e.g. ggml-tiny.en-q5_1.bin
+FASTER_WHISPER_DRAFT_MODEL = os.getenv("FASTER_WHISPER_DRAFT_MODEL", "tiny")
+VOSK_DRAFT_MODEL = os.getenv("VOSK_DRAFT_MODEL", "small")  # see Livestream/vosk_stream.py
+
+SAMPLE_RATE = 16000
+
+
+# -----------------------------
+# ENGINES
+# -----------------------------
+# Every engine returns segments shaped like whisper.cpp's parsed JSON output:
+# {"start": sec, "end": sec, "text": str, "avg_logprob": float | None}
+# identity() + options() go into the transcript cache key, so changing the
+# engine, its model or its decode options never serves stale transcripts.
+
+class WhisperCppEngine:
+    """whisper.cpp CLI (WHISPER_CLI / WHISPER_MODEL), one process per clip."""
+
+    name = "whispercpp"
+
+    def __init__(self, model_path: str | None = None):
+        self.model_path = model_path  # None → WHISPER_MODEL
+
+    def identity(self) -> str:
+        from Whispercpp.debate_whispercpp import WHISPER_MODEL
+        from Whispercpp.transcript_cache import model_identity
+        return model_identity(self.model_path or WHISPER_MODEL)
+
+    def options(self) -> list:
+        from Whispercpp.debate_whispercpp import WHISPER_ARGS
+        return ["-ojf", *WHISPER_ARGS]
+
+    def load(self):
+        """Nothing to preload: the model is read by every whisper-cli run."""
+
+    def transcribe_segments(self, wav_path: str) -> list[dict]:
+        from Whispercpp.debate_whispercpp import transcribe_segments_with_whispercpp
+        return transcribe_segments_with_whispercpp(wav_path, model=self.model_path)
+
+    def transcribe_array(self, samples: np.ndarray, samplerate: int = SAMPLE_RATE) -> list[dict]:
+        # whisper-cli only reads files, so arrays go through a temp WAV here
+        from Whispercpp.debate_whispercpp import write_wav_int16
+        tmp_wav = os.path.join(tempfile.gettempdir(), f"engine_{uuid.uuid4().hex}.wav")
+        write_wav_int16(tmp_wav, samples, samplerate)
+        try:
+            return self.transcribe_segments(tmp_wav)
+        finally:
+            os.remove(tmp_wav)
+
+
+class FasterWhisperEngine:
+    """
+    In-process faster-whisper (CTranslate2). The model is loaded once per
+    process and reused; NumPy buffers are transcribed directly, no temp files.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = FASTER_WHISPER_MODEL, device: str = FASTER_WHISPER_DEVICE,
+                 compute_type: str = FASTER_WHISPER_COMPUTE_TYPE, beam_size: int = FASTER_WHISPER_BEAM_SIZE,
+                 cpu_threads: int = FASTER_WHISPER_THREADS):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    def identity(self) -> str:
+        return f"faster-whisper:{self.model_size}:{self.device}:{self.compute_type}"
+
+    def options(self) -> list:
+        return [f"beam_size={self.beam_size}"]
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                self._model = WhisperModel(
+                    self.model_size,
+                    device=self.device,
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                )
+        return self._model
+
+    def _segments(self, audio) -> list[dict]:
+        segments, _ = self.load().transcribe(audio, beam_size=self.beam_size)
+        return [
+            {
+                "start": round(seg.start, 3),
+                "end": round(seg.end, 3),
+                "text": seg.text.strip(),
+                "avg_logprob": round(seg.avg_logprob, 4),
+            }
+            for seg in segments
+            if seg.text.strip()
+        ]
+
+    def transcribe_segments(self, wav_path: str) -> list[dict]:
+        return self._segments(wav_path)
+
+    def transcribe_array(self, samples: np.ndarray, samplerate: int = SAMPLE_RATE) -> list[dict]:
+        samples = np.asarray(samples, dtype=np.float32).flatten()
+        if samplerate != SAMPLE_RATE:
+            from Whispercpp.debate_whispercpp import resample
+            samples = resample(samples, samplerate, SAMPLE_RATE)
+        return self._segments(samples)
+
+
+class VoskEngine:
+    """
+    Kaldi/Vosk from the shared model pool (Livestream/vosk_stream.py). Much
+    faster than whisper on CPU and less accurate: meant as a draft engine.
+    Word confidences become avg_logprob.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_name: str = VOSK_DRAFT_MODEL):
+        self.model_name = model_name
+
+    def identity(self) -> str:
+        return f"vosk:{self.model_name}"
+
+    def options(self) -> list:
+        return []
+
+    def load(self):
+        from Livestream.vosk_stream import model_pool
+        return model_pool.get(self.model_name)
+
+    def transcribe_segments(self, wav_path: str) -> list[dict]:
+        from Whispercpp.debate_whispercpp import read_wav_float32
+        samples, samplerate = read_wav_float32(wav_path)
+        return self.transcribe_array(samples, samplerate)
+
+    def transcribe_array(self, samples: np.ndarray, samplerate: int = SAMPLE_RATE) -> list[dict]:
+        import json
+        from vosk import KaldiRecognizer
+        from Whispercpp.debate_whispercpp import resample
+
+        samples = resample(np.asarray(samples, dtype=np.float32).flatten(), samplerate, SAMPLE_RATE)
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+        recognizer = KaldiRecognizer(self.load(), SAMPLE_RATE)
+        recognizer.SetWords(True)
+        results = []
+        step = SAMPLE_RATE  # bytes: half a second of 16-bit audio
+        for i in range(0, len(pcm), step):
+            if recognizer.AcceptWaveform(pcm[i:i + step]):
+                results.append(json.loads(recognizer.Result()))
+        results.append(json.loads(recognizer.FinalResult()))
+
+        segments = []
+        for result in results:
+            words = result.get("result") or []
+            if not words or not result.get("text", "").strip():
+                continue
+            confs = [w["conf"] for w in words if w.get("conf", 0) > 0]
+            segments.append({
+                "start": round(words[0]["start"], 3),
+                "end": round(words[-1]["end"], 3),
+                "text": result["text"].strip(),
+                "avg_logprob": round(float(np.mean(np.log(confs))), 4) if confs else None,
+            })
+        return segments
+
+
+ENGINES = {
+    WhisperCppEngine.name: WhisperCppEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+    VoskEngine.name: VoskEngine,
+}
+
+DRAFT_ENGINE_FACTORIES = {
+    WhisperCppEngine.name: lambda: WhisperCppEngine(WHISPER_DRAFT_MODEL),
+    FasterWhisperEngine.name: lambda: FasterWhisperEngine(model_size=FASTER_WHISPER_DRAFT_MODEL, beam_size=1),
+    VoskEngine.name: lambda: VoskEngine(VOSK_DRAFT_MODEL),
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_engine(name: str | None = None):
+    """Shared engine instance for name (default: STT_ENGINE)."""
+    name = name or STT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown STT engine '{name}'. Available: {', '.join(ENGINES)}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = ENGINES[name]()
+        return _instances[name]
+
+
+def get_draft_engine(name: str | None = None):
+    """Shared draft engine for two-pass transcription, None when two-pass is off."""
+    name = name if name is not None else STT_DRAFT_ENGINE
+    if not name:
+        return None
+    if name not in DRAFT_ENGINE_FACTORIES:
+        raise ValueError(f"Unknown draft STT engine '{name}'. Available: {', '.join(DRAFT_ENGINE_FACTORIES)}")
+    key = f"draft:{name}"
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = DRAFT_ENGINE_FACTORIES[name]()
+        return _instances[key]
+
+
+# -----------------------------
+# BENCHMARK
+# -----------------------------
+def benchmark_engines(wav_paths: list[str], names: list[str] | None = None) -> list[dict]:
+    """
+    Runs every engine over the same clips (bypassing the transcript cache)
+    and reports load time, decode time and real-time factor.
+    """
+    from Whispercpp.debate_whispercpp import read_wav_float32
+
+    audio_seconds = 0.0
+    for path in wav_paths:
+        samples, rate = read_wav_float32(path)
+        audio_seconds += len(samples) / rate
+
+    results = []
+    for name in names or list(ENGINES):
+        engine = get_engine(name)
+
+        t0 = time.perf_counter()
+        engine.load()
+        load_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        words = 0
+        for path in wav_paths:
+            words += sum(len(seg["text"].split()) for seg in engine.transcribe_segments(path))
+        decode_s = time.perf_counter() - t0
+
+        results.append({
+            "engine": name,
+            "load_s": round(load_s, 3),
+            "decode_s": round(decode_s, 3),
+            "audio_s": round(audio_seconds, 3),
+            "rtf": round(decode_s / audio_seconds, 3) if audio_seconds else None,
+            "words": words,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark STT engines on the same clips")
+    parser.add_argument("wavs", nargs="+")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    args = parser.parse_args()
+
+    for row in benchmark_engines(args.wavs, args.engines.split(",")):
+        print(f"{row['engine']:<15} load {row['load_s']:>7.2f}s  decode {row['decode_s']:>7.2f}s  "
+              f"RTF {row['rtf']}  words {row['words']}")
@@ -0,0 +1,221 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime
+
+# =====================================================
+# TWO-PASS TRANSCRIPTION: BACKGROUND REFINEMENT
+# =====================================================
+# /stt/transcribe answers with a draft from the fast engine (STT_DRAFT_ENGINE)
+# and queues the same samples here. One low-priority worker per process
+# re-transcribes them with the accurate engine (STT_ENGINE) and hands the
+# result to the job's apply callback, which swaps the draft for the refined
+# text if the turn is still the one the draft was written to.
+#
+# The samples stay in the process that took the upload, but job state and
+# events live in a small SQLite database (STT_REFINE_DB) shared by all
+# api.serve workers:
+#   pending   one row per queued/running job → wait_idle() in any worker
+#             waits for drafts queued in every worker
+#   events    queued / refined / stale / failed with a global, increasing id
+#             → /stt/refinements streams them to subscribers of any worker
+# Jobs of a worker that died are dropped from pending (and reported as
+# failed) the next time somebody waits.
+#
+# The queue is bounded; when it is full, uploads skip the draft and are
+# transcribed with the accurate engine in the request, as in single-pass mode.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REFINE_DB = os.getenv("STT_REFINE_DB", os.path.join(os.getenv("DEBATE_DATA_DIR") or PROJECT_ROOT, "stt_refine.db"))
+REFINE_QUEUE_MAX = int(os.getenv("STT_REFINE_QUEUE_MAX", "32"))
+REFINE_NICE = int(os.getenv("STT_REFINE_NICE", "10"))  # added to the worker thread's niceness
+REFINE_WAIT_SECONDS = float(os.getenv("STT_REFINE_WAIT", "120"))  # analysis waits this long for drafts
+REFINE_EVENTS_KEEP = 1000  # recent events replayed to (re)connecting clients
+POLL_SECONDS = 0.25
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    job_id  TEXT PRIMARY KEY,
+    pid     INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    info    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    type   TEXT NOT NULL,
+    data   TEXT NOT NULL
+);
+"""
+
+_initialized = set()
+
+
+def _connect(db_path: str = REFINE_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    if db_path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _initialized.add(db_path)
+    return conn
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        # os.kill(pid, 0) would terminate the process on Windows; such rows
+        # only delay analysis until STT_REFINE_WAIT
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RefineQueue:
+    """Per-process background worker; pending jobs and events shared through REFINE_DB."""
+
+    def __init__(self, maxsize: int = REFINE_QUEUE_MAX, db_path: str = REFINE_DB):
+        self.maxsize = maxsize
+        self.db_path = db_path
+        self.completed = 0
+        self.failed = 0
+        self.stale = 0
+        self._jobs = queue.Queue(maxsize=maxsize)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    # -------------------------------
+    # SUBMITTING
+    # -------------------------------
+    def full(self) -> bool:
+        return self._jobs.full()
+
+    def submit(self, samples, apply, info: dict | None = None) -> dict | None:
+        """
+        Queues samples (16 kHz float32) for the accurate engine.
+        apply(job, segments) is called from the worker and returns True if
+        the refined text was stored. Returns the job, or None if the queue is full.
+        """
+        job = {"job_id": uuid.uuid4().hex, **(info or {})}
+        with closing(_connect(self.db_path)) as conn, conn:
+            conn.execute(
+                "INSERT INTO pending (job_id, pid, created, info) VALUES (?, ?, ?, ?)",
+                (job["job_id"], os.getpid(), datetime.now().isoformat(timespec="seconds"), json.dumps(job)),
+            )
+        try:
+            self._jobs.put_nowait((job, samples, apply))
+        except queue.Full:
+            self._finish(job["job_id"])
+            return None
+        self._ensure_worker()
+        self.publish("queued", job)
+        return job
+
+    def _finish(self, job_id: str):
+        with closing(_connect(self.db_path)) as conn, conn:
+            conn.execute("DELETE FROM pending WHERE job_id = ?", (job_id,))
+
+    def pending(self) -> int:
+        """Jobs queued or running in any live worker; those of dead workers are dropped."""
+        with closing(_connect(self.db_path)) as conn:
+            rows = conn.execute("SELECT job_id, pid, info FROM pending").fetchall()
+        live = 0
+        for job_id, pid, info in rows:
+            if _pid_alive(pid):
+                live += 1
+                continue
+            self._finish(job_id)
+            self.publish("failed", {**json.loads(info), "error": "worker exited before refining"})
+        return live
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Blocks until every queued job (of every worker) is applied; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_SECONDS)
+        return True
+
+    # -------------------------------
+    # WORKER
+    # -------------------------------
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="stt-refine", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # On Linux a thread has its own nice value; elsewhere this is a no-op
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), REFINE_NICE)
+        except (AttributeError, OSError):
+            pass
+
+        from Whispercpp.debate_whispercpp import run_whisper_samples, segments_text
+
+        while True:
+            job, samples, apply = self._jobs.get()
+            t0 = time.perf_counter()
+            try:
+                segments = run_whisper_samples(samples)
+                applied = apply(job, segments)
+                seconds = round(time.perf_counter() - t0, 3)
+                if applied:
+                    self.completed += 1
+                    event = ("refined", {**job, "text": segments_text(segments).strip(),
+                                         "segments": segments, "seconds": seconds})
+                else:
+                    # The debate was reset or the turn replaced meanwhile
+                    self.stale += 1
+                    event = ("stale", {**job, "seconds": seconds})
+            except Exception as e:
+                self.failed += 1
+                event = ("failed", {**job, "error": str(e)})
+            try:
+                self._finish(job["job_id"])
+                self.publish(*event)
+            except sqlite3.Error:
+                pass  # the worker must outlive a locked or broken state db
+
+    # -------------------------------
+    # EVENTS
+    # -------------------------------
+    def publish(self, event_type: str, data: dict):
+        with closing(_connect(self.db_path)) as conn, conn:
+            cur = conn.execute("INSERT INTO events (job_id, type, data) VALUES (?, ?, ?)",
+                               (data["job_id"], event_type, json.dumps(data)))
+            conn.execute("DELETE FROM events WHERE id <= ?", (cur.lastrowid - REFINE_EVENTS_KEEP,))
+
+    def events_after(self, after: int = 0, limit: int = 100) -> list[dict]:
+        """Events with id > after, oldest first: {"id", "type", ...job fields}."""
+        with closing(_connect(self.db_path)) as conn:
+            rows = conn.execute("SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                                (after, limit)).fetchall()
+        return [{"id": event_id, "type": event_type, **json.loads(data)} for event_id, event_type, data in rows]
+
+    def stats(self) -> dict:
+        return {
+            "max_queue": self.maxsize,
+            "pending": self.pending(),
+            # Counters below are for this worker process only
+            "queued_here": self._jobs.qsize(),
+            "completed": self.completed,
+            "stale": self.stale,
+            "failed": self.failed,
+        }
+
+
+refine_queue = RefineQueue()
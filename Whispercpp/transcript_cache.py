@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+
+CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(PROJECT_ROOT, ".transcript_cache"))
+CACHE_MAX_BYTES = int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+STALE_TMP_SECONDS = 3600
+
+
+# -----------------------------
+# KEYS
+# -----------------------------
+def audio_digest(path: str) -> str:
+    """
+    Hash of the decoded PCM stream (format + samples), so the same clip hashes
+    identically whatever the container metadata. Non-WAV input falls back to
+    hashing the raw bytes.
+    """
+    h = hashlib.sha256()
+    try:
+        with wave.open(path, "rb") as wf:
+            h.update(f"pcm:{wf.getnchannels()}:{wf.getsampwidth()}:{wf.getframerate()}".encode())
+            while True:
+                frames = wf.readframes(1 << 16)
+                if not frames:
+                    break
+                h.update(frames)
+    except (wave.Error, EOFError):
+        h = hashlib.sha256(b"raw:")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def pcm_digest(samples, samplerate: int) -> str:
+    """
+    audio_digest() of the clip as write_wav_int16() would store it, so decoded
+    uploads and the same audio sent as 16-bit mono WAV share cache entries.
+    """
+    h = hashlib.sha256(f"pcm:1:2:{samplerate}".encode())
+    h.update((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+    return h.hexdigest()
+
+
+def model_identity(model_path: str | None) -> str:
+    """Path + size + mtime: replacing the model file invalidates its entries."""
+    if not model_path:
+        return "none"
+    try:
+        st = os.stat(model_path)
+        return f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return os.path.abspath(model_path)
+
+
+def cache_key(audio_hash: str, model_id: str, options) -> str:
+    payload = json.dumps([audio_hash, model_id, list(options)], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# -----------------------------
+# DISK-BACKED LRU
+# -----------------------------
+class TranscriptCache:
+    """
+    One JSON file per entry under cache_dir. Recency is the file mtime (touched
+    on every hit), so LRU order survives restarts. The directory is the only
+    index: after each write it is scanned and, past max_bytes, the least
+    recently used entries are deleted, so the bound holds across all api.serve
+    workers sharing it. Concurrent requests for the same key within a process
+    wait for the first one instead of transcribing twice. The cache is
+    best-effort: a failed read or write never fails the transcription.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Counters are per process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        """(mtime, path, size) of every entry, least recently used first."""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # evicted by another worker meanwhile
+            if name.endswith(".json"):
+                entries.append((st.st_mtime, path, st.st_size))
+            elif name.endswith(".tmp") and time.time() - st.st_mtime > STALE_TMP_SECONDS:
+                # Left behind by a worker killed mid-write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        entries.sort()
+        return entries
+
+    def _read(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+        now = time.time()
+        try:
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+        return value
+
+    def _write(self, key: str, value):
+        data = json.dumps({"value": value, "created": time.time()}).encode("utf-8")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Unique temp name: workers may store the same key at the same time
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            with self._lock:
+                self.write_errors += 1
+            return
+        self._evict()
+
+    def _evict(self):
+        # Runs without self._lock: the directory walk must not hold up cache hits
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+            total -= size
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def get_or_compute(self, key: str, compute):
+        while True:
+            value = self._read(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+            with self._lock:
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Same clip already being transcribed (client retry) → wait for it
+            waiter.wait()
+
+        try:
+            value = compute()
+            self._write(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def clear(self):
+        for _, path, _ in self._scan():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        entries = self._scan()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "entries": len(entries),
+                "bytes": sum(size for _, _, size in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "write_errors": self.write_errors,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,83 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from api.admission import admission
+from api.profiling import PROFILE_INTERVAL_MS, list_profiles, profile_path, profiler
+
+# Every /admin route (and X-Profile profiling) requires "X-Admin-Token: <token>";
+# without ADMIN_TOKEN set they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def admin_token_ok(token: str | None) -> bool:
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(token or "", ADMIN_TOKEN)
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled; set ADMIN_TOKEN to enable them")
+    if not admin_token_ok(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/admission")
+def admission_stats():
+    """
+    Per priority class: limits, active / queued requests, shed counts and
+    queue wait percentiles
+    """
+    return admission.stats()
+
+
+@router.get("/profiling")
+def profiling_status():
+    """
+    Armed profile slots, profiles running / completed / skipped (cap reached)
+    """
+    return profiler.stats()
+
+
+@router.post("/profiling")
+def arm_profiling(
+    path_prefix: str = Query("/analyze", description="Profile requests whose path starts with this"),
+    count: int = Query(1, ge=1, le=100, description="How many matching requests to profile"),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000),
+):
+    """
+    Profiles the next count requests under path_prefix. A single request can
+    also be profiled by sending it with X-Profile: 1.
+    """
+    return {"status": "armed", **profiler.arm(path_prefix, count, interval_ms)}
+
+
+@router.delete("/profiling")
+def disarm_profiling():
+    profiler.disarm()
+    return {"status": "success"}
+
+
+@router.get("/profiles")
+def recent_profiles(limit: int = Query(20, ge=1, le=200)):
+    """
+    Newest profiles first: id, route, status, duration and sample count
+    """
+    return {"profiles": list_profiles(limit)}
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, format: str = Query("folded", pattern="^(folded|json)$")):
+    """
+    format=folded: collapsed stacks for flamegraph.pl / speedscope.app.
+    format=json: request metadata and the hottest functions.
+    """
+    path = profile_path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    media_type = "application/json" if format == "json" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
@@ -0,0 +1,317 @@
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+from collections import deque
+
+# =====================================================
+# ADMISSION CONTROL
+# =====================================================
+# Every HTTP request is mapped to a priority class by path:
+#
+#   live      /stt/transcribe, /chatbot/respond         (a debate is waiting on it)
+#   analysis  /analyze/*, /winner/*, /debates/*         (end-of-debate scoring)
+#   bulk      /stt/batch, /stt/diarize, /winner/rescore (imports and re-runs)
+#
+# A class first passes a per-client token bucket (429 when empty), then waits
+# for a slot: each class has its own concurrency cap and all classes share
+# ADMISSION_MAX_ACTIVE slots, handed out in priority order (live first). A
+# request that would wait longer than its class allows, or finds the queue
+# full, is shed with 503. Both carry Retry-After. Other paths (cheap GETs,
+# WebSockets) are not gated.
+#
+# All limits apply per worker process: state lives in memory and is not
+# shared, so with python -m api.serve --workers N the server as a whole admits
+# up to N times ADMISSION_MAX_ACTIVE and every class cap, and a client's token
+# bucket refills in each worker its connections land on. Size the settings
+# for one worker (e.g. ADMISSION_ANALYSIS_CONCURRENCY=1 with 4 workers allows
+# 4 analyses at once); /admin/admission reports the worker that answered.
+
+ADMISSION_ENABLED = os.getenv("ADMISSION", "1") != "0"
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", "8"))
+# Clients are keyed by peer address. X-Client-Id is honoured only from these
+# peers (a reverse proxy that sets it), or from anyone with "*" (testing only:
+# otherwise a client escapes its bucket by sending a new id per request)
+TRUSTED_PROXIES = {p.strip() for p in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if p.strip()}
+WAIT_SAMPLES = 1000  # recent queue waits kept per class for percentiles
+
+
+def _env(cls: str, name: str, default):
+    value = os.getenv(f"ADMISSION_{cls.upper()}_{name.upper()}")
+    return type(default)(value) if value else default
+
+
+# priority: lower runs first. rate/burst: per-client token bucket (requests/s).
+# concurrency: running at once. max_queue / max_wait_s: when to shed instead of waiting.
+CLASS_DEFAULTS = {
+    "live":     {"priority": 0, "rate": 2.0,  "burst": 10, "concurrency": 6, "max_queue": 32, "max_wait_s": 10.0},
+    "analysis": {"priority": 1, "rate": 0.2,  "burst": 3,  "concurrency": 2, "max_queue": 16, "max_wait_s": 60.0},
+    "bulk":     {"priority": 2, "rate": 0.05, "burst": 2,  "concurrency": 1, "max_queue": 4,  "max_wait_s": 5.0},
+}
+
+ROUTE_CLASSES = [
+    # (method or None, path prefix, class); first match wins
+    ("POST", "/stt/transcribe", "live"),
+    ("POST", "/chatbot/respond", "live"),
+    ("POST", "/stt/batch", "bulk"),
+    ("POST", "/stt/diarize", "bulk"),
+    (None, "/winner/rescore", "bulk"),
+    ("POST", "/analyze", "analysis"),
+    ("POST", "/winner", "analysis"),
+    (None, "/debates", "analysis"),
+]
+
+
+def classify(method: str, path: str) -> str | None:
+    for route_method, prefix, cls in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and (path == prefix or path.startswith(prefix + "/")):
+            return cls
+    return None
+
+
+# -------------------------------
+# PER-CLIENT TOKEN BUCKETS
+# -------------------------------
+class TokenBuckets:
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = {}  # client -> (tokens, last refill)
+
+    def take(self, client: str) -> float:
+        """0 when admitted, otherwise seconds until the next token."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens >= 1.0:
+            self._buckets[client] = (tokens - 1.0, now)
+            admitted = 0.0
+        else:
+            self._buckets[client] = (tokens, now)
+            admitted = (1.0 - tokens) / self.rate if self.rate > 0 else 60.0
+
+        if len(self._buckets) > self.max_clients:
+            # Drop the longest idle clients; a full bucket is the default anyway
+            for stale, _ in sorted(self._buckets.items(), key=lambda kv: kv[1][1])[: self.max_clients // 10]:
+                self._buckets.pop(stale, None)
+        return admitted
+
+
+# -------------------------------
+# PRIORITY SLOTS
+# -------------------------------
+class Rejected(Exception):
+    def __init__(self, status: int, retry_after: float, reason: str):
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class ClassState:
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.config = config
+        self.buckets = TokenBuckets(config["rate"], config["burst"])
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.service_times = deque(maxlen=WAIT_SAMPLES)
+
+    def retry_after(self) -> float:
+        # Rough time for the queue ahead to drain
+        per_request = (sum(self.service_times) / len(self.service_times)) if self.service_times else 1.0
+        return per_request * (self.queued + 1) / max(1, self.config["concurrency"])
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+class AdmissionController:
+    def __init__(self, max_active: int = ADMISSION_MAX_ACTIVE, classes: dict | None = None):
+        self.max_active = max_active
+        self.active = 0
+        self.classes = {
+            name: ClassState(name, {k: _env(name, k, v) for k, v in defaults.items()})
+            for name, defaults in (classes or CLASS_DEFAULTS).items()
+        }
+        self._waiters = []  # heap of (priority, seq, future, class)
+        self._seq = itertools.count()
+
+    def _grant(self, state: ClassState):
+        self.active += 1
+        state.active += 1
+
+    def _wake(self):
+        # Highest priority first; a class at its own cap does not block lower classes
+        blocked = []
+        while self._waiters and self.active < self.max_active:
+            priority, seq, future, state = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if state.active < state.config["concurrency"]:
+                self._grant(state)
+                future.set_result(True)
+            else:
+                blocked.append((priority, seq, future, state))
+        for item in blocked:
+            heapq.heappush(self._waiters, item)
+
+    async def acquire(self, cls: str, client: str) -> float:
+        """Waits for a slot; returns the queue wait in seconds or raises Rejected."""
+        state = self.classes[cls]
+
+        wait = state.buckets.take(client)
+        if wait > 0:
+            state.rate_limited += 1
+            raise Rejected(429, wait, "rate limit")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (state.config["priority"], next(self._seq), future, state))
+        self._wake()
+        if future.done():
+            state.admitted += 1
+            state.waits.append(0.0)
+            return 0.0
+
+        if state.queued >= state.config["max_queue"]:
+            future.cancel()
+            state.shed_queue_full += 1
+            raise Rejected(503, state.retry_after(), "queue full")
+
+        state.queued += 1
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=state.config["max_wait_s"])
+        except asyncio.TimeoutError:
+            # A grant in the same instant as the timeout keeps the slot
+            if not future.done():
+                future.cancel()
+                state.shed_timeout += 1
+                raise Rejected(503, state.retry_after(), "queue timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted meanwhile
+            if future.done() and not future.cancelled():
+                self.release(cls, 0.0)
+            else:
+                future.cancel()
+            raise
+        finally:
+            state.queued -= 1
+
+        waited = time.monotonic() - t0
+        state.admitted += 1
+        state.waits.append(waited)
+        return waited
+
+    def release(self, cls: str, service_s: float):
+        state = self.classes[cls]
+        self.active -= 1
+        state.active -= 1
+        state.service_times.append(service_s)
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "pid": os.getpid(),  # limits and counters are this worker's
+            "max_active": self.max_active,
+            "active": self.active,
+            "classes": {
+                name: {
+                    **state.config,
+                    "active": state.active,
+                    "queued": state.queued,
+                    "admitted": state.admitted,
+                    "rate_limited": state.rate_limited,
+                    "shed_queue_full": state.shed_queue_full,
+                    "shed_timeout": state.shed_timeout,
+                    "wait_p50_s": round(_percentile(state.waits, 0.50), 4),
+                    "wait_p95_s": round(_percentile(state.waits, 0.95), 4),
+                    "wait_max_s": round(max(state.waits, default=0.0), 4),
+                    "service_p50_s": round(_percentile(state.service_times, 0.50), 4),
+                }
+                for name, state in self.classes.items()
+            },
+        }
+
+
+admission = AdmissionController()
+
+
+# -------------------------------
+# ASGI MIDDLEWARE
+# -------------------------------
+def client_id(scope, trusted: set = TRUSTED_PROXIES) -> str:
+    client = scope.get("client")
+    host = client[0] if client else "unknown"
+    if "*" in trusted or host in trusted:
+        for name, value in scope.get("headers", []):
+            if name == b"x-client-id":
+                return value.decode("latin-1")[:128]
+    return host
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI so streaming responses keep their slot until the last byte is
+    sent. Adds X-Queue-Wait to admitted responses.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.controller = controller
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cls = classify(scope["method"], scope["path"])
+        if cls is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            waited = await self.controller.acquire(cls, client_id(scope))
+        except Rejected as e:
+            return await self._reject(send, e, cls)
+
+        async def send_with_wait(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-queue-wait", f"{waited:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        t0 = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_wait)
+        finally:
+            self.controller.release(cls, time.monotonic() - t0)
+
+    @staticmethod
+    async def _reject(send, error: Rejected, cls: str):
+        retry_after = max(1, math.ceil(error.retry_after))
+        body = json.dumps({"detail": f"Server busy ({cls}: {error.reason}), retry later",
+                           "retry_after": retry_after}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
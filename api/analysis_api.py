@@ -1,22 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from Analyzer.aly import analyze_debate
+from fastapi import APIRouter, HTTPException, Query, Request
+from Analyzer import columnar_archive
+from Analyzer.aly import FINAL_OUTPUT_CHATBOT, FINAL_OUTPUT_STT, analyze_debate, argument_cascade
+from Analyzer.columnar_archive import argument_rates
+from Analyzer.jobs import JOBS_ENABLED, job_status, list_jobs, run_analysis_job, valid_job_id
+from Analyzer.results_archive import latest_archive_file, load_debate_results
+from Analyzer.rubrics import get_rubric
+from Analyzer.transcript_parser import iter_report_entries
+from Analyzer.winner import marking_points
+from Whispercpp.refine import REFINE_WAIT_SECONDS, refine_queue
+from api.responses import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    json_response,
+    paginate,
+    parse_fields,
+    select_fields,
+    wants,
+)
 import os
 from collections import defaultdict
 
 router = APIRouter(prefix="/analyze", tags=["Analysis"])
 
-SENTIMENT_SCORE = {
-    "POSITIVE": 1.0,
-    "NEGATIVE": 1.0,
-    "NEUTRAL": 0.0
-}
+REPORT_FILES = {"stt": FINAL_OUTPUT_STT, "chatbot": FINAL_OUTPUT_CHATBOT}
 
-ARGUMENT_SCORE = {
-    "Claim": 1.5,
-    "Evidence": 1.5,
-    "Rebuttal": 1.0,
-    "Statement": 0.0
-}
 
 def _parse_analysis_stats(analysis_text: str) -> dict:
     """
@@ -26,204 +33,187 @@ def _parse_analysis_stats(analysis_text: str) -> dict:
     - Sentiment labels (POSITIVE/NEGATIVE/NEUTRAL when present)
     - Argument types (Claim/Evidence/Rebuttal/Statement)
 
-    This mirrors the logic used by Analyzer/winner.py, so the UI matches backend scoring.
+    Uses the same report parser as Analyzer/winner.py, so the UI matches backend scoring.
     """
     stats = defaultdict(lambda: defaultdict(int))
-    lines = analysis_text.splitlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Look for sentence blocks: "Sentence N:"
-        if line.startswith("Sentence ") and line.endswith(":"):
-            # Collect the entire sentence block
-            corrected_text_lines = []
-            sentiment = None
-            arg_type = None
-            
-            i += 1
-            # Collect "Corrected Text" lines until we hit "Sentiment"
-            while i < len(lines):
-                current_line = lines[i].strip()
-                if current_line.startswith("Corrected Text"):
-                    # Get text after "Corrected Text :"
-                    parts = current_line.split(":", 1)
-                    if len(parts) == 2:
-                        corrected_text_lines.append(parts[1].strip())
-                elif current_line.startswith("Sentiment"):
-                    parts = current_line.split(":", 1)
-                    if len(parts) == 2:
-                        sentiment = parts[1].strip()
-                elif current_line.startswith("Argument Type"):
-                    parts = current_line.split(":", 1)
-                    if len(parts) == 2:
-                        arg_type = parts[1].strip()
-                    # Found argument type - determine speaker from corrected text
-                    break
-                elif current_line and not current_line.startswith("-"):
-                    # Continuation of corrected text
-                    corrected_text_lines.append(current_line)
-                i += 1
-            
-            # Determine speaker from corrected text
-            # With the updated analyzer, corrected text should start with speaker label
-            corrected_text = "\n".join(corrected_text_lines)
-            speaker = None
-            
-            # Check if corrected text starts with a speaker label (new format)
-            if corrected_text.startswith("USER:"):
-                speaker = "USER"
-            elif corrected_text.startswith("DEBATE GPT:"):
-                speaker = "DEBATE GPT"
-            elif corrected_text.startswith("User 1:"):
-                speaker = "User 1"
-            elif corrected_text.startswith("User 2:"):
-                speaker = "User 2"
-            else:
-                # Fallback: search for speaker labels in the text
-                # Find which speaker label appears closest before the sentence content
-                lines_before_sentiment = corrected_text.split("\n")
-                sentence_content = None
-                for line in reversed(lines_before_sentiment):
-                    line = line.strip()
-                    if line and not line.startswith("[") and not line.startswith("==="):
-                        # Check if this line itself contains a speaker label
-                        if "USER:" in line and "DEBATE GPT:" not in line:
-                            speaker = "USER"
-                            break
-                        elif "DEBATE GPT:" in line:
-                            speaker = "DEBATE GPT"
-                            break
-                        elif "User 1:" in line:
-                            speaker = "User 1"
-                            break
-                        elif "User 2:" in line:
-                            speaker = "User 2"
-                            break
-                        elif ":" not in line or not any(x in line for x in ["USER", "DEBATE GPT", "User 1", "User 2"]):
-                            # Found actual sentence content
-                            sentence_content = line
-                            break
-                
-                if not speaker and sentence_content:
-                    # Find which speaker label appears before this sentence
-                    sentence_pos = corrected_text.find(sentence_content)
-                    positions = []
-                    for label in ["DEBATE GPT:", "USER:", "User 1:", "User 2:"]:
-                        pos = corrected_text.find(label)
-                        if pos >= 0 and pos < sentence_pos:
-                            speaker_name = label.rstrip(":")
-                            if speaker_name == "DEBATE GPT":
-                                speaker_name = "DEBATE GPT"
-                            positions.append((speaker_name, pos))
-                    if positions:
-                        positions.sort(key=lambda x: x[1], reverse=True)
-                        speaker = positions[0][0]
-                
-                # Final fallback
-                if not speaker:
-                    if "DEBATE GPT:" in corrected_text:
-                        debate_gpt_pos = corrected_text.find("DEBATE GPT:")
-                        user_pos = corrected_text.find("USER:")
-                        if user_pos >= 0 and (debate_gpt_pos < 0 or user_pos > debate_gpt_pos):
-                            speaker = "USER"
-                        else:
-                            speaker = "DEBATE GPT"
-                    elif "USER:" in corrected_text:
-                        speaker = "USER"
-                    elif "User 1:" in corrected_text:
-                        speaker = "User 1"
-                    elif "User 2:" in corrected_text:
-                        speaker = "User 2"
-            
-            # If we found a speaker and argument type, record stats
-            if speaker and arg_type:
-                if sentiment:
-                    stats[speaker][sentiment] += 1
-                stats[speaker][arg_type] += 1
-        
-        i += 1
+    for entry in iter_report_entries(analysis_text):
+        speaker = entry["speaker"]
+        arg_type = entry.get("argument_type")
+        if speaker and arg_type:
+            if entry.get("sentiment"):
+                stats[speaker][entry["sentiment"]] += 1
+            stats[speaker][arg_type] += 1
 
     return {user: dict(counts) for user, counts in stats.items()}
 
-def _compute_marking_points(stats: dict | None) -> dict | None:
+def _compute_marking_points(stats: dict | None, rubric_version: str | None = None) -> dict | None:
     """
-    Compute marking points from stats (same weights as Analyzer/winner.py).
+    Compute marking points from stats (same rubric as Analyzer/winner.py).
     Returns per-user totals + breakdown.
     """
     if not stats:
         return None
 
-    marking = {}
-    for user, counts in stats.items():
-        sentiment_points = 0.0
-        argument_points = 0.0
+    return marking_points(stats, get_rubric(rubric_version))
 
-        for k, v in counts.items():
-            if k in SENTIMENT_SCORE:
-                sentiment_points += SENTIMENT_SCORE[k] * float(v)
-            if k in ARGUMENT_SCORE:
-                argument_points += ARGUMENT_SCORE[k] * float(v)
 
-        total = sentiment_points + argument_points
-        marking[user] = {
-            "total": round(total, 3),
-            "sentiment_points": round(sentiment_points, 3),
-            "argument_points": round(argument_points, 3),
-        }
-
-    return marking
+def _analysis_payload(result: dict, fields: set[str] | None, cursor: str | None, limit: int) -> dict:
+    """
+    Builds the analysis response, doing only the work the selected fields need.
+    "sentences" is a cursor-paginated page of the per-sentence results.
+    """
+    payload = {"status": "success", **result}
+    output_file = result.get("output_file")
+
+    analysis_text = None
+    if output_file and os.path.exists(output_file) and (
+        wants(fields, "analysis_text") or wants(fields, "stats") or wants(fields, "marking")
+    ):
+        with open(output_file, "r", encoding="utf-8") as f:
+            analysis_text = f.read()
+
+    stats = _parse_analysis_stats(analysis_text) if analysis_text else None
+    payload["analysis_text"] = analysis_text
+    payload["stats"] = stats
+    payload["marking"] = _compute_marking_points(stats)
+
+    archive_file = result.get("archive_file")
+    if fields is not None and "sentences" in fields and archive_file and os.path.exists(archive_file):
+        archived = load_debate_results(archive_file)
+        page, next_cursor = paginate(archived["sentences"], archived["debate_id"], cursor, limit)
+        payload["sentences"] = page
+        payload["next_cursor"] = next_cursor
+        payload["total_sentences"] = len(archived["sentences"])
+        fields = fields | {"next_cursor", "total_sentences"}
+
+    return select_fields(payload, fields)
+
+
+def _run_analysis(request: Request, mode: str, fields: str | None, cursor: str | None, limit: int,
+                  job_id: str | None = None):
+    if job_id is not None and not valid_job_id(job_id):
+        raise HTTPException(status_code=400, detail="job_id may only contain letters, digits, '.', '_' and '-'")
+    try:
+        if mode == "stt":
+            # Analyse refined turns, not drafts still in the two-pass queue
+            refine_queue.wait_idle(REFINE_WAIT_SECONDS)
+        if JOBS_ENABLED:
+            # Checkpointed: a retry after a crash resumes instead of starting over
+            result = run_analysis_job(mode=mode, job_id=job_id)
+        else:
+            result = analyze_debate(mode=mode)
+        return json_response(request, _analysis_payload(result, parse_fields(fields), cursor, limit))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/stt")
-def analyze_stt():
+def analyze_stt(
+    request: Request,
+    fields: str | None = Query(None, description="Comma-separated keys, e.g. stats,marking,sentences"),
+    cursor: str | None = Query(None, description="next_cursor of the previous sentences page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    job_id: str | None = Query(None, description="Idempotency key; default: derived from the transcript"),
+):
     """
     Analyze STT debate transcript
     """
-    try:
-        result = analyze_debate(mode="stt")
-        output_file = result.get("output_file")
-        analysis_text = None
-        stats = None
-        if output_file and os.path.exists(output_file):
-            with open(output_file, "r", encoding="utf-8") as f:
-                analysis_text = f.read()
-            stats = _parse_analysis_stats(analysis_text)
-        marking = _compute_marking_points(stats)
-
-        return {
-            **result,
-            "analysis_text": analysis_text,
-            "stats": stats,
-            "marking": marking
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _run_analysis(request, "stt", fields, cursor, limit, job_id)
 
 
 @router.post("/chatbot")
-def analyze_chatbot():
+def analyze_chatbot(
+    request: Request,
+    fields: str | None = Query(None, description="Comma-separated keys, e.g. stats,marking,sentences"),
+    cursor: str | None = Query(None, description="next_cursor of the previous sentences page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    job_id: str | None = Query(None, description="Idempotency key; default: derived from the transcript"),
+):
     """
     Analyze chatbot debate transcript
     """
+    return _run_analysis(request, "chatbot", fields, cursor, limit, job_id)
+
+
+@router.get("/cascade")
+def argument_cascade_stats():
+    """
+    Argument classifier cascade of this worker: thresholds and, per tier
+    (rules / classifier / nli), sentences seen, accepted and ms per sentence
+    """
+    return argument_cascade.stats()
+
+
+@router.get("/jobs")
+def analysis_jobs(limit: int = Query(20, ge=1, le=200)):
+    """
+    Recent analysis jobs: status (running / completed / failed / interrupted),
+    runs, and windows resumed from the checkpoint vs. computed
+    """
+    return {"enabled": JOBS_ENABLED, "jobs": list_jobs(limit)}
+
+
+@router.get("/jobs/{job_id}")
+def analysis_job(job_id: str):
+    """
+    One analysis job, with its result once completed
+    """
+    job = job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis job: {job_id}")
+    return job
+
+
+@router.get("/{mode}/result")
+def latest_analysis(
+    request: Request,
+    mode: str,
+    fields: str | None = Query("stats,marking,sentences", description="Comma-separated keys"),
+    cursor: str | None = Query(None, description="next_cursor of the previous sentences page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Last analysis of a mode without re-running the models. Supports
+    If-None-Match, so polling clients get 304 until a new analysis lands.
+    """
+    if mode not in REPORT_FILES:
+        raise HTTPException(status_code=404, detail=f"Unknown mode '{mode}'")
+
+    archive_file = latest_archive_file(mode)
+    if archive_file is None and not os.path.exists(REPORT_FILES[mode]):
+        raise HTTPException(status_code=404, detail=f"No {mode} analysis yet. Run /analyze/{mode} first.")
+
+    result = {
+        "mode": mode,
+        "output_file": REPORT_FILES[mode],
+        "debate_id": os.path.splitext(os.path.basename(archive_file))[0] if archive_file else None,
+        "archive_file": archive_file,
+    }
+    return json_response(request, _analysis_payload(result, parse_fields(fields), cursor, limit))
+
+
+@router.get("/archive/rates")
+def archive_argument_rates(by: str = "speaker", mode: str | None = None, since: str | None = None,
+                           until: str | None = None, speaker: str | None = None):
+    """
+    Argument mix (claim / evidence / rebuttal rates) across all archived debates,
+    grouped by speaker, mode, date, ... Filters: mode, since/until (YYYY-MM-DD), speaker.
+    """
+    if not columnar_archive.available():
+        raise HTTPException(status_code=501, detail="Columnar archive needs pyarrow installed on the server")
     try:
-        result = analyze_debate(mode="chatbot")
-        output_file = result.get("output_file")
-        analysis_text = None
-        stats = None
-        if output_file and os.path.exists(output_file):
-            with open(output_file, "r", encoding="utf-8") as f:
-                analysis_text = f.read()
-            stats = _parse_analysis_stats(analysis_text)
-        marking = _compute_marking_points(stats)
-
-        return {
-            **result,
-            "analysis_text": analysis_text,
-            "stats": stats,
-            "marking": marking
-        }
+        rows = argument_rates(by, mode=mode, since=since, until=until, speaker=speaker)
+        return {"status": "success", "data": rows}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/archive/summary")
+def archive_summary():
+    if not columnar_archive.available():
+        raise HTTPException(status_code=501, detail="Columnar archive needs pyarrow installed on the server")
+    return {"status": "success", "data": columnar_archive.summary()}
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from Chatbot.debate_cli import get_chatbot_reply
+from Chatbot.reply_cache import reply_cache
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
@@ -9,6 +10,8 @@ class ChatRequest(BaseModel):
     topic: str
     stance: str
     message: str
+    temperature: float | None = None  # None → CHATBOT_TEMPERATURE / model default
+    cache: bool = True  # False → always generate a fresh reply
 
 
 @router.post("/respond")
@@ -20,7 +23,9 @@ def chatbot_respond(data: ChatRequest):
         reply = get_chatbot_reply(
             topic=data.topic,
             stance=data.stance,
-            user_msg=data.message
+            user_msg=data.message,
+            temperature=data.temperature,
+            use_cache=data.cache
         )
 
         return {
@@ -30,3 +35,17 @@ def chatbot_respond(data: ChatRequest):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache")
+def chatbot_cache_stats():
+    """
+    Reply cache size and hit / miss / coalesced counters
+    """
+    return reply_cache.stats()
+
+
+@router.delete("/cache")
+def chatbot_cache_clear():
+    reply_cache.clear()
+    return {"status": "success"}
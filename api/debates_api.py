@@ -0,0 +1,49 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from Analyzer.debate_report import build_debate_report
+from api.responses import json_response, parse_fields, select_fields
+from Whispercpp.refine import REFINE_WAIT_SECONDS, refine_queue
+
+router = APIRouter(prefix="/debates", tags=["Debates"])
+
+# debate_id also names the archive files written with files=true
+_DEBATE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,100}$")
+
+
+@router.post("/{debate_id}/report")
+def debate_report(
+    request: Request,
+    debate_id: str,
+    mode: str = Query("stt", pattern="^(stt|chatbot)$"),
+    rubric: str | None = Query(None, description="Rubric version (default: the active rubric)"),
+    files: bool = Query(False, description="Also write the analysis report, archives and winner report"),
+    fields: str | None = Query(None, description="Comma-separated keys, e.g. winner,scores,marking,sentences"),
+):
+    """
+    Analysis, stats, marking and winner of the current debate in one call,
+    scored in memory as the sentences are analysed (no report file round-trip).
+    "sentences" is only returned when asked for in fields.
+    """
+    if not _DEBATE_ID.match(debate_id) or ".." in debate_id:
+        raise HTTPException(status_code=400, detail="debate_id may only contain letters, digits, '.', '_' and '-'")
+
+    selected = parse_fields(fields)
+    if mode == "stt":
+        refine_queue.wait_idle(REFINE_WAIT_SECONDS)
+    try:
+        report = build_debate_report(
+            mode=mode,
+            debate_id=debate_id,
+            rubric_version=rubric,
+            write_files=files,
+            include_sentences=selected is not None and "sentences" in selected,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No {mode} transcript found. Record a debate first.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return json_response(request, select_fields({"status": "success", **report}, selected))
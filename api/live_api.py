@@ -0,0 +1,76 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from starlette.concurrency import run_in_threadpool
+from Livestream.vosk_stream import (
+    DEFAULT_MODEL,
+    SAMPLE_RATE,
+    VOSK_MODELS,
+    StreamingSession,
+    VoskUnavailable,
+    available,
+    model_pool,
+)
+
+router = APIRouter(prefix="/live", tags=["Live Captions"])
+
+
+@router.get("/models")
+def list_models():
+    """
+    Available Vosk models and how many instances are loaded
+    """
+    return {
+        "installed": available(),
+        "default": DEFAULT_MODEL,
+        "available": list(VOSK_MODELS),
+        "loaded": model_pool.loaded(),
+    }
+
+
+@router.websocket("/ws")
+async def live_captions(
+    websocket: WebSocket,
+    model: str = Query(DEFAULT_MODEL, description="Vosk model: small or lgraph"),
+    sample_rate: int = Query(SAMPLE_RATE, description="Sample rate of the PCM frames"),
+):
+    """
+    Streaming speech recognition.
+    Client sends binary frames of 16-bit mono PCM and a text frame "eof" to finish.
+    Server pushes {"type": "partial" | "final", "text": ...} as recognition progresses
+    and ends with {"type": "end", "transcript": ...}.
+    """
+    await websocket.accept()
+
+    try:
+        session = await run_in_threadpool(StreamingSession, model, sample_rate)
+    except VoskUnavailable as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011, reason="vosk is not installed")
+        return
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        last_partial = None
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes"):
+                event = await run_in_threadpool(session.accept, message["bytes"])
+                # Unchanged partials carry no news; skip them to save bandwidth
+                if event["type"] == "partial" and event["text"] == last_partial:
+                    continue
+                last_partial = event["text"] if event["type"] == "partial" else None
+                await websocket.send_json(event)
+            elif (message.get("text") or "").strip().lower() == "eof":
+                break
+
+        await websocket.send_json(await run_in_threadpool(session.finish))
+        await websocket.send_json({"type": "end", "transcript": session.transcript})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,510 @@
+import argparse
+import io
+import json
+import math
+import os
+import random
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =====================================================
+# CONCURRENT-DEBATE LOAD TEST
+# =====================================================
+# python -m api.loadtest --concurrency 1,2,4,8 --whisper-latency 1.5 --ollama-latency 2
+#
+# Starts api.main:app in a uvicorn subprocess (or api.serve with --workers) in
+# a scratch directory, with local stand-ins instead of whisper.cpp and Ollama:
+#
+#   whisper-cli  a generated script set as WHISPER_CLI; it sleeps for the
+#                configured latency and writes whisper.cpp -ojf JSON
+#   Ollama       an HTTP server in this process answering /api/chat, passed
+#                to the app as OLLAMA_HOST
+#
+# Each simulated debate uploads its turns to /stt/transcribe, has chatbot
+# exchanges on /chatbot/respond, then calls /analyze/stt and /winner/stt.
+# Concurrency ramps through the given levels; every level reports debates/s
+# and per-endpoint throughput, error rate and latency percentiles.
+#
+# Only the standard library is used on the client side, and the server runs
+# with HF_HUB_OFFLINE / TRANSFORMERS_OFFLINE set, so nothing touches the
+# network. /analyze and /winner still run the real Analyzer models: without
+# them in the local Hugging Face cache those calls fail and are counted as
+# errors (or skip them with --skip-analysis).
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SENTENCES = [
+    "i think this policy helps students learn better",
+    "because the data from several schools shows higher scores",
+    "however my opponent ignores the cost to families",
+    "for example a study in finland found the opposite result",
+    "this proves that the current system is failing",
+    "in conclusion we should support the motion",
+    "but that argument assumes everyone has the same access",
+    "research shows that early intervention works",
+]
+
+TOPICS = [
+    "Homework should be banned in primary schools",
+    "Social media does more harm than good",
+    "Voting should be compulsory",
+    "Remote work is better than office work",
+]
+
+
+# -------------------------------
+# STAND-IN: whisper-cli
+# -------------------------------
+def fake_whisper_main(argv: list[str]):
+    """
+    Behaves like whisper-cli for the flags the app passes (-m, -f, -ojf, -of,
+    --no-timestamps). Latency comes from LOADTEST_WHISPER_LATENCY(_JITTER).
+    """
+    args = {}
+    flags = set()
+    i = 0
+    while i < len(argv):
+        if argv[i] in ("-m", "-f", "-of") and i + 1 < len(argv):
+            args[argv[i]] = argv[i + 1]
+            i += 2
+        else:
+            flags.add(argv[i])
+            i += 1
+
+    latency = float(os.getenv("LOADTEST_WHISPER_LATENCY", "1.0"))
+    jitter = float(os.getenv("LOADTEST_WHISPER_JITTER", "0.2"))
+    time.sleep(max(0.0, random.gauss(latency, latency * jitter)))
+
+    rng = random.Random(args.get("-f", ""))
+    texts = rng.sample(SENTENCES, 3)
+    if "-ojf" not in flags:
+        print(" ".join(texts))
+        return
+
+    transcription = []
+    t = 0
+    for text in texts:
+        words = text.split()
+        duration = 300 * len(words)
+        transcription.append({
+            "offsets": {"from": t, "to": t + duration},
+            "text": " " + text,
+            "tokens": [{"text": " " + w, "p": round(rng.uniform(0.6, 0.99), 3)} for w in words],
+        })
+        t += duration + rng.choice((150, 800))
+    with open(args["-of"] + ".json", "w", encoding="utf-8") as f:
+        json.dump({"transcription": transcription}, f)
+
+
+def write_fake_whisper(directory: str) -> tuple[str, str]:
+    """Writes the whisper-cli wrapper and a dummy model file; returns (cli, model)."""
+    cli = os.path.join(directory, "whisper-cli")
+    with open(cli, "w", encoding="utf-8") as f:
+        f.write(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {PROJECT_ROOT!r})\n"
+            "from api.loadtest import fake_whisper_main\n"
+            "fake_whisper_main(sys.argv[1:])\n"
+        )
+    os.chmod(cli, os.stat(cli).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    model = os.path.join(directory, "ggml-fake.bin")
+    with open(model, "wb") as f:
+        f.write(b"fake model")
+    return cli, model
+
+
+# -------------------------------
+# STAND-IN: Ollama
+# -------------------------------
+class FakeOllama:
+    """/api/chat (non-streaming) with configurable latency, in a background thread."""
+
+    def __init__(self, latency: float = 2.0, jitter: float = 0.2, host: str = "127.0.0.1"):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    return self._reply(200, {"version": "0.0.0-loadtest"})
+                self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/chat":
+                    return self._reply(404, {"error": "not found"})
+
+                with stand_in._lock:
+                    stand_in.requests += 1
+                time.sleep(max(0.0, random.gauss(stand_in.latency, stand_in.latency * stand_in.jitter)))
+                reply = " ".join(random.sample(SENTENCES, 2)).capitalize() + "."
+                self._reply(200, {
+                    "model": request.get("model", "loadtest"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": reply},
+                    "done": True,
+                    "done_reason": "stop",
+                })
+
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# -------------------------------
+# APP UNDER TEST
+# -------------------------------
+def _free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir: str, env: dict, port: int, workers: int = 1, log_file=None) -> subprocess.Popen:
+    """
+    Runs the API from workdir. The transcripts, reports and archives stay out
+    of the project only if env points DEBATE_DATA_DIR etc. at workdir, as
+    run_load_test() does.
+    """
+    if workers > 1:
+        cmd = [sys.executable, "-m", "api.serve", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1",
+               "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+
+
+def wait_ready(base_url: str, proc: subprocess.Popen | None = None, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/", timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    raise TimeoutError(f"{base_url} not ready after {timeout:.0f}s")
+
+
+def stop_app(proc: subprocess.Popen, timeout: float = 15.0):
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# -------------------------------
+# CLIENT
+# -------------------------------
+def silent_wav(seconds: float = 1.0, seed: int = 0, samplerate: int = 16000) -> bytes:
+    """Near-silent 16 kHz mono WAV; the seed changes the PCM so uploads never repeat."""
+    rng = random.Random(seed)
+    frames = bytes(rng.randrange(256) if i % 2 == 0 else 0 for i in range(int(seconds * samplerate) * 2))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(samplerate)
+        w.writeframes(frames)
+    return buf.getvalue()
+
+
+def _multipart(field: str, filename: str, content: bytes, content_type: str) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Recorder:
+    """Thread-safe list of (endpoint, status, seconds) samples."""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, status: int, seconds: float):
+        with self._lock:
+            self.samples.append((endpoint, status, seconds))
+
+
+class DebateClient:
+    def __init__(self, base_url: str, recorder: Recorder, client_id: str, timeout: float = 300.0):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.client_id = client_id
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, endpoint: str, body: bytes | None = None,
+                content_type: str | None = None) -> tuple[int, bytes]:
+        headers = {"X-Client-Id": self.client_id}
+        if content_type:
+            headers["Content-Type"] = content_type
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, data = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, data = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status, data = 0, b""  # connection error / timeout
+        self.recorder.add(endpoint, status, time.perf_counter() - t0)
+        return status, data
+
+
+def run_debate(client: DebateClient, seed: int, turns: int = 4, exchanges: int = 3,
+               analysis: bool = True, think: float = 0.0) -> bool:
+    """One debate, start to finish. Returns False if any call failed."""
+    rng = random.Random(seed)
+    topic = rng.choice(TOPICS)
+    ok = True
+
+    def pause():
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+    for i in range(turns):
+        user = i % 2 + 1
+        query = f"user={user}&fields=turn,text"
+        if i == 0:
+            query += "&reset=true&topic=" + urllib.request.quote(topic)
+        body, content_type = _multipart("file", f"turn{i}.wav", silent_wav(seed=seed * 1000 + i), "audio/wav")
+        status, _ = client.request("POST", "/stt/transcribe?" + query, "POST /stt/transcribe", body, content_type)
+        ok = ok and status == 200
+        pause()
+
+    message = rng.choice(SENTENCES)
+    for _ in range(exchanges):
+        payload = json.dumps({"topic": topic, "stance": "favor", "message": message, "cache": False}).encode()
+        status, data = client.request("POST", "/chatbot/respond", "POST /chatbot/respond", payload,
+                                      "application/json")
+        ok = ok and status == 200
+        if status == 200:
+            message = json.loads(data).get("reply") or message
+        pause()
+
+    if analysis:
+        status, _ = client.request("POST", "/analyze/stt?fields=stats,marking", "POST /analyze/stt")
+        ok = ok and status == 200
+        status, _ = client.request("POST", "/winner/stt", "POST /winner/stt")
+        ok = ok and status == 200
+    return ok
+
+
+# -------------------------------
+# REPORT
+# -------------------------------
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(samples: list[tuple], elapsed: float) -> dict:
+    by_endpoint = {}
+    for endpoint, status, seconds in samples:
+        by_endpoint.setdefault(endpoint, []).append((status, seconds))
+
+    endpoints = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        latencies = [s for _, s in rows]
+        errors = sum(1 for status, _ in rows if status != 200)
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / len(rows), 4),
+            "shed": sum(1 for status, _ in rows if status in (429, 503)),
+            "p50_s": round(percentile(latencies, 0.50), 3),
+            "p90_s": round(percentile(latencies, 0.90), 3),
+            "p99_s": round(percentile(latencies, 0.99), 3),
+            "max_s": round(max(latencies), 3),
+        }
+    return endpoints
+
+
+def run_level(base_url: str, concurrency: int, debates: int, turns: int, exchanges: int,
+              analysis: bool, think: float, seed: int) -> dict:
+    recorder = Recorder()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda i: run_debate(DebateClient(base_url, recorder, f"loadtest-{seed}-{i}"), seed + i,
+                                 turns, exchanges, analysis, think),
+            range(debates),
+        ))
+    elapsed = time.perf_counter() - t0
+    return {
+        "concurrency": concurrency,
+        "debates": debates,
+        "failed_debates": results.count(False),
+        "seconds": round(elapsed, 2),
+        "debates_per_min": round(60 * debates / elapsed, 2) if elapsed else 0.0,
+        "endpoints": summarize(recorder.samples, elapsed),
+    }
+
+
+def print_level(level: dict):
+    print(f"\n=== concurrency {level['concurrency']}: {level['debates']} debates in {level['seconds']}s "
+          f"({level['debates_per_min']} debates/min, {level['failed_debates']} with errors) ===")
+    print(f"{'endpoint':<24}{'reqs':>6}{'req/s':>8}{'err%':>7}{'shed':>6}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}")
+    for endpoint, s in level["endpoints"].items():
+        print(f"{endpoint:<24}{s['requests']:>6}{s['rps']:>8}{100 * s['error_rate']:>7.1f}{s['shed']:>6}"
+              f"{s['p50_s']:>8}{s['p90_s']:>8}{s['p99_s']:>8}{s['max_s']:>8}")
+
+
+def run_load_test(levels: list[int], debates_per_level: int | None = None, turns: int = 4, exchanges: int = 3,
+                  analysis: bool = True, think: float = 0.0, whisper_latency: float = 1.0,
+                  ollama_latency: float = 2.0, jitter: float = 0.2, workers: int = 1,
+                  base_url: str | None = None, admission: bool = True, seed: int = 0) -> list[dict]:
+    """
+    Ramps through the concurrency levels against a fresh app with stand-ins,
+    or against base_url when given (stand-ins are then up to the caller).
+    debates_per_level defaults to 2 x concurrency.
+    """
+    ollama = proc = log_file = None
+    workdir = tempfile.mkdtemp(prefix="debategpt_loadtest_")
+    try:
+        if base_url is None:
+            ollama = FakeOllama(ollama_latency, jitter).start()
+            cli, model = write_fake_whisper(workdir)
+            env = {
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(p for p in (PROJECT_ROOT, os.getenv("PYTHONPATH")) if p),
+                "WHISPER_CLI": cli,
+                "WHISPER_MODEL": model,
+                "WHISPER_ARGS": "",
+                "STT_ENGINE": "whispercpp",
+                "TRANSCRIPT_CACHE": "0",
+                "CHATBOT_CACHE": "0",
+                "OLLAMA_HOST": ollama.url,
+                "LOADTEST_WHISPER_LATENCY": str(whisper_latency),
+                "LOADTEST_WHISPER_JITTER": str(jitter),
+                "HF_HUB_OFFLINE": "1",
+                "TRANSFORMERS_OFFLINE": "1",
+                # Transcripts, reports, jobs and archives go to the scratch
+                # directory, not the project's
+                "DEBATE_DATA_DIR": workdir,
+                "ANALYSIS_JOB_DIR": os.path.join(workdir, "jobs"),
+                "PROFILE_DIR": os.path.join(workdir, "profiles"),
+                "ANALYSIS_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+                "COLUMNAR_ARCHIVE_DIR": os.path.join(workdir, "columnar"),
+                "TOURNAMENT_DB": os.path.join(workdir, "tournament.db"),
+                "ADMISSION": "1" if admission else "0",
+                # Simulated clients all connect from 127.0.0.1 and differ by X-Client-Id
+                "ADMISSION_TRUSTED_PROXIES": "127.0.0.1",
+            }
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            log_file = open(os.path.join(workdir, "server.log"), "wb")
+            proc = start_app(workdir, env, port, workers, log_file)
+            print(f"app on {base_url} (workdir {workdir}), fake Ollama on {ollama.url}")
+        wait_ready(base_url, proc)
+
+        report = []
+        for concurrency in levels:
+            debates = debates_per_level or 2 * concurrency
+            level = run_level(base_url, concurrency, debates, turns, exchanges, analysis, think,
+                              seed + 100000 * concurrency)
+            print_level(level)
+            report.append(level)
+        return report
+    finally:
+        if proc is not None:
+            stop_app(proc)
+        if log_file is not None:
+            log_file.close()
+            print(f"\nserver log: {log_file.name}")
+        if ollama is not None:
+            ollama.stop()
+
+
+# -----------------------------
+# CLI MODE
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API with simulated concurrent debates")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated ramp of simultaneous debates")
+    parser.add_argument("--debates", type=int, help="debates per level (default: 2 x concurrency)")
+    parser.add_argument("--turns", type=int, default=4, help="STT turn uploads per debate")
+    parser.add_argument("--exchanges", type=int, default=3, help="chatbot exchanges per debate")
+    parser.add_argument("--skip-analysis", action="store_true", help="no /analyze and /winner calls")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a debate's calls (s)")
+    parser.add_argument("--whisper-latency", type=float, default=1.0, help="fake whisper-cli seconds per clip")
+    parser.add_argument("--ollama-latency", type=float, default=2.0, help="fake Ollama seconds per reply")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency std-dev as a share of the mean")
+    parser.add_argument("--workers", type=int, default=1, help=">1 runs the app through api.serve")
+    parser.add_argument("--url", help="test a running server instead (no stand-ins are started)")
+    parser.add_argument("--no-admission", action="store_true", help="start the app with ADMISSION=0")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = run_load_test(
+        levels=[int(c) for c in args.concurrency.split(",") if c.strip()],
+        debates_per_level=args.debates,
+        turns=args.turns,
+        exchanges=args.exchanges,
+        analysis=not args.skip_analysis,
+        think=args.think,
+        whisper_latency=args.whisper_latency,
+        ollama_latency=args.ollama_latency,
+        jitter=args.jitter,
+        workers=args.workers,
+        base_url=args.url,
+        admission=not args.no_admission,
+        seed=args.seed,
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.json}")
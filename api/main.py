@@ -1,11 +1,26 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from api.stt_api import router as stt_router
 from api.analysis_api import router as analysis_router
 from api.winner_api import router as winner_router
 from api.chatbot_api import router as chatbot_router
+from api.live_api import router as live_router
+from api.tournament_api import router as tournament_router
+from api.admin_api import router as admin_router
+from api.debates_api import router as debates_router
+from api.admission import AdmissionMiddleware
+from api.profiling import ProfilingMiddleware
 
 app = FastAPI(title="DebateGPT Backend")
+# Middleware added last runs first: CORS → admission control → gzip → profiling → routers.
+# Samples requests sent with X-Profile: 1 or armed via /admin/profiling; a no-op otherwise
+app.add_middleware(ProfilingMiddleware)
+# Compresses JSON/NDJSON bodies over 1 KB for clients sending Accept-Encoding: gzip.
+# Responses already brotli-encoded by api.responses.json_response are left as-is.
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+# Sheds or queues requests by priority class before they reach the routers
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,6 +33,17 @@ app.include_router(stt_router)
 app.include_router(analysis_router)
 app.include_router(winner_router)
 app.include_router(chatbot_router)
+app.include_router(live_router)
+app.include_router(tournament_router)
+app.include_router(admin_router)
+app.include_router(debates_router)
 @app.get("/")
 def root():
     return {"message": "DebateGPT FastAPI server is running"}
+
+
+@app.get("/memory")
+def worker_memory():
+    """Resident memory of the worker that served this request (unique vs shared, Linux only)."""
+    from api.serve import process_memory
+    return {"memory": process_memory()}
@@ -0,0 +1,342 @@
+import asyncio
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# =====================================================
+# ON-DEMAND REQUEST PROFILING
+# =====================================================
+# A request is profiled when
+#   - it carries "X-Profile: 1" (optionally X-Profile-Interval-Ms) and a valid
+#     X-Admin-Token (never when ADMIN_TOKEN is unset), or
+#   - an admin armed the next N requests under a path prefix
+#     (POST /admin/profiling?path_prefix=/analyze&count=3).
+#
+# A sampler thread then reads the stack of every thread each interval_ms and
+# keeps the stacks running this request's endpoint function, from the endpoint
+# frame down. That covers sync endpoints in the threadpool (analyze_debate,
+# the transformers pipelines, report parsing) as well as async ones. Nothing
+# is hooked into the interpreter, so the profiled request pays only for the
+# sampling, and other requests pay one header scan.
+#
+# Per profile two files go to PROFILE_DIR:
+#   <id>.folded  "frame;frame;frame count" lines, for flamegraph.pl or speedscope
+#   <id>.json    request metadata and the hottest functions (self / total samples)
+# Concurrent requests to the same endpoint share the endpoint code, so their
+# samples can mix; profile one at a time for clean graphs.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+
+PROFILING_ENABLED = os.getenv("PROFILING", "1") != "0"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))  # sampler stops after this
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "2"))  # more concurrent profiles are skipped
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # newest profiles kept on disk
+
+MAX_STACK_DEPTH = 200
+TOP_FUNCTIONS = 30
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,100}$")
+_SITE_PACKAGES = re.compile(r".*[/\\](?:site|dist)-packages[/\\]")
+
+
+def valid_profile_id(profile_id: str) -> bool:
+    return bool(_PROFILE_ID.match(profile_id)) and ".." not in profile_id
+
+
+# -------------------------------
+# SAMPLER
+# -------------------------------
+def frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    else:
+        path = _SITE_PACKAGES.sub("", path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def _endpoint_code(scope):
+    # Starlette's router stores the matched endpoint in the (shared) scope
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    return getattr(inspect.unwrap(endpoint), "__code__", None)
+
+
+class Sampler(threading.Thread):
+    """Folds the stacks that run scope's endpoint every interval seconds."""
+
+    def __init__(self, scope, interval: float, max_seconds: float = PROFILE_MAX_SECONDS):
+        super().__init__(name="request-profiler", daemon=True)
+        self.scope = scope
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.ticks = 0
+        self._stop_event = threading.Event()
+        self._labels = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = frame_label(code)
+        return label
+
+    def sample(self, target):
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            chain = []
+            start = None
+            while frame is not None and len(chain) < MAX_STACK_DEPTH:
+                chain.append(frame.f_code)
+                if frame.f_code is target:
+                    start = len(chain)  # keep the outermost endpoint frame
+                frame = frame.f_back
+            if start is not None:
+                self.stacks[";".join(self._label(code) for code in reversed(chain[:start]))] += 1
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        target = None
+        while not self._stop_event.wait(self.interval) and time.monotonic() < deadline:
+            self.ticks += 1
+            target = target or _endpoint_code(self.scope)
+            if target is not None:
+                self.sample(target)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def top_functions(stacks: Counter, limit: int = TOP_FUNCTIONS) -> list[dict]:
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for label in set(frames):
+            total[label] += count
+    samples = sum(stacks.values()) or 1
+    return [
+        {"function": label, "total": n, "total_pct": round(100 * n / samples, 1),
+         "self": own[label], "self_pct": round(100 * own[label] / samples, 1)}
+        for label, n in total.most_common(limit)
+    ]
+
+
+# -------------------------------
+# STORAGE
+# -------------------------------
+def save_profile(profile_id: str, sampler: Sampler, meta: dict, directory: str = PROFILE_DIR) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    meta = {
+        **meta,
+        "id": profile_id,
+        "interval_ms": round(sampler.interval * 1000, 3),
+        "ticks": sampler.ticks,
+        "samples": sum(sampler.stacks.values()),
+        "top": top_functions(sampler.stacks),
+    }
+    with open(os.path.join(directory, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    # The .json file is written last: list_profiles() only sees complete profiles
+    tmp = os.path.join(directory, f"{profile_id}.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, f"{profile_id}.json"))
+    prune_profiles(directory)
+    return meta
+
+
+def _profile_files(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    files = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".json")]
+    return sorted(files, key=os.path.getmtime, reverse=True)
+
+
+def prune_profiles(directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+    for path in _profile_files(directory)[keep:]:
+        for stale in (path, path[: -len(".json")] + ".folded"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def list_profiles(limit: int = 20, directory: str = PROFILE_DIR) -> list[dict]:
+    profiles = []
+    for path in _profile_files(directory)[:limit]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta.pop("top", None)
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(profile_id: str, kind: str, directory: str = PROFILE_DIR) -> str | None:
+    """Path of <id>.folded or <id>.json, None for unknown or malformed ids."""
+    if kind not in ("folded", "json") or not valid_profile_id(profile_id):
+        return None
+    path = os.path.join(directory, f"{profile_id}.{kind}")
+    return path if os.path.exists(path) else None
+
+
+# -------------------------------
+# TRIGGERS
+# -------------------------------
+class Profiler:
+    """Admin-armed profile slots and the concurrent-profile cap."""
+
+    def __init__(self, max_active: int = PROFILE_MAX_ACTIVE):
+        self.max_active = max_active
+        self.active = 0
+        self.completed = 0
+        self.skipped = 0
+        self._armed = []  # [{"path_prefix", "remaining", "interval_ms"}]
+        self._lock = threading.Lock()
+
+    def arm(self, path_prefix: str, count: int = 1, interval_ms: float = PROFILE_INTERVAL_MS) -> dict:
+        entry = {"path_prefix": path_prefix, "remaining": count, "interval_ms": interval_ms}
+        with self._lock:
+            self._armed.append(entry)
+        return dict(entry)
+
+    def disarm(self):
+        with self._lock:
+            self._armed.clear()
+
+    def take_armed(self, path: str) -> float | None:
+        """Interval in ms if an armed slot matches path (and uses it up)."""
+        with self._lock:
+            for entry in self._armed:
+                if path.startswith(entry["path_prefix"]):
+                    entry["remaining"] -= 1
+                    if entry["remaining"] <= 0:
+                        self._armed.remove(entry)
+                    return entry["interval_ms"]
+        return None
+
+    def begin(self) -> bool:
+        with self._lock:
+            if self.active >= self.max_active:
+                self.skipped += 1
+                return False
+            self.active += 1
+            return True
+
+    def end(self):
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": PROFILING_ENABLED,
+                "directory": PROFILE_DIR,
+                "default_interval_ms": PROFILE_INTERVAL_MS,
+                "max_active": self.max_active,
+                "active": self.active,
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "armed": [dict(entry) for entry in self._armed],
+            }
+
+
+profiler = Profiler()
+
+
+# -------------------------------
+# ASGI MIDDLEWARE
+# -------------------------------
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _header_interval(scope) -> float | None:
+    """Interval in ms for "X-Profile: 1" from an admin, else None."""
+    value = (_header(scope, b"x-profile") or "").strip().lower()
+    if value not in ("1", "true", "on"):
+        return None
+
+    from api.admin_api import admin_token_ok
+    if not admin_token_ok(_header(scope, b"x-admin-token")):
+        return None
+    try:
+        return max(1.0, float(_header(scope, b"x-profile-interval-ms") or PROFILE_INTERVAL_MS))
+    except ValueError:
+        return PROFILE_INTERVAL_MS
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI, innermost, so admission queueing is not part of the profile.
+    Profiled responses carry X-Profile-Id.
+    """
+
+    def __init__(self, app, controller: Profiler = profiler, enabled: bool = PROFILING_ENABLED):
+        self.app = app
+        self.controller = controller
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        interval_ms = _header_interval(scope) or self.controller.take_armed(scope["path"])
+        if interval_ms is None or not self.controller.begin():
+            return await self.app(scope, receive, send)
+
+        request_id = _header(scope, b"x-request-id") or uuid.uuid4().hex[:12]
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{request_id}"
+        if not valid_profile_id(profile_id):
+            profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}"
+        status = {"code": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = Sampler(scope, interval_ms / 1000)
+        started = time.time()
+        t0 = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - t0
+            await asyncio.to_thread(sampler.stop)
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status["code"],
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                "seconds": round(elapsed, 4),
+            }
+            try:
+                await asyncio.to_thread(save_profile, profile_id, sampler, meta)
+            finally:
+                self.controller.end()
@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import json
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli (gzip is always available)
+    brotli = None
+
+# -------------------------------
+# SLIM RESPONSE HELPERS
+# -------------------------------
+# ?fields=stats,marking  → only those top-level keys ("status" is always kept)
+# ?cursor=...&limit=N    → opaque cursor pagination over a list
+# ETag / If-None-Match   → 304 with no body when the client copy is current
+# Accept-Encoding: br    → brotli when installed; gzip is done by GZipMiddleware
+
+BROTLI_MIN_SIZE = 1000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: str | None) -> set[str] | None:
+    if not fields:
+        return None
+    return {f.strip() for f in fields.split(",") if f.strip()}
+
+
+def wants(fields: set[str] | None, name: str) -> bool:
+    return fields is None or name in fields
+
+
+def select_fields(payload: dict, fields: set[str] | None) -> dict:
+    if fields is None:
+        return payload
+    return {k: v for k, v in payload.items() if k in fields or k == "status"}
+
+
+# -------------------------------
+# CURSOR PAGINATION
+# -------------------------------
+def encode_cursor(offset: int, version: str) -> str:
+    raw = json.dumps({"o": offset, "v": version}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Offset stored in the cursor; 400 if malformed, 409 if it belongs to other data."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("v") != version:
+        raise HTTPException(status_code=409, detail="Cursor is from an older result, start again without it")
+    return max(offset, 0)
+
+
+def paginate(items: list, version: str, cursor: str | None = None,
+             limit: int = DEFAULT_PAGE_SIZE) -> tuple[list, str | None]:
+    """One page of items plus the cursor of the next page (None on the last page)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = decode_cursor(cursor, version) if cursor else 0
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    return page, encode_cursor(next_offset, version) if next_offset < len(items) else None
+
+
+# -------------------------------
+# ETAG + COMPRESSION
+# -------------------------------
+def _accepts_brotli(request: Request) -> bool:
+    accepted = request.headers.get("accept-encoding", "")
+    return "br" in {part.split(";")[0].strip() for part in accepted.split(",")}
+
+
+def json_response(request: Request, payload: dict) -> Response:
+    """
+    Compact JSON with a strong ETag of the body. A matching If-None-Match gets
+    304. Large bodies are brotli-compressed when the client accepts it.
+    """
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if brotli is not None and len(body) >= BROTLI_MIN_SIZE and _accepts_brotli(request):
+        body = brotli.compress(body, quality=5)
+        headers["Content-Encoding"] = "br"
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,229 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# =====================================================
+# PRELOAD-AND-FORK SERVER
+# =====================================================
+# python -m api.serve --workers 4 --port 8000
+#
+# The parent imports the app and loads every model (DistilBERT MNLI, SST-2,
+# LanguageTool, Punkt) once, moves them out of the garbage collector's reach
+# with gc.freeze(), binds the socket and then forks the workers. Workers share
+# the model weights copy-on-write instead of each loading their own copy.
+#
+# Needs os.fork (Linux/macOS). On Windows it falls back to one uvicorn process.
+# In-process limits (api/admission.py caps, token buckets) apply per worker.
+
+logger = logging.getLogger("debategpt.serve")
+
+DEFAULT_WORKERS = int(os.getenv("SERVE_WORKERS", "4"))
+MEMORY_REPORT_INTERVAL = float(os.getenv("SERVE_MEMORY_REPORT_INTERVAL", "0"))  # seconds, 0 = off
+
+
+# -------------------------------
+# MEMORY ACCOUNTING (/proc, Linux)
+# -------------------------------
+def process_memory(pid: int | str = "self") -> dict | None:
+    """
+    Resident memory of one process in MB, from /proc/<pid>/smaps_rollup:
+    unique = private pages (freed if the process exits),
+    shared = pages shared with the parent/siblings (model weights after fork),
+    pss    = proportional share, the fair per-process cost.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    kb = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            kb[key.strip()] = int(parts[0])
+
+    def mb(*keys):
+        return round(sum(kb.get(k, 0) for k in keys) / 1024, 1)
+
+    return {
+        "pid": os.getpid() if pid == "self" else pid,
+        "rss_mb": mb("Rss"),
+        "pss_mb": mb("Pss"),
+        "unique_mb": mb("Private_Clean", "Private_Dirty"),
+        "shared_mb": mb("Shared_Clean", "Shared_Dirty"),
+    }
+
+
+def memory_report(worker_pids: list[int]) -> dict:
+    workers = [m for m in (process_memory(pid) for pid in worker_pids) if m]
+    parent = process_memory()
+    return {
+        "parent": parent,
+        "workers": workers,
+        # What the whole group really costs: parent + every worker's proportional share
+        "total_pss_mb": round(sum(m["pss_mb"] for m in workers) + (parent["pss_mb"] if parent else 0), 1),
+    }
+
+
+def log_memory_report(worker_pids: list[int]):
+    report = memory_report(worker_pids)
+    if report["parent"]:
+        logger.info("parent %(pid)s: rss %(rss_mb)s MB, unique %(unique_mb)s MB", report["parent"])
+    for m in report["workers"]:
+        logger.info("worker %(pid)s: rss %(rss_mb)s MB, unique %(unique_mb)s MB, shared %(shared_mb)s MB, "
+                    "pss %(pss_mb)s MB", m)
+    logger.info("total pss %s MB", report["total_pss_mb"])
+
+
+# -------------------------------
+# PARENT: PRELOAD
+# -------------------------------
+def preload():
+    """Imports the app and loads every model in the parent, then freezes the heap."""
+    # Tokenizer thread pools must not exist yet when we fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    from api.main import app
+    from Analyzer.aly import preload_models
+
+    t0 = time.perf_counter()
+    preload_models()
+    logger.info("models loaded in %.1fs", time.perf_counter() - t0)
+
+    # Objects that exist now are never collected again, so the GC does not
+    # touch (and un-share) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+# -------------------------------
+# WORKERS
+# -------------------------------
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, host: str, port: int, log_level: str):
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level, workers=1)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock, host, port, log_level) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, host, port, log_level)
+        except BaseException:
+            logger.exception("worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = DEFAULT_WORKERS,
+          log_level: str = "info", report_interval: float = MEMORY_REPORT_INTERVAL):
+    """
+    Preloads models, forks workers and supervises them: dead workers are
+    replaced, SIGTERM/SIGINT stop everyone, SIGUSR1 logs a memory report.
+    """
+    if not hasattr(os, "fork"):
+        import uvicorn
+        logger.warning("os.fork is not available; running a single process")
+        uvicorn.run("api.main:app", host=host, port=port, log_level=log_level)
+        return
+
+    app = preload()
+    sock = _bind(host, port)
+    children = {}
+    stopping = False
+    report_requested = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    def request_report(signum, frame):
+        nonlocal report_requested
+        report_requested = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, request_report)
+
+    for _ in range(workers):
+        pid = _spawn(app, sock, host, port, log_level)
+        children[pid] = time.monotonic()
+    logger.info("serving on %s:%s with %d workers %s", host, port, workers, sorted(children))
+
+    next_report = time.monotonic() + report_interval if report_interval else None
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid, status = 0, 0
+
+        if pid:
+            started = children.pop(pid, None)
+            if started is not None and not stopping:
+                logger.warning("worker %s exited (status %s), restarting", pid, status)
+                # Back off if workers die right after start (e.g. a broken import)
+                if time.monotonic() - started < 1.0:
+                    time.sleep(1.0)
+                new_pid = _spawn(app, sock, host, port, log_level)
+                children[new_pid] = time.monotonic()
+            continue
+
+        if report_requested or (next_report and time.monotonic() >= next_report):
+            report_requested = False
+            log_memory_report(list(children))
+            if report_interval:
+                next_report = time.monotonic() + report_interval
+
+        time.sleep(0.5)
+
+    logger.info("stopping %d workers", len(children))
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in list(children):
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with models preloaded and shared across forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--report-interval", type=float, default=MEMORY_REPORT_INTERVAL,
+                        help="log per-worker unique/shared memory every N seconds (0 = only on SIGUSR1)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s",
+                        stream=sys.stdout)
+    serve(args.host, args.port, args.workers, args.log_level, args.report_interval)
@@ -1,11 +1,52 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from Whispercpp.debate_whispercpp import run_whisper_file
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from Whispercpp.audio_decode import (
+    MAX_AUDIO_SECONDS,
+    MAX_UPLOAD_BYTES,
+    AudioTooLarge,
+    UnsupportedAudio,
+    check_wav,
+    decode_audio,
+    decoders,
+    sniff_format,
+)
+from Whispercpp.debate_whispercpp import run_whisper_samples, run_whisper_segments, segments_text
+from Whispercpp.diarize import run_diarized_debate
+from Whispercpp.batch import DEFAULT_OUTPUT_DIR, iter_batch
+from Whispercpp.engines import get_draft_engine
+from Whispercpp.refine import refine_queue
+from Whispercpp.transcript_cache import transcript_cache
+from api.responses import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    json_response,
+    paginate,
+    parse_fields,
+    select_fields,
+)
+import asyncio
+import hashlib
 import tempfile
+import threading
+import json
 import os
+import re
+import shutil
+import uuid
 
 router = APIRouter(prefix="/stt", tags=["Speech To Text"])
 
-TRANSCRIPT_FILE = "debate_transcript.txt"
+# Relative to the working directory unless DEBATE_DATA_DIR is set (see Analyzer/aly.py)
+DATA_DIR = os.getenv("DEBATE_DATA_DIR", "")
+TRANSCRIPT_FILE = os.path.join(DATA_DIR, "debate_transcript.txt")
+SEGMENTS_FILE = os.path.join(DATA_DIR, "debate_transcript_segments.json")
+BATCH_UPLOAD_DIR = "batch_uploads"
+SSE_KEEPALIVE_SECONDS = 15
+SSE_POLL_SECONDS = 0.5
+
+# The refine worker rewrites turns while uploads append them
+transcript_lock = threading.Lock()
 
 
 def _read_full_transcript():
@@ -15,69 +56,420 @@ def _read_full_transcript():
     return ""
 
 
+def _read_turns():
+    if os.path.exists(SEGMENTS_FILE):
+        with open(SEGMENTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("turns", [])
+    return []
+
+
+def _write_turns(turns):
+    with open(SEGMENTS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"turns": turns}, f)
+
+
+async def _read_upload(file: UploadFile, limit: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Reads an upload, refusing it as soon as it passes limit bytes."""
+    if file.size is not None and file.size > limit:
+        raise AudioTooLarge(f"Upload larger than {limit // (1024 * 1024)} MB")
+    chunks = []
+    size = 0
+    while chunk := await file.read(1 << 20):
+        size += len(chunk)
+        if size > limit:
+            raise AudioTooLarge(f"Upload larger than {limit // (1024 * 1024)} MB")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _sniff_upload(content: bytes) -> str:
+    fmt = sniff_format(content[:64])
+    if fmt is None:
+        raise UnsupportedAudio("Unrecognised audio format (send WAV, Opus/OGG, FLAC, MP3, M4A or WebM)")
+    return fmt
+
+
+def _transcribe_upload(content: bytes) -> list[dict]:
+    fmt = _sniff_upload(content)
+    if fmt != "wav":
+        # Compressed uploads are decoded in memory to 16 kHz mono PCM
+        return run_whisper_samples(decode_audio(content, fmt))
+
+    # WAV goes to whisper-cli as is, so check it here like decode_audio() does
+    check_wav(content)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        tmp.write(content)
+        wav_path = tmp.name
+    try:
+        return run_whisper_segments(wav_path)
+    finally:
+        os.remove(wav_path)
+
+
+def _apply_refinement(job: dict, segments: list[dict]) -> bool:
+    """
+    Swaps a draft turn for the refined transcription, in the turns JSON and
+    in debate_transcript.txt. False if the turn is gone (debate reset).
+    """
+    text = segments_text(segments).strip()
+    with transcript_lock:
+        turns = _read_turns()
+        index = next((i for i, turn in enumerate(turns) if turn.get("refine_job") == job["job_id"]), None)
+        if index is None:
+            return False
+
+        # The draft sits at the offset stored by _append_turn, right after its "User N:" label
+        turn = turns[index]
+        start = turn.get("offset")
+        full_content = _read_full_transcript()
+        if start is None or full_content[start:start + len(turn["text"])] != turn["text"]:
+            return False
+        full_content = full_content[:start] + text + full_content[start + len(turn["text"]):]
+
+        with open(TRANSCRIPT_FILE, "w", encoding="utf-8") as f:
+            f.write(full_content)
+        shift = len(text) - len(turn["text"])
+        for later in turns[index + 1:]:
+            if later.get("offset") is not None:
+                later["offset"] += shift
+        turn.update({"text": text, "segments": segments, "draft": False, "draft_text": job["draft"]})
+        _write_turns(turns)
+    return True
+
+
+def _append_turn(user: int | None, reset: bool, topic: str | None, text: str, segments: list[dict],
+                 extra: dict | None = None) -> tuple[str, int]:
+    """Appends a turn to debate_transcript.txt and the turns JSON → (transcript, turn number)."""
+    keep_turns = os.path.exists(TRANSCRIPT_FILE) and (user == 2 or not reset)
+    turns = _read_turns() if keep_turns else []
+
+    # Turn-handling:
+    # - User 1 can start/reset a debate.
+    # - User 2 should never reset/overwrite User 1; always append to existing content.
+    if user == 2:
+        reset = False
+        full_content = _read_full_transcript()
+        # If User 2 is (unexpectedly) first and the file is missing/empty,
+        # start a minimal header rather than overwriting User 1's content.
+        if not full_content:
+            header = "========== FULL DEBATE ==========\n"
+            if topic:
+                header += f"Topic: {topic}\n\n"
+            full_content = header
+    elif reset or not os.path.exists(TRANSCRIPT_FILE):
+        header = "========== FULL DEBATE ==========\n"
+        if topic:
+            header += f"Topic: {topic}\n\n"
+        full_content = header
+    else:
+        full_content = _read_full_transcript()
+
+    if user in (1, 2):
+        full_content += f"User {user}:\n"
+    offset = len(full_content)
+    full_content += text + "\n\n"
+
+    with open(TRANSCRIPT_FILE, "w", encoding="utf-8") as f:
+        f.write(full_content)
+
+    # Keep segment timing/confidence with the turn for the analyzer
+    turns.append({
+        "turn": len(turns) + 1,
+        "user": f"User {user}" if user in (1, 2) else None,
+        "text": text,
+        "offset": offset,  # start of the text in debate_transcript.txt
+        "segments": segments,
+        **(extra or {}),
+    })
+    _write_turns(turns)
+    return full_content, len(turns)
+
+
+def _transcribe_turn(content: bytes, user: int | None, reset: bool, topic: str | None):
+    """
+    Transcribes an upload and appends it as a turn → (transcript, turn number,
+    segments, text, refine job or None, draft engine or None).
+    """
+    draft_engine = get_draft_engine()
+    segments = refine = None
+
+    if draft_engine is not None and not refine_queue.full():
+        # Two-pass: fast draft now, the accurate engine refines it in the background
+        samples = decode_audio(content, _sniff_upload(content))
+        segments = run_whisper_samples(samples, engine=draft_engine)
+        transcript_text = segments_text(segments).strip()
+
+        with transcript_lock:
+            turn_no = len(_read_turns()) + 1 if os.path.exists(TRANSCRIPT_FILE) and (user == 2 or not reset) else 1
+            refine = refine_queue.submit(
+                samples, _apply_refinement,
+                {"turn": turn_no, "draft": transcript_text, "draft_engine": draft_engine.name},
+            )
+            if refine is not None:
+                extra = {"draft": True, "refine_job": refine["job_id"]}
+                full_content, turn_no = _append_turn(user, reset, topic, transcript_text, segments, extra)
+
+        if refine is None:
+            # Queue filled up meanwhile: accurate engine in the request
+            segments = run_whisper_samples(samples)
+
+    if refine is None:
+        if segments is None:
+            segments = _transcribe_upload(content)
+        transcript_text = segments_text(segments).strip()
+        with transcript_lock:
+            full_content, turn_no = _append_turn(user, reset, topic, transcript_text, segments)
+
+    return full_content, turn_no, segments, transcript_text, refine, draft_engine
+
+
 @router.post("/transcribe")
 async def transcribe_audio(
+    request: Request,
     file: UploadFile = File(...),
     user: int | None = Query(None, description="1 or 2 for User 1 or User 2 turn"),
     reset: bool = Query(False, description="Start fresh debate, clear previous"),
     topic: str | None = Query(None, description="Debate topic for new debate"),
+    fields: str | None = Query(None, description="Comma-separated keys, e.g. text,turn (omits the full transcript)"),
 ):
     """
-    Receives WAV file, runs STT, saves to debate_transcript.txt.
+    Receives an audio file, runs STT, saves to debate_transcript.txt.
+    WAV, Opus/OGG, FLAC, MP3, M4A/AAC and WebM are accepted (see /stt/formats);
+    the format is sniffed from the bytes, not the file name.
+    With STT_DRAFT_ENGINE set the turn is a draft ("draft": true, "refine_job")
+    that STT_ENGINE replaces in the background; follow /stt/refinements.
     user=1 or 2: append as User 1/User 2 turn.
     reset=true: start new debate (use with topic=).
+    fields=text,turn: return only this turn instead of the whole transcript.
     """
 
     try:
-        suffix = os.path.splitext(file.filename)[1] or ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await file.read()
-            tmp.write(content)
-            wav_path = tmp.name
+        content = await _read_upload(file)
+        # Decoding and both engines block: run them in the threadpool so other
+        # uploads and live-caption frames are served meanwhile
+        full_content, turn_no, segments, transcript_text, refine, draft_engine = await run_in_threadpool(
+            _transcribe_turn, content, user, reset, topic
+        )
 
-        transcript_text = run_whisper_file(wav_path)
-        os.remove(wav_path)
+        if not full_content.rstrip().endswith("================================="):
+            full_content = full_content.rstrip() + "\n\n=================================\n"
 
-        transcript_file_path = os.path.abspath(TRANSCRIPT_FILE)
-
-        # Turn-handling:
-        # - User 1 can start/reset a debate.
-        # - User 2 should never reset/overwrite User 1; always append to existing content.
-        if user == 2:
-            reset = False
-            full_content = _read_full_transcript()
-            # If User 2 is (unexpectedly) first and the file is missing/empty,
-            # start a minimal header rather than overwriting User 1's content.
-            if not full_content:
-                header = "========== FULL DEBATE ==========\n"
-                if topic:
-                    header += f"Topic: {topic}\n\n"
-                full_content = header
-        elif reset or not os.path.exists(TRANSCRIPT_FILE):
-            header = "========== FULL DEBATE ==========\n"
-            if topic:
-                header += f"Topic: {topic}\n\n"
-            full_content = header
-        else:
-            full_content = _read_full_transcript()
+        payload = {
+            "status": "success",
+            "message": "Transcription completed",
+            "transcript": full_content,
+            "transcript_file": TRANSCRIPT_FILE,
+            "segments": segments,
+            "turn": turn_no,
+            "text": transcript_text,
+            "draft": refine is not None,
+        }
+        if refine is not None:
+            payload["message"] = "Draft transcription completed; refinement queued"
+            payload["refine_job"] = refine["job_id"]
+            payload["draft_engine"] = draft_engine.name
+        return json_response(request, select_fields(payload, parse_fields(fields)))
 
-        if user in (1, 2):
-            full_content += f"User {user}:\n{transcript_text.strip()}\n\n"
-        else:
-            full_content += transcript_text.strip() + "\n\n"
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedAudio as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        with open(TRANSCRIPT_FILE, "w", encoding="utf-8") as f:
-            f.write(full_content)
 
-        if not full_content.rstrip().endswith("================================="):
-            full_content = full_content.rstrip() + "\n\n=================================\n"
+@router.get("/formats")
+def supported_formats():
+    """
+    Upload formats this server can decode and the upload limits
+    """
+    return {**decoders(), "max_upload_mb": MAX_UPLOAD_BYTES / (1024 * 1024), "max_audio_seconds": MAX_AUDIO_SECONDS}
+
+
+@router.get("/refinements")
+async def refinement_events(
+    request: Request,
+    after: int = Query(0, ge=0, description="Replay events after this id (Last-Event-ID takes precedence)"),
+):
+    """
+    Server-sent events for two-pass transcription: queued, refined (with the
+    new text and segments), stale (turn was replaced) and failed, per refine_job.
+    """
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        after = int(last_id)
+
+    def frame(event):
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    async def stream():
+        # Events come from the shared refine db, so jobs of every worker show up here
+        last_sent = after
+        idle = 0.0
+        while not await request.is_disconnected():
+            events = await asyncio.to_thread(refine_queue.events_after, last_sent)
+            for event in events:
+                last_sent = event["id"]
+                yield frame(event)
+            if events:
+                idle = 0.0
+                continue
+            if idle >= SSE_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                idle = 0.0
+            await asyncio.sleep(SSE_POLL_SECONDS)
+            idle += SSE_POLL_SECONDS
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/refinements/status")
+def refinement_status():
+    """
+    Two-pass transcription: draft engine and background refine queue counters
+    """
+    draft_engine = get_draft_engine()
+    return {"draft_engine": draft_engine.name if draft_engine else None, **refine_queue.stats()}
+
+
+@router.get("/transcript")
+def get_transcript(
+    request: Request,
+    fields: str | None = Query("turns", description="Comma-separated keys: transcript, turns"),
+    cursor: str | None = Query(None, description="next_cursor of the previous turns page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Current debate transcript. Turns are cursor-paginated (segments omitted);
+    If-None-Match gives 304 while nothing new was transcribed.
+    """
+    selected = parse_fields(fields)
+    payload = {"status": "success"}
+
+    if selected is None or "transcript" in selected:
+        payload["transcript"] = _read_full_transcript()
+
+    if selected is None or "turns" in selected:
+        turns = [{k: v for k, v in t.items() if k != "segments"} for t in _read_turns()]
+        # Turns are append-only within a debate; a new debate changes the first turn → old cursors expire
+        version = hashlib.sha1(json.dumps(turns[:1]).encode()).hexdigest()[:12]
+        page, next_cursor = paginate(turns, version, cursor, limit)
+        payload.update({"turns": page, "next_cursor": next_cursor, "total_turns": len(turns)})
+
+    return json_response(request, payload)
+
+
+@router.post("/diarize")
+async def diarize_recording(
+    file: UploadFile = File(...),
+    topic: str | None = Query(None, description="Debate topic"),
+    speakers: int = Query(2, ge=1, le=8, description="Number of speakers in the recording"),
+):
+    """
+    Receives one continuous debate recording (WAV), splits it into
+    User 1 / User 2 turns and overwrites debate_transcript.txt with the result.
+    """
+
+    try:
+        content = await _read_upload(file)
+        suffix = os.path.splitext(file.filename or "")[1] or ".wav"
+        # Diarization and whisper run for the whole recording: keep them off the event loop
+        result = await run_in_threadpool(_diarize_upload, content, suffix, topic, speakers)
 
         return {
             "status": "success",
-            "message": "Transcription completed",
-            "transcript": full_content,
+            "message": "Diarization completed",
+            "turns": result["turns"],
+            "failed_turns": result["failed_turns"],
+            "transcript": result["transcript"],
             "transcript_file": TRANSCRIPT_FILE,
         }
 
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _diarize_upload(content: bytes, suffix: str, topic: str | None, speakers: int) -> dict:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(content)
+        wav_path = tmp.name
+    try:
+        result = run_diarized_debate(wav_path, topic=topic, output_file=None, num_speakers=speakers)
+    finally:
+        os.remove(wav_path)
+
+    with transcript_lock:
+        with open(TRANSCRIPT_FILE, "w", encoding="utf-8") as f:
+            f.write(result["transcript"])
+        # Diarized turns carry no per-segment timing; drop stale segment data
+        if os.path.exists(SEGMENTS_FILE):
+            os.remove(SEGMENTS_FILE)
+    return result
+
+
+@router.post("/batch")
+async def transcribe_batch(
+    files: list[UploadFile] = File(...),
+    batch_id: str | None = Query(None, description="Re-use to resume an interrupted batch"),
+    debate_id: str | None = Query(None, description="Put every file into this one debate"),
+):
+    """
+    Receives many audio files, transcribes them across the batch worker pool
+    and streams one JSON line per file as it finishes (application/x-ndjson).
+    File names may carry sub-directories ("round12/u1_opening.wav") to group debates.
+    """
+
+    batch_id = re.sub(r"[^A-Za-z0-9_-]", "_", batch_id) if batch_id else uuid.uuid4().hex
+    upload_root = os.path.abspath(os.path.join(BATCH_UPLOAD_DIR, batch_id))
+
+    try:
+        paths = []
+        for upload in files:
+            rel = os.path.normpath(upload.filename or "").lstrip(os.sep)
+            if rel.startswith(".."):
+                raise HTTPException(status_code=400, detail=f"Invalid file name: {upload.filename}")
+            if os.path.basename(rel) in ("", "."):
+                rel = os.path.join(os.path.dirname(rel), f"{uuid.uuid4().hex}.wav")
+            path = os.path.join(upload_root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            content = await _read_upload(upload)
+            with open(path, "wb") as f:
+                f.write(content)
+            paths.append(path)
+    except HTTPException:
+        shutil.rmtree(upload_root, ignore_errors=True)
+        raise
+    except AudioTooLarge as e:
+        shutil.rmtree(upload_root, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
+        shutil.rmtree(upload_root, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+    def stream():
+        # Uploads are only needed for this run; a resumed batch is re-uploaded
+        # and its finished files come from the progress file in the output dir
+        try:
+            yield json.dumps({"batch_id": batch_id, "files": len(paths)}) + "\n"
+            for result in iter_batch(
+                paths,
+                upload_root,
+                output_dir=os.path.join(DEFAULT_OUTPUT_DIR, batch_id),
+                debate_id=debate_id,
+            ):
+                result["file"] = os.path.relpath(result["file"], upload_root)
+                yield json.dumps(result) + "\n"
+        finally:
+            shutil.rmtree(upload_root, ignore_errors=True)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/cache")
+def transcript_cache_stats():
+    """
+    Transcript cache size and hit/miss counters
+    """
+    return transcript_cache.stats()
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from Analyzer.tournament import head_to_head, leaderboard, record_debate, speaker_trend
+from Analyzer.winner import run_winner_analysis
+
+router = APIRouter(prefix="/tournament", tags=["Tournament"])
+
+
+class DebateResult(BaseModel):
+    debate_id: str
+    scores: dict[str, float]
+    mode: str = "stt"
+    topic: str | None = None
+    played_at: str | None = None
+
+
+@router.post("/debates")
+def record_result(data: DebateResult):
+    """
+    Records one debate's per-speaker scores and updates ratings
+    """
+    try:
+        return record_debate(
+            data.debate_id,
+            data.scores,
+            mode=data.mode,
+            topic=data.topic,
+            played_at=data.played_at,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/debates/{debate_id}/from-winner")
+def record_latest_winner(
+    debate_id: str,
+    speaker1: str = Query(..., description="Name of User 1 (or USER in chatbot mode)"),
+    speaker2: str = Query(..., description="Name of User 2 (or DEBATE GPT in chatbot mode)"),
+    mode: str = Query("stt", description="stt or chatbot"),
+    topic: str | None = Query(None),
+):
+    """
+    Scores the latest analysed debate with the winner rules and records it under real speaker names
+    """
+    try:
+        result = run_winner_analysis(mode=mode)
+        first, second = result["scores"].values()
+        return record_debate(debate_id, {speaker1: first, speaker2: second}, mode=mode, topic=topic)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Analysis report not found. Run analysis first.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/leaderboard")
+def get_leaderboard(limit: int = Query(20, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """
+    Speakers ordered by rating
+    """
+    return {"leaderboard": leaderboard(limit=limit, offset=offset)}
+
+
+@router.get("/speakers/{name}")
+def get_speaker(name: str, limit: int = Query(20, ge=1, le=500)):
+    """
+    Speaker totals and recent rating trend
+    """
+    trend = speaker_trend(name, limit=limit)
+    if trend is None:
+        raise HTTPException(status_code=404, detail=f"Unknown speaker: {name}")
+    return trend
+
+
+@router.get("/head-to-head")
+def get_head_to_head(a: str, b: str, limit: int = Query(50, ge=1, le=500)):
+    """
+    Record between two speakers
+    """
+    return head_to_head(a, b, limit=limit)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from Analyzer.rubrics import get_rubric
 from Analyzer.winner import run_winner_analysis
 
 router = APIRouter(prefix="/winner", tags=["Winner"])
@@ -46,3 +47,30 @@ def run_winner_chatbot():
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/rescore")
+def rescore_archive(rubric: str | None = None, compare: str | None = None):
+    """
+    Re-scores every archived debate under a rubric version without re-running
+    the models. With compare=<version>, reports which winners change.
+    """
+    from Analyzer.rescore import compare_rubrics, load_archive, rescore, results_table
+
+    try:
+        archive = load_archive()
+        if compare:
+            data = compare_rubrics(archive, rubric or get_rubric()["version"], compare)
+        else:
+            result = rescore(archive, rubric)
+            data = {"rubric": result["rubric"], "debates": results_table(archive, result)}
+        return {
+            "status": "success",
+            "data": data
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,47 +1,28 @@
 import sounddevice as sd
-from vosk import Model, KaldiRecognizer
-import json
+import queue
 
-# -----------------------------
-# CONFIG
-# -----------------------------
-MODEL_PATH = "vosk-model-small-en-us-0.15"
-SAMPLE_RATE = 16000  # Vosk model sample rate
+from Livestream.vosk_stream import SAMPLE_RATE, StreamingSession
 
 # -----------------------------
-# LOAD MODEL
+# CONFIG
 # -----------------------------
-model = Model(MODEL_PATH)
-rec = KaldiRecognizer(model, SAMPLE_RATE)
+MODEL_NAME = "small"  # "small" or "lgraph", see Livestream/vosk_stream.py
 
 # -----------------------------
-# GLOBAL TRANSCRIPT
+# LOAD MODEL (shared pool) + RECOGNIZER
 # -----------------------------
-transcript = ""
+session = StreamingSession(MODEL_NAME, SAMPLE_RATE)
+frames = queue.Queue()
 
 # -----------------------------
 # CALLBACK FUNCTION
 # -----------------------------
-def callback(indata, frames, time, status):
-    global transcript
+def callback(indata, frame_count, time, status):
     if status:
         print("Status:", status)
 
-    # Convert audio to bytes
-    data = indata.tobytes()
-
-    # Accept waveform and update transcript
-    if rec.AcceptWaveform(data):
-        result = json.loads(rec.Result())
-        text = result.get("text", "")
-        if text:
-            transcript += text + " "
-            print("FULL:", text)
-    else:
-        partial = json.loads(rec.PartialResult())
-        partial_text = partial.get("partial", "")
-        if partial_text:
-            print("PARTIAL:", partial_text)
+    # Hand the audio to the main thread; recognition must not block the audio callback
+    frames.put(bytes(indata))
 
 # -----------------------------
 # START LISTENING
@@ -49,26 +30,27 @@ def callback(indata, frames, time, status):
 print("🎤 Listening... Press Ctrl+C to stop.")
 
 try:
-    with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16', callback=callback, blocksize=8000):
+    with sd.RawInputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16', callback=callback, blocksize=8000):
         while True:
-            pass
+            event = session.accept(frames.get())
+            if event["type"] == "final" and event["text"]:
+                print("FULL:", event["text"])
+            elif event["text"]:
+                print("PARTIAL:", event["text"])
 except KeyboardInterrupt:
     print("\nStopping microphone...")
 
 # -----------------------------
 # FLUSH REMAINING AUDIO
 # -----------------------------
-rec.AcceptWaveform(b"")  # flush any leftover audio
-final_result = json.loads(rec.FinalResult())
-final_text = final_result.get("text", "")
-
-if final_text:
-    transcript += final_text
+while not frames.empty():
+    session.accept(frames.get())
+session.finish()
 
 # -----------------------------
 # PRINT FINAL TRANSCRIPT
 # -----------------------------
 print("\n===========================")
 print("📝 FINAL TRANSCRIPT:")
-print(transcript.strip())
-print("===========================")
\ No newline at end of file
+print(session.transcript)
+print("===========================")
@@ -1,11 +1,9 @@
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
 import noisereduce as nr
-from faster_whisper import WhisperModel
 import queue
-import os
-import uuid
+
+from Whispercpp.engines import get_engine
 
 def speech_conversion():
    
@@ -34,19 +32,13 @@ def speech_conversion():
  print("🔇 Reducing noise…")
  cleaned = nr.reduce_noise(y=audio, sr=sr)
 
+ # Shared in-process model: loaded on the first call only, then reused
  print("🧠 Loading Faster Whisper model…")
- model = WhisperModel("small", device="cpu", compute_type="int8")
-
- # --- Write cleaned audio to a temporary WAV file because faster-whisper expects a file path ---
- tmp_name = f"temp_{uuid.uuid4().hex}.wav"
- sf.write(tmp_name, cleaned, sr)
-
- try:
-    segments, info = model.transcribe(tmp_name)
-    print("\n===== TRANSCRIPT =====")
-    for seg in segments:
-        print(seg.text)
- finally:
-    # remove temporary file
-    if os.path.exists(tmp_name):
-        os.remove(tmp_name)
\ No newline at end of file
+ engine = get_engine("faster-whisper")
+ engine.load()
+
+ # faster-whisper accepts the NumPy buffer directly, no temporary WAV needed
+ segments = engine.transcribe_array(cleaned, sr)
+ print("\n===== TRANSCRIPT =====")
+ for seg in segments:
+    print(seg["text"])
\ No newline at end of file